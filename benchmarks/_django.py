@@ -0,0 +1,24 @@
+"""
+Bootstrap Django for standalone benchmark scripts.
+
+Uses ``rbac_project.settings`` unless ``DJANGO_SETTINGS_MODULE`` is set.
+Run against SQLite with ``DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3``.
+"""
+import os
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+def setup(migrate=False):
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "rbac_project.settings")
+
+    import django
+    django.setup()
+
+    if migrate:
+        from django.core.management import call_command
+        call_command("migrate", verbosity=0)
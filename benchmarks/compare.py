@@ -0,0 +1,56 @@
+"""
+Compare two ``benchmarks.hot_path`` JSON reports.
+
+    python -m benchmarks.compare before.json after.json [--threshold 10]
+
+Prints µs/call and queries/call side by side.  With ``--threshold``, exits
+with status 1 if any case got slower by more than that many percent or
+runs more queries than before.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as fh:
+        return json.load(fh)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, help="fail on slowdowns above this percentage")
+    args = parser.parse_args()
+
+    before, after = load(args.before), load(args.after)
+    if before["meta"].get("params") != after["meta"].get("params"):
+        print("warning: reports were produced with different parameters", file=sys.stderr)
+
+    print(f"before: {before['meta'].get('revision')}  after: {after['meta'].get('revision')}")
+    print(f"{'case':<32}{'before µs':>12}{'after µs':>12}{'change':>9}{'queries':>12}")
+
+    regressions = []
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            print(f"{name:<32}{'-':>12}{new['us_per_call']:>12.1f}{'new':>9}{new['queries_per_call']:>12}")
+            continue
+
+        change = (new["us_per_call"] - old["us_per_call"]) / old["us_per_call"] * 100 if old["us_per_call"] else 0.0
+        queries = f"{old['queries_per_call']} → {new['queries_per_call']}"
+        print(f"{name:<32}{old['us_per_call']:>12.1f}{new['us_per_call']:>12.1f}{change:>+8.1f}%{queries:>12}")
+
+        if args.threshold is not None and (
+            change > args.threshold or new["queries_per_call"] > old["queries_per_call"]
+        ):
+            regressions.append(name)
+
+    if regressions:
+        print(f"regressions: {', '.join(regressions)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Synthetic RBAC data at configurable scale for the benchmarks.
+
+    dataset = generate(tenants=5, endpoints=5000, roles=20, perms_per_role=40, users=200)
+
+Per run:
+  - ``modules`` modules with ``submodules`` submodules each (global)
+  - ``endpoints`` ApiEndpoints spread over the (module, submodule) pairs,
+    alternating list (``/r{n}/``) and detail (``/r{n}/{pk}/``) paths, with
+    GET/POST or GET/PUT/PATCH/DELETE operations
+Per tenant:
+  - a TenantModule per (module, submodule)
+  - a Permission per (module, submodule, action), plus module-level ``view``
+  - ``roles`` roles with ``perms_per_role`` random permissions each
+  - ``users`` users with ``roles_per_user`` random roles each
+
+The first user of every tenant (``Dataset.probe_users``) also gets a role
+with module-level ``view`` on every module, so GET requests to any
+endpoint are allowed for it.
+
+Rows are written with ``bulk_create``; run inside a transaction that is
+rolled back to leave the database untouched.  Generation is deterministic
+for a given ``seed``.
+"""
+import random
+from collections import namedtuple
+
+Dataset = namedtuple("Dataset", ["tenants", "probe_users", "users", "paths"])
+
+ACTIONS = ("view", "create", "update", "delete")
+LIST_METHODS = (("GET", "view"), ("POST", "create"))
+DETAIL_METHODS = (("GET", "view"), ("PUT", "update"), ("PATCH", "update"), ("DELETE", "delete"))
+
+BATCH_SIZE = 2000
+
+
+def generate(
+    tenants=1,
+    endpoints=1000,
+    roles=10,
+    perms_per_role=20,
+    users=50,
+    roles_per_user=2,
+    modules=10,
+    submodules=5,
+    seed=0,
+):
+    from msbc_rbac.accounts.models import User, UserRole
+    from msbc_rbac.core.models import (
+        ApiEndpoint, ApiOperation, Module, ModuleSubModuleMapping, Permission,
+        Role, RolePermission, SubModule, Tenant, TenantModule,
+    )
+
+    rng = random.Random(seed)
+
+    # ── Registry ──────────────────────────────────────────
+    module_objs = Module.objects.bulk_create(
+        Module(code=f"BENCH_M{m}", name=f"Bench module {m}", order=m) for m in range(modules)
+    )
+    submodule_objs = SubModule.objects.bulk_create(
+        SubModule(code=f"BENCH_M{m}_S{s}", name=f"Bench submodule {m}.{s}", order=s)
+        for m in range(modules)
+        for s in range(submodules)
+    )
+    pairs = [
+        (module_objs[i // submodules], submodule)
+        for i, submodule in enumerate(submodule_objs)
+    ]
+    ModuleSubModuleMapping.objects.bulk_create(
+        ModuleSubModuleMapping(module=module, submodule=submodule) for module, submodule in pairs
+    )
+
+    endpoint_objs = ApiEndpoint.objects.bulk_create(
+        (
+            ApiEndpoint(
+                path=_endpoint_path(i, pairs[i % len(pairs)]),
+                module=pairs[i % len(pairs)][0],
+                submodule=pairs[i % len(pairs)][1],
+            )
+            for i in range(endpoints)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    ApiOperation.objects.bulk_create(
+        (
+            ApiOperation(endpoint=endpoint, http_method=method, permission_code=action)
+            for i, endpoint in enumerate(endpoint_objs)
+            for method, action in (LIST_METHODS if i % 2 == 0 else DETAIL_METHODS)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    # ── Tenants ───────────────────────────────────────────
+    tenant_objs = Tenant.objects.bulk_create(
+        Tenant(name=f"bench-tenant-{t}") for t in range(tenants)
+    )
+    TenantModule.objects.bulk_create(
+        (
+            TenantModule(tenant=tenant, module=module, submodule=submodule)
+            for tenant in tenant_objs
+            for module, submodule in pairs
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    user_objs = User.objects.bulk_create(
+        (
+            # Unusable password: hashing one per user would dominate setup
+            User(username=f"bench-{t}-{u}", password="!", tenant=tenant)
+            for t, tenant in enumerate(tenant_objs)
+            for u in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+    probe_users = []
+    for t, tenant in enumerate(tenant_objs):
+        permission_objs = Permission.objects.bulk_create(
+            (
+                Permission(tenant=tenant, module=module, submodule=submodule, code=action)
+                for module, submodule in pairs
+                for action in ACTIONS
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        module_view = Permission.objects.bulk_create(
+            Permission(tenant=tenant, module=module, code="view") for module in module_objs
+        )
+
+        role_objs = Role.objects.bulk_create(
+            Role(name=f"bench-role-{r}", tenant=tenant) for r in range(roles)
+        )
+        probe_role = Role.objects.create(name="bench-probe", tenant=tenant)
+
+        per_role = min(perms_per_role, len(permission_objs))
+        RolePermission.objects.bulk_create(
+            (
+                RolePermission(role=role, permission=permission)
+                for role in role_objs
+                for permission in rng.sample(permission_objs, per_role)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        RolePermission.objects.bulk_create(
+            RolePermission(role=probe_role, permission=permission) for permission in module_view
+        )
+
+        tenant_users = user_objs[t * users:(t + 1) * users]
+        per_user = min(roles_per_user, len(role_objs))
+        UserRole.objects.bulk_create(
+            (
+                UserRole(user=user, role=role, tenant=tenant)
+                for user in tenant_users
+                for role in rng.sample(role_objs, per_user)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        if tenant_users:
+            UserRole.objects.create(user=tenant_users[0], role=probe_role, tenant=tenant)
+            probe_users.append(tenant_users[0])
+
+    # Concrete request paths, e.g. /api/bench/m1/s2/r7/42/
+    paths = [endpoint.path.replace("{pk}", str(rng.randint(1, 10 ** 6))) for endpoint in endpoint_objs]
+
+    # Users as the auth middleware would load them (tenant attached)
+    users_with_tenant = list(
+        User.objects.select_related("tenant").filter(pk__in=[u.pk for u in user_objs]).order_by("pk")
+    )
+    by_pk = {user.pk: user for user in users_with_tenant}
+
+    return Dataset(
+        tenants=tenant_objs,
+        probe_users=[by_pk[user.pk] for user in probe_users],
+        users=users_with_tenant,
+        paths=paths,
+    )
+
+
+def _endpoint_path(i, pair):
+    module, submodule = pair
+    base = f"/api/bench/{module.code.lower()}/{submodule.code.lower()}/r{i // 2}/"
+    return base if i % 2 == 0 else base + "{pk}/"
@@ -0,0 +1,99 @@
+"""
+Compare RBACMiddleware decision modes on an allowed request.
+
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 \
+        python -m benchmarks.decision_modes --migrate --iterations 5000
+
+Synthetic data is created inside a transaction that is rolled back at the
+end, so the target database is left untouched.
+
+Modes:
+  default (cache)      one query per step, user permissions cached
+  default (no cache)   one query per step, permission cache disabled
+  single_query         every policy input in one SQL statement
+"""
+import argparse
+import time
+
+from benchmarks._django import setup
+
+
+def seed(endpoints):
+    from benchmarks.dataset import generate
+
+    dataset = generate(tenants=1, endpoints=endpoints, roles=1, users=1)
+    return dataset.probe_users[0], dataset.paths[endpoints // 2]
+
+
+def authorize(middleware, request):
+    # What the handler does: process_view first, the view only if it passes.
+    return middleware.process_view(request, None, (), {}) or middleware(request)
+
+
+def measure(middleware, make_request, iterations):
+    from django.db import connection
+
+    for _ in range(50):
+        response = authorize(middleware, make_request())
+    assert response.status_code == 200, response.content
+
+    queries = []
+    with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+        authorize(middleware, make_request())
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        authorize(middleware, make_request())
+    elapsed = time.perf_counter() - started
+
+    return elapsed / iterations * 1e6, len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--endpoints", type=int, default=1000)
+    parser.add_argument("--migrate", action="store_true", help="apply migrations first")
+    args = parser.parse_args()
+
+    setup(migrate=args.migrate)
+
+    from django.db import transaction
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+
+    from msbc_rbac.core.services.RBACMiddleware import RBACMiddleware
+
+    # The decision cache would answer every repeated request; keep it off
+    # so the modes themselves are compared.
+    modes = [
+        ("default (cache)", {"RBAC_DECISION_MODE": "default", "RBAC_DECISION_CACHE_SIZE": 0}),
+        ("default (no cache)", {
+            "RBAC_DECISION_MODE": "default",
+            "RBAC_DECISION_CACHE_SIZE": 0,
+            "RBAC_PERMISSION_CACHE_TIMEOUT": 0,
+        }),
+        ("single_query", {"RBAC_DECISION_MODE": "single_query", "RBAC_DECISION_CACHE_SIZE": 0}),
+    ]
+
+    with transaction.atomic():
+        user, path = seed(args.endpoints)
+        factory = RequestFactory()
+        middleware = RBACMiddleware(lambda request: HttpResponse("ok"))
+
+        def make_request():
+            request = factory.get(path)
+            request.user = user
+            return request
+
+        print(f"{'mode':<20} {'µs/request':>12} {'queries':>8}")
+        for name, overrides in modes:
+            with override_settings(DEBUG=False, **overrides):
+                per_call, queries = measure(middleware, make_request, args.iterations)
+            print(f"{name:<20} {per_call:>12.1f} {queries:>8}")
+
+        transaction.set_rollback(True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""
+Micro-benchmarks for the authorization hot path.
+
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 \
+        python -m benchmarks.hot_path --migrate --endpoints 20000 --output before.json
+    ...
+    python -m benchmarks.compare before.json after.json
+
+Measures, in µs per call and queries per call:
+
+  resolve_api_operation          route table lookup (warm)
+  get_user_permissions           permission set, RBAC cache warm
+  get_user_permissions.uncached  permission set, cache disabled
+  build_sidebar_context          sidebar for a tenant user
+  middleware                     full RBACMiddleware pass (GET, allowed)
+  middleware.no_decision_cache   same, decision cache disabled
+
+Data comes from ``benchmarks.dataset`` and is created inside a transaction
+that is rolled back at the end, so the target database is left untouched.
+Works against SQLite and PostgreSQL (``DB_ENGINE`` / ``DB_*`` settings).
+"""
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import time
+from itertools import cycle
+
+from benchmarks._django import ROOT, setup
+
+
+def measure(func, iterations, warmup=50):
+    """
+    Call ``func`` repeatedly; return per-call latency stats and query count.
+
+    ``warmup`` calls run first, so caches are filled for every input ``func``
+    cycles through.
+    """
+    from django.db import connection
+
+    for _ in range(warmup):
+        func()
+
+    queries = []
+    counted = min(iterations, 200)
+    with connection.execute_wrapper(lambda execute, sql, *args: queries.append(sql) or execute(sql, *args)):
+        for _ in range(counted):
+            func()
+
+    samples = []
+    for _ in range(iterations):
+        started = time.perf_counter_ns()
+        func()
+        samples.append(time.perf_counter_ns() - started)
+    samples.sort()
+
+    return {
+        "us_per_call": round(sum(samples) / len(samples) / 1000, 2),
+        "p50_us": round(samples[len(samples) // 2] / 1000, 2),
+        "p99_us": round(samples[int(len(samples) * 0.99)] / 1000, 2),
+        "queries_per_call": round(len(queries) / counted, 2),
+        "iterations": iterations,
+    }
+
+
+def run_cases(dataset, iterations):
+    from django.http import HttpResponse
+    from django.test import RequestFactory, override_settings
+
+    from msbc_rbac.core.services.permission_api_resolver import (
+        get_user_permissions,
+        resolve_api_operation,
+    )
+    from msbc_rbac.core.services.RBACMiddleware import RBACMiddleware
+    from msbc_rbac.core.services.sidebar_context import build_sidebar_context
+
+    factory = RequestFactory()
+    probe_requests = []
+    for i, path in enumerate(dataset.paths[:1000]):
+        request = factory.get(path)
+        request.user = dataset.probe_users[i % len(dataset.probe_users)]
+        probe_requests.append(request)
+
+    requests = cycle(probe_requests)
+    users = cycle(dataset.users)
+    probes = cycle(dataset.probe_users)
+    middleware = RBACMiddleware(lambda request: HttpResponse("ok"))
+
+    def middleware_pass():
+        request = next(requests)
+        response = middleware.process_view(request, None, (), {}) or middleware(request)
+        assert response.status_code == 200, response.content
+
+    def permissions():
+        user = next(users)
+        get_user_permissions(user.tenant, user)
+
+    cases = {
+        "resolve_api_operation": (lambda: resolve_api_operation(next(requests)), {}),
+        "get_user_permissions": (permissions, {}),
+        "get_user_permissions.uncached": (permissions, {"RBAC_PERMISSION_CACHE_TIMEOUT": 0}),
+        "build_sidebar_context": (lambda: build_sidebar_context(next(probes)), {}),
+        "middleware": (middleware_pass, {}),
+        "middleware.no_decision_cache": (middleware_pass, {"RBAC_DECISION_CACHE_SIZE": 0}),
+    }
+
+    # One full pass over every cycled input before measuring
+    warmup = max(50, len(probe_requests), len(dataset.users), len(dataset.probe_users))
+
+    results = {}
+    for name, (func, overrides) in cases.items():
+        with override_settings(DEBUG=False, **overrides):
+            results[name] = measure(func, iterations, warmup=warmup)
+        print(
+            f"{name:<32}{results[name]['us_per_call']:>12.1f}"
+            f"{results[name]['p99_us']:>12.1f}{results[name]['queries_per_call']:>10}",
+            file=sys.stderr,
+        )
+    return results
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, stderr=subprocess.DEVNULL, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=3)
+    parser.add_argument("--endpoints", type=int, default=1000, help="100 to 20000")
+    parser.add_argument("--roles", type=int, default=10, help="roles per tenant")
+    parser.add_argument("--perms-per-role", type=int, default=20)
+    parser.add_argument("--users", type=int, default=50, help="users per tenant")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write JSON results here (default: stdout)")
+    parser.add_argument("--migrate", action="store_true", help="apply migrations first")
+    args = parser.parse_args()
+
+    setup(migrate=args.migrate)
+
+    import django
+    from django.db import connection, transaction
+
+    from benchmarks.dataset import generate
+
+    params = {
+        "tenants": args.tenants,
+        "endpoints": args.endpoints,
+        "roles": args.roles,
+        "perms_per_role": args.perms_per_role,
+        "users": args.users,
+        "iterations": args.iterations,
+        "seed": args.seed,
+    }
+
+    with transaction.atomic():
+        started = time.perf_counter()
+        dataset = generate(
+            tenants=args.tenants,
+            endpoints=args.endpoints,
+            roles=args.roles,
+            perms_per_role=args.perms_per_role,
+            users=args.users,
+            seed=args.seed,
+        )
+        print(f"dataset generated in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+        print(f"{'case':<32}{'µs/call':>12}{'p99 µs':>12}{'queries':>10}", file=sys.stderr)
+
+        results = run_cases(dataset, args.iterations)
+        transaction.set_rollback(True)
+
+    report = {
+        "meta": {
+            "revision": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "database": connection.vendor,
+            "params": params,
+        },
+        "results": results,
+    }
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
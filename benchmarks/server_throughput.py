@@ -0,0 +1,201 @@
+"""
+Compare request throughput under gunicorn sync workers (WSGI) and uvicorn
+(ASGI, async RBACMiddleware path) on an RBAC-protected endpoint.
+
+    pip install uvicorn
+    DB_ENGINE=sqlite DB_NAME=/tmp/bench.sqlite3 \
+        python -m benchmarks.server_throughput --migrate --workers 2 --duration 10
+
+The servers run in separate processes, so unlike ``decision_modes`` the
+benchmark tenant, role and user are committed to the target database
+(idempotently, under ``bench-throughput`` names) and a login session is
+created for the user.  The load generator is a pool of keep-alive
+connections in this process; keep ``--concurrency`` modest so that it is
+not the bottleneck.
+"""
+import argparse
+import http.client
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+from benchmarks._django import ROOT, setup
+
+SERVERS = {
+    "gunicorn-sync": [
+        sys.executable, "-m", "gunicorn", "rbac_project.wsgi:application",
+        "--worker-class", "sync", "--workers", "{workers}",
+        "--bind", "127.0.0.1:{port}", "--access-logfile", "/dev/null",
+        "--error-logfile", "-", "--log-level", "warning",
+    ],
+    "uvicorn": [
+        sys.executable, "-m", "uvicorn", "rbac_project.asgi:application",
+        "--workers", "{workers}", "--host", "127.0.0.1", "--port", "{port}",
+        "--no-access-log", "--log-level", "warning",
+    ],
+}
+
+
+def seed(path):
+    """
+    Make ``path`` (GET) reachable for a benchmark user; return its session cookie.
+    """
+    from django.conf import settings
+    from django.test import Client
+
+    from msbc_rbac.accounts.models import User, UserRole
+    from msbc_rbac.core.models import (
+        ApiEndpoint, ApiOperation, Module, Permission, Role, RolePermission,
+        SubModule, Tenant, TenantModule,
+    )
+
+    tenant, _ = Tenant.objects.get_or_create(name="bench-throughput-tenant")
+    module, _ = Module.objects.get_or_create(code="BENCH", defaults={"name": "Bench"})
+    submodule, _ = SubModule.objects.get_or_create(code="BENCH_SUB", defaults={"name": "Bench Sub"})
+
+    endpoint, _ = ApiEndpoint.objects.get_or_create(
+        path=path, defaults={"module": module, "submodule": submodule}
+    )
+    operation, _ = ApiOperation.objects.get_or_create(
+        endpoint=endpoint, http_method="GET", defaults={"permission_code": "view"}
+    )
+    TenantModule.objects.get_or_create(
+        tenant=tenant, module=endpoint.module, submodule=endpoint.submodule
+    )
+
+    role, _ = Role.objects.get_or_create(name="bench-throughput-role", tenant=tenant)
+    permission, _ = Permission.objects.get_or_create(
+        tenant=tenant,
+        module=endpoint.module,
+        submodule=endpoint.submodule,
+        code=operation.permission_code or "view",
+    )
+    RolePermission.objects.get_or_create(role=role, permission=permission)
+
+    user = User.objects.filter(username="bench-throughput-user").first()
+    if user is None:
+        user = User.objects.create_user("bench-throughput-user", password="x", tenant=tenant)
+    UserRole.objects.get_or_create(user=user, role=role, tenant=tenant)
+
+    client = Client()
+    client.force_login(user)
+    return f"{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=1).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"server on port {port} did not start")
+
+
+def request(conn, path, cookie):
+    conn.request("GET", path, headers={"Cookie": cookie})
+    response = conn.getresponse()
+    response.read()
+    return response
+
+
+def generate_load(port, path, cookie, concurrency, duration):
+    """
+    Hammer ``path`` from ``concurrency`` keep-alive connections for
+    ``duration`` seconds; return ``(latencies, failures)``.
+    """
+    results = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker():
+        latencies, failures = [], 0
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            response = request(conn, path, cookie)
+            latencies.append(time.perf_counter() - started)
+            if response.status != 200:
+                failures += 1
+            if response.will_close:
+                conn.close()
+                conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        conn.close()
+        with lock:
+            results.append((latencies, failures))
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(latency for chunk, _ in results for latency in chunk)
+    return latencies, sum(failures for _, failures in results)
+
+
+def run_server(name, args, cookie):
+    port = free_port()
+    command = [part.format(workers=args.workers, port=port) for part in SERVERS[name]]
+    server = subprocess.Popen(command, cwd=ROOT, env=os.environ.copy())
+    try:
+        wait_until_ready(port)
+
+        # Warm every worker (route table, tenant policy, permission cache).
+        conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+        for _ in range(args.workers * 20):
+            response = request(conn, args.path, cookie)
+            if response.status != 200:
+                raise RuntimeError(f"{name}: GET {args.path} returned {response.status}")
+        conn.close()
+
+        latencies, failures = generate_load(port, args.path, cookie, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+    count = len(latencies)
+    return {
+        "requests": count,
+        "rps": count / args.duration,
+        "p50_ms": latencies[count // 2] * 1e3 if count else 0.0,
+        "p99_ms": latencies[int(count * 0.99)] * 1e3 if count else 0.0,
+        "failures": failures,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--path", default="/api/core/roles/", help="RBAC-protected GET endpoint")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per server")
+    parser.add_argument("--servers", nargs="+", choices=sorted(SERVERS), default=sorted(SERVERS))
+    parser.add_argument("--migrate", action="store_true", help="apply migrations first")
+    args = parser.parse_args()
+
+    setup(migrate=args.migrate)
+    cookie = seed(args.path)
+
+    print(f"GET {args.path}  workers={args.workers} concurrency={args.concurrency} duration={args.duration}s")
+    print(f"{'server':<16}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}{'failed':>8}")
+    for name in args.servers:
+        result = run_server(name, args, cookie)
+        print(
+            f"{name:<16}{result['rps']:>10.0f}{result['p50_ms']:>10.2f}"
+            f"{result['p99_ms']:>10.2f}{result['failures']:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,14 @@ workers = multiprocessing.cpu_count() * 2 + 1
 worker_class = "sync"          # Use 'gevent' or 'gthread' for async
 threads = 1                    # Threads per worker (relevant for gthread)
 
+# ─────────────────────────────────────────────────────────────────────
+# Preloading
+# ─────────────────────────────────────────────────────────────────────
+# Load Django once in the master and fork workers from it.  The RBAC route
+# table and module catalogue are compiled in the master (on_starting) and
+# shared copy-on-write.  Code changes then need a full restart, not HUP.
+preload_app = True
+
 # ─────────────────────────────────────────────────────────────────────
 # Timeouts
 # ─────────────────────────────────────────────────────────────────────
@@ -43,3 +51,39 @@ access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"
 # Security
 # ─────────────────────────────────────────────────────────────────────
 forwarded_allow_ips = "*"   # Trust X-Forwarded-For from upstream proxy/LB
+
+
+# ─────────────────────────────────────────────────────────────────────
+# Server hooks
+# ─────────────────────────────────────────────────────────────────────
+def on_starting(server):
+    """Master: warm the RBAC policy data before any worker is forked, and
+    warn when the workers would not share policy version bumps."""
+    from django.apps import apps
+
+    if not apps.ready:  # preload_app disabled
+        return
+
+    from msbc_rbac.core.checks import check_rbac_cache
+    from msbc_rbac.core.services import warmup
+
+    if server.cfg.workers > 1:
+        for warning in check_rbac_cache(None):
+            server.log.warning(f"{warning.msg} {warning.hint}")
+
+    report = warmup.warm_up()
+    if report is not None:
+        server.log.info(str(report))
+    warmup.prepare_fork()
+
+
+def post_fork(server, worker):
+    """Worker: reset counters inherited from the master, start policy sync."""
+    from django.apps import apps
+
+    if not apps.ready:
+        return
+
+    from msbc_rbac.core.services import warmup
+
+    warmup.after_fork()
@@ -3,12 +3,15 @@ API views for accounts app - Token authentication endpoint.
 """
 from rest_framework.authtoken.models import Token
 from rest_framework.decorators import api_view, permission_classes
-from rest_framework.permissions import AllowAny
+from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework import status
 from django.contrib.auth import authenticate
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.services.claims import issue_claims_token
+
 
 @extend_schema(
     request={
@@ -31,6 +34,7 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
                     'user_id': {'type': 'integer', 'example': 1},
                     'username': {'type': 'string', 'example': 'editor_a'},
                     'tenant': {'type': 'string', 'example': 'Tenant A'},
+                    'claims_token': {'type': 'string', 'example': 'c1.eyJ1IjoxLC4uLn0.c2ln'},
                 }
             }
         ),
@@ -47,6 +51,9 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
     3. Use the token in subsequent API requests by adding the header:
        `Authorization: Token <your-token-here>`
     
+    With `RBAC_CLAIMS_TOKENS` enabled the response also carries a short-lived
+    signed `claims_token`, used as `Authorization: Claims <claims-token>`.
+
     **Token Lifetime:**
     - Tokens do not expire automatically
     - One token per user (regenerate by calling this endpoint again)
@@ -84,14 +91,64 @@ def obtain_auth_token(request):
         # Get or create token for this user
         token, created = Token.objects.get_or_create(user=user)
         
-        return Response({
+        data = {
             'token': token.key,
             'user_id': user.id,
             'username': user.username,
             'tenant': user.tenant.name if user.tenant else None,
-        }, status=status.HTTP_200_OK)
+        }
+        if rbac_setting('RBAC_CLAIMS_TOKENS') and user.tenant_id:
+            data['claims_token'] = issue_claims_token(user)
+
+        return Response(data, status=status.HTTP_200_OK)
     else:
         return Response(
             {'error': 'Invalid credentials'},
             status=status.HTTP_400_BAD_REQUEST
         )
+
+
+@extend_schema(
+    request=None,
+    responses={
+        200: OpenApiResponse(
+            description='Claims token issued',
+            response={
+                'type': 'object',
+                'properties': {
+                    'claims_token': {'type': 'string', 'example': 'c1.eyJ1IjoxLC4uLn0.c2ln'},
+                    'expires_in': {'type': 'integer', 'example': 300},
+                }
+            }
+        ),
+        400: OpenApiResponse(description='Claims tokens disabled or user without tenant'),
+    },
+    tags=['Authentication'],
+    summary='Refresh Claims Token',
+    description="""
+    Issue a fresh signed claims token for the authenticated user (token,
+    session or a still valid claims token).  Claims tokens expire after
+    `RBAC_CLAIMS_TTL` seconds; call this before that.
+    """
+)
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def obtain_claims_token(request):
+    """
+    Issue a signed permission claims token for the authenticated user.
+    """
+    if not rbac_setting('RBAC_CLAIMS_TOKENS'):
+        return Response(
+            {'error': 'Claims tokens are disabled'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not request.user.tenant_id:
+        return Response(
+            {'error': 'No tenant found for user'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    return Response({
+        'claims_token': issue_claims_token(request.user),
+        'expires_in': rbac_setting('RBAC_CLAIMS_TTL'),
+    }, status=status.HTTP_200_OK)
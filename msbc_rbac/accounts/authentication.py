@@ -0,0 +1,152 @@
+"""
+DRF authentication classes.
+
+``CachedTokenAuthentication`` — DRF tokens with the user and tenant cached.
+
+``TokenAuthentication`` loads token + user on every request, and the
+tenant costs another query the first time ``user.tenant`` is read (tenant
+checks, ``str(user)`` in logs).  ``CachedTokenAuthentication`` loads all
+three in one query and keeps the result in the RBAC cache, tagged with the
+user's policy version (read before the query, so the first request of an
+uncached token caches it untagged and the second one tags it).
+
+Deleting a token or saving its user (deactivation, tenant change) bumps
+that version (see ``core.signals``), so cached credentials are not used
+again by any worker sharing the RBAC cache.
+
+``ClaimsTokenAuthentication`` accepts signed claims tokens
+(``Authorization: Claims <token>``, see ``core.services.claims``).
+
+Usage (settings.py):
+
+    REST_FRAMEWORK = {
+        "DEFAULT_AUTHENTICATION_CLASSES": [
+            "msbc_rbac.accounts.authentication.CachedTokenAuthentication",
+            "msbc_rbac.accounts.authentication.ClaimsTokenAuthentication",
+            ...
+        ],
+    }
+"""
+import hashlib
+
+from django.utils.translation import gettext_lazy as _
+from drf_spectacular.extensions import OpenApiAuthenticationExtension
+from drf_spectacular.plumbing import build_bearer_security_scheme_object
+from rest_framework import exceptions
+from rest_framework.authentication import (
+    BaseAuthentication,
+    TokenAuthentication,
+    get_authorization_header,
+)
+
+from msbc_rbac.core.cache import get_rbac_cache
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.services import claims as rbac_claims
+from msbc_rbac.core.services import policy_version
+
+
+def _token_key(key):
+    # Raw token keys are credentials: keep them out of cache key listings.
+    return f"rbac:token:{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    ``TokenAuthentication`` resolving token → user → tenant in one query,
+    cached for ``RBAC_TOKEN_CACHE_TIMEOUT`` seconds.
+    """
+
+    def load_token(self, key):
+        """
+        The token with its user and the user's tenant.  The password hash
+        is deferred, keeping it out of the cache.
+        """
+        model = self.get_model()
+        try:
+            return (
+                model.objects.select_related("user__tenant")
+                .defer("user__password")
+                .get(key=key)
+            )
+        except model.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_("Invalid token."))
+
+    def authenticate_credentials(self, key):
+        timeout = rbac_setting("RBAC_TOKEN_CACHE_TIMEOUT")
+        cache = get_rbac_cache()
+        cache_key = _token_key(key)
+
+        cached = cache.get(cache_key) if timeout else None
+        version = None
+        if cached is not None:
+            cached_version, token = cached
+            # Read before the query below, so a user saved while it runs
+            # leaves the reloaded token tagged with an outdated version.
+            version = policy_version.get_version(policy_version.USER, token.user_id)
+            if cached_version == version:
+                return token.user, token
+
+        token = self.load_token(key)
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+
+        if timeout:
+            # Without a cached entry the user id was unknown before the
+            # query: the token is cached untagged, and the next request
+            # loads it again under a version read first.
+            cache.set(cache_key, (version, token), timeout)
+        return token.user, token
+
+
+class ClaimsTokenAuthentication(BaseAuthentication):
+    """
+    Authenticates ``Authorization: Claims <token>`` headers.
+
+    While the claims are current, ``request.user`` is built from them
+    without a query (id, username and tenant id; other fields load on
+    access) and ``request.auth`` holds the ``Claims``.  Stale claims load
+    the user from the database.  Inactive unless ``RBAC_CLAIMS_TOKENS``.
+    """
+
+    keyword = rbac_claims.KEYWORD
+
+    def authenticate(self, request):
+        if not rbac_setting("RBAC_CLAIMS_TOKENS"):
+            return None
+
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_("Invalid claims header."))
+
+        try:
+            claims = rbac_claims.verify_claims_token(auth[1].decode())
+        except (UnicodeError, rbac_claims.ClaimsError) as exc:
+            raise exceptions.AuthenticationFailed(str(exc))
+
+        if rbac_claims.claims_are_current(claims):
+            return rbac_claims.claims_user(claims), claims
+
+        user = rbac_claims.load_claims_user(claims)
+        if user is None:
+            raise exceptions.AuthenticationFailed(_("User inactive or deleted."))
+        return user, claims
+
+    def authenticate_header(self, request):
+        return self.keyword
+
+
+class ClaimsTokenScheme(OpenApiAuthenticationExtension):
+    """
+    OpenAPI security scheme for ``ClaimsTokenAuthentication``.
+    """
+
+    target_class = "msbc_rbac.accounts.authentication.ClaimsTokenAuthentication"
+    name = "claimsAuth"
+
+    def get_security_definition(self, auto_schema):
+        return build_bearer_security_scheme_object(
+            header_name="Authorization",
+            token_prefix=self.target.keyword,
+        )
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_effective_permissions(apps, schema_editor):
+    """
+    Materialize existing grants (Permission ⋈ RolePermission ⋈ UserRole).
+    """
+    Permission = apps.get_model("core", "Permission")
+    UserEffectivePermission = apps.get_model("accounts", "UserEffectivePermission")
+
+    rows = (
+        Permission.objects.filter(is_active=True, roles__allowed=True)
+        .values_list(
+            "roles__role__role_users__user_id",
+            "id",
+            "tenant_id",
+            "module_id",
+            "submodule_id",
+            "code",
+        )
+        .exclude(roles__role__role_users__user_id=None)
+        .distinct()
+    )
+    UserEffectivePermission.objects.bulk_create(
+        (
+            UserEffectivePermission(
+                user_id=user_id,
+                permission_id=permission_id,
+                tenant_id=tenant_id,
+                module_id=module_id,
+                submodule_id=submodule_id,
+                code=code,
+            )
+            for user_id, permission_id, tenant_id, module_id, submodule_id, code in rows.iterator()
+        ),
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_userrole_tenant'),
+        ('core', '0007_apiendpoint_route'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserEffectivePermission',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=150, null=True)),
+                ('module', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.module')),
+                ('permission', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.permission')),
+                ('submodule', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.submodule')),
+                ('tenant', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.tenant')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='effective_permissions', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['tenant', 'user', 'module', 'submodule', 'code'], name='user_effective_perm_lookup')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'permission'), name='unique_user_effective_permission')],
+            },
+        ),
+        migrations.RunPython(populate_effective_permissions, migrations.RunPython.noop),
+    ]
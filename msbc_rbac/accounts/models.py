@@ -2,7 +2,7 @@ from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db import models
 from django.conf import settings
 
-from msbc_rbac.core.models import Role, ApiOperation
+from msbc_rbac.core.models import Role, ApiOperation, Module, Permission, SubModule
 from decouple import config
 
 # Configure RBAC_TENANT_MODEL - defaults to 'core.Tenant' if not set
@@ -124,6 +124,55 @@ class UserRole(models.Model):
         return f"{self.user} → {self.role}"
 
 
+class UserEffectivePermission(models.Model):
+    """
+    Materialized user → permission grant.
+
+    One row per Permission the user holds through an allowed RolePermission
+    on one of their roles, with the permission's tenant, module, submodule
+    and code copied alongside so lookups are a single index scan.  Kept
+    current by ``core.services.effective_permissions``.
+    """
+    tenant = models.ForeignKey(
+        settings.TENANT_MODEL,
+        null=True,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name="effective_permissions",
+    )
+    permission = models.ForeignKey(
+        Permission,
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    module = models.ForeignKey(Module, null=True, on_delete=models.CASCADE, related_name="+")
+    submodule = models.ForeignKey(
+        SubModule, null=True, blank=True, on_delete=models.CASCADE, related_name="+"
+    )
+    code = models.CharField(max_length=150, null=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "permission"],
+                name="unique_user_effective_permission",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["tenant", "user", "module", "submodule", "code"],
+                name="user_effective_perm_lookup",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.user} → {self.permission_id}"
+
+
 class UserApiBlock(models.Model):
     """
     Represents a specific API operation blocked for a specific user within a tenant.
@@ -1,3 +1,149 @@
-from django.test import TestCase
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.urls import path
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework.views import APIView
+
+from msbc_rbac.accounts.authentication import CachedTokenAuthentication, ClaimsTokenAuthentication
+from msbc_rbac.accounts.models import User
+from msbc_rbac.core.models import Tenant
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.claims import Claims, issue_claims_token
+from msbc_rbac.core.testing import reset_rbac_caches
+
+
+@override_settings(RBAC_CLAIMS_TOKENS=True, RBAC_POLICY_SYNC=None)
+class ClaimsTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+
+    def setUp(self):
+        reset_rbac_caches()
+
+    def authenticate(self, token):
+        request = APIRequestFactory().get("/api/orders/", HTTP_AUTHORIZATION=f"Claims {token}")
+        return ClaimsTokenAuthentication().authenticate(request)
+
+    def test_current_claims(self):
+        user, claims = self.authenticate(issue_claims_token(self.user))
+        self.assertEqual(user.pk, self.user.pk)
+        self.assertIsInstance(claims, Claims)
+        self.assertIn("is_staff", user.get_deferred_fields())
+
+    def test_tampered_signature(self):
+        prefix, payload, signature = issue_claims_token(self.user).split(".")
+        forged = issue_claims_token(User(pk=self.user.pk + 1, username="mallory", tenant=self.tenant))
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, "signature"):
+            self.authenticate(f"{prefix}.{forged.split('.')[1]}.{signature}")
+
+    @override_settings(RBAC_CLAIMS_TTL=0)
+    def test_expired_token(self):
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, "expired"):
+            self.authenticate(issue_claims_token(self.user))
+
+    def test_stale_claims_load_the_user(self):
+        for scope, scope_id in (
+            (policy_version.TENANT, self.tenant.pk),
+            (policy_version.USER, self.user.pk),
+        ):
+            token = issue_claims_token(self.user)
+            policy_version.bump_version(scope, scope_id)
+            user, claims = self.authenticate(token)
+            self.assertEqual(user.pk, self.user.pk)
+            self.assertEqual(user.get_deferred_fields(), set())
+
+    def test_stale_claims_of_an_inactive_user(self):
+        token = issue_claims_token(self.user)
+        User.objects.filter(pk=self.user.pk).update(is_active=False)
+        policy_version.bump_version(policy_version.USER, self.user.pk)
+        with self.assertRaisesMessage(exceptions.AuthenticationFailed, "inactive"):
+            self.authenticate(token)
+
+    def test_disabled(self):
+        token = issue_claims_token(self.user)
+        with override_settings(RBAC_CLAIMS_TOKENS=False):
+            self.assertIsNone(self.authenticate(token))
+
+
+class TenantView(APIView):
+    def get(self, request):
+        return Response({"tenant": request.user.tenant.name})
+
+
+class CachedTenantView(TenantView):
+    authentication_classes = [CachedTokenAuthentication]
+
+
+class UncachedTenantView(TenantView):
+    authentication_classes = [TokenAuthentication]
+
+
+urlpatterns = [
+    path("api/cached/", CachedTenantView.as_view()),
+    path("api/uncached/", UncachedTenantView.as_view()),
+]
+
+
+# RBACMiddleware runs before DRF authentication: token requests reach it
+# as AnonymousUser and pass through, so only the view's queries count.
+@override_settings(ROOT_URLCONF=__name__, RBAC_POLICY_SYNC=None)
+class CachedTokenAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        cls.token = Token.objects.create(user=cls.user)
+
+    def setUp(self):
+        reset_rbac_caches()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Token {self.token.key}")
+
+    def get(self, url, queries):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"tenant": "T1"})
+
+    def test_query_counts(self):
+        # Token + user, then the tenant: on every request
+        for _ in range(3):
+            self.get("/api/uncached/", 2)
+
+        # One query until the token is cached under its user's version
+        for queries in (1, 1, 0, 0):
+            self.get("/api/cached/", queries)
+
+        policy_version.bump_version(policy_version.USER, self.user.pk)
+        for queries in (1, 0):
+            self.get("/api/cached/", queries)
+
+    def test_user_saved_while_loading(self):
+        load_token = CachedTokenAuthentication.load_token
+
+        def load_then_deactivate(auth, key):
+            token = load_token(auth, key)
+            User.objects.filter(pk=self.user.pk).update(is_active=False)
+            policy_version.bump_version(policy_version.USER, self.user.pk)
+            return token
+
+        for warm in (False, True):
+            with self.subTest(warm=warm):
+                User.objects.filter(pk=self.user.pk).update(is_active=True)
+                if warm:
+                    self.get("/api/cached/", 1)
+                    policy_version.bump_version(policy_version.USER, self.user.pk)
+                with mock.patch.object(CachedTokenAuthentication, "load_token", load_then_deactivate):
+                    self.assertEqual(self.client.get("/api/cached/").status_code, 200)
+
+                # The deactivation is seen by the next request
+                response = self.client.get("/api/cached/")
+                self.assertEqual(response.status_code, 401)
+                self.assertIn("inactive", response.json()["detail"])
@@ -94,7 +94,7 @@ class ModuleSubModuleMappingAdmin(admin.ModelAdmin):
 
 @admin.register(ApiEndpoint)
 class ApiEndpointAdmin(admin.ModelAdmin):
-    list_display = ("id", "module","submodule","path")
+    list_display = ("id", "module","submodule","path", "route")
 
 
 @admin.register(ApiOperation)
@@ -0,0 +1,18 @@
+from django.urls import path, re_path
+
+from msbc_rbac.core.api.rbac_views import (
+    cache_stats,
+    check_batch_view,
+    decide_view,
+    manifest_view,
+    stage_timings,
+)
+
+urlpatterns = [
+    path('cache-stats/', cache_stats, name='rbac-cache-stats'),
+    path('stage-timings/', stage_timings, name='rbac-stage-timings'),
+    path('manifest/', manifest_view, name='rbac-manifest'),
+    # POSTs cannot be redirected by APPEND_SLASH, so accept both forms
+    re_path(r'^check-batch/?$', check_batch_view, name='rbac-check-batch'),
+    re_path(r'^decide/?$', decide_view, name='rbac-decide'),
+]
@@ -0,0 +1,164 @@
+"""
+RBAC service endpoints.
+
+These views are mounted under ``/api/rbac/`` and authorize themselves, so the
+prefix is listed in ``BYPASS_PATH_PREFIXES``.
+"""
+from django.utils.cache import parse_etags, patch_cache_control, patch_vary_headers, quote_etag
+from rest_framework import status
+from rest_framework.authentication import SessionAuthentication
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
+from rest_framework.response import Response
+
+from msbc_rbac.accounts.authentication import CachedTokenAuthentication
+from msbc_rbac.core.cache import get_cache_stats
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.services.access_tree import build_access_tree
+from msbc_rbac.core.services.batch_check import check_batch, policy_version_tag
+from msbc_rbac.core.services.stage_timing import get_stage_timings
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def cache_stats(request):
+    """Return hit / miss counters of the RBAC caches in the serving worker"""
+    return Response({'caches': get_cache_stats()})
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def stage_timings(request):
+    """Return per-stage RBACMiddleware latency histograms of the serving worker"""
+    return Response({'stages': get_stage_timings()})
+
+
+def _parse_checks(data):
+    """
+    ``(method, path)`` pairs from ``{"checks": [...]}``, whose items are
+    ``{"method": ..., "path": ...}`` objects or ``[method, path]`` pairs.
+    Returns ``None`` when malformed.
+    """
+    checks = data.get('checks') if isinstance(data, dict) else None
+    if not isinstance(checks, list):
+        return None
+
+    pairs = []
+    for item in checks:
+        if isinstance(item, dict):
+            item = (item.get('method'), item.get('path'))
+        if not isinstance(item, (list, tuple)) or len(item) != 2:
+            return None
+        method, path = item
+        if not isinstance(method, str) or not isinstance(path, str) or not path.startswith('/'):
+            return None
+        pairs.append((method, path))
+    return pairs
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+def check_batch_view(request):
+    """Return, per (method, path) pair, whether RBAC allows the requesting user to call it"""
+    checks = _parse_checks(request.data)
+    if checks is None:
+        return Response(
+            {'error': 'Expected {"checks": [{"method": "GET", "path": "/api/..."}, ...]}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    max_items = rbac_setting('RBAC_CHECK_BATCH_MAX_ITEMS')
+    if len(checks) > max_items:
+        return Response(
+            {'error': f'At most {max_items} checks per request'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    tenant = getattr(request.user, 'tenant', None)
+    if tenant is None:
+        return Response(
+            {'error': 'No tenant found for user'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    results = check_batch(tenant, request.user, checks)
+    return Response({'results': [result._asdict() for result in results]})
+
+
+class DecisionSessionAuthentication(SessionAuthentication):
+    """
+    Session authentication without the CSRF check: the session cookie is
+    forwarded by another service, and deciding has no side effects.
+    """
+
+    def enforce_csrf(self, request):
+        return
+
+
+@api_view(['POST'])
+@authentication_classes([CachedTokenAuthentication, DecisionSessionAuthentication])
+@permission_classes([IsAuthenticated])
+def decide_view(request):
+    """Return the RBAC decision for the requesting user on another service's request (remote mode)"""
+    method = request.data.get('method')
+    path = request.data.get('path')
+    route = request.data.get('route')
+    if not isinstance(method, str) or not isinstance(path, str) or not isinstance(route, (str, type(None))):
+        return Response(
+            {'error': 'Expected {"method": "GET", "path": "/api/...", "route": "api/.../" or null}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    tenant = getattr(request.user, 'tenant', None)
+    if tenant is None:
+        return Response(
+            {'error': 'No tenant found for user'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    result, = check_batch(tenant, request.user, [(method, path, route)], resolve_urls=False)
+    return Response({
+        'allowed': result.allowed,
+        'violation': result.violation,
+        'version': policy_version_tag(tenant, request.user),
+    })
+
+
+def _etag_matches(etag, if_none_match):
+    # Weak comparison (RFC 9110 13.1.2), as for If-None-Match
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+    return any(
+        (candidate[2:] if candidate.startswith('W/') else candidate) == etag
+        for candidate in parse_etags(if_none_match)
+    )
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def manifest_view(request):
+    """Return the requesting user's capability manifest: modules, submodules, action flags and blocked APIs"""
+    tenant = getattr(request.user, 'tenant', None)
+    if tenant is None:
+        return Response(
+            {'error': 'No tenant found for user'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    # The policy versions cover everything in the manifest, so an unchanged
+    # ETag is answered from one cache round trip, without building it.
+    version = policy_version_tag(tenant, request.user)
+    etag = quote_etag(f'{request.user.pk}.{version}')
+
+    if _etag_matches(etag, request.headers.get('If-None-Match')):
+        response = Response(status=status.HTTP_304_NOT_MODIFIED)
+    else:
+        response = Response({'version': version, **build_access_tree(tenant, request.user)})
+
+    response['ETag'] = etag
+    # Per-user content: private caches only, revalidated on every use
+    patch_cache_control(response, private=True, no_cache=True)
+    patch_vary_headers(response, ('Authorization', 'Cookie'))
+    return response
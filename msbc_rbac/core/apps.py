@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "msbc_rbac.core"
+
+    def ready(self):
+        # Register cache invalidation receivers
+        from msbc_rbac.core import signals  # noqa: F401
+        from msbc_rbac.core import checks  # noqa: F401
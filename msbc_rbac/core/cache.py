@@ -0,0 +1,248 @@
+"""
+Cache access for RBAC policy data.
+"""
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+
+from msbc_rbac.core.conf import rbac_setting
+
+
+def get_rbac_cache():
+    """
+    Return the Django cache backend configured via ``RBAC_CACHE_ALIAS``.
+    """
+    return caches[rbac_setting("RBAC_CACHE_ALIAS")]
+
+
+# ─────────────────────────────
+# Hit / miss accounting
+# ─────────────────────────────
+_registry = {}
+
+
+class CacheStats:
+    """
+    In-process hit / miss counters for one RBAC cache.
+
+    Counters are per worker process; they are reset on restart.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        _registry[name] = self
+
+    def hit(self):
+        self.hits += 1
+
+    def miss(self):
+        self.misses += 1
+
+    @property
+    def hit_ratio(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def snapshot(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hit_ratio, 4),
+        }
+
+    def reset(self):
+        self.hits = 0
+        self.misses = 0
+
+
+def get_cache_stats():
+    """
+    Return ``{cache_name: {"hits", "misses", "hit_ratio"}}`` for this process.
+    """
+    return {name: stats.snapshot() for name, stats in _registry.items()}
+
+
+def reset_cache_stats():
+    """
+    Zero every counter of this process.
+    """
+    for stats in _registry.values():
+        stats.reset()
+
+
+# ─────────────────────────────
+# In-process LRU
+# ─────────────────────────────
+_MISSING = object()
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded in-process cache with a per-entry TTL.
+
+    ``maxsize`` bounds the number of entries (least recently used are
+    evicted first); ``ttl`` is in seconds, ``None`` meaning no expiry.
+    """
+
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is _MISSING:
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                return default
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, expires=True):
+        """
+        Store ``value``; with ``expires=False`` the entry ignores the TTL
+        and only leaves through LRU eviction.
+        """
+        if self.maxsize <= 0:
+            return
+
+        expires_at = time.monotonic() + self.ttl if self.ttl and expires else None
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+# ─────────────────────────────
+# Two-tier cache
+# ─────────────────────────────
+# Pickles above this size are zlib-compressed before going to L2.
+COMPRESS_MIN_BYTES = 512
+
+_RAW = b"p"
+_COMPRESSED = b"z"
+
+
+def dumps(value):
+    """
+    Serialize ``value`` for L2: a pickle, compressed when large enough to
+    be worth it, behind a one-byte format marker.
+    """
+    data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+    if len(data) >= COMPRESS_MIN_BYTES:
+        return _COMPRESSED + zlib.compress(data)
+    return _RAW + data
+
+
+def loads(payload):
+    marker, data = payload[:1], payload[1:]
+    if marker == _COMPRESSED:
+        data = zlib.decompress(data)
+    return pickle.loads(data)
+
+
+class TieredCache:
+    """
+    In-process L1 (``LRUCache``) in front of the RBAC Django cache (L2).
+
+    L1 holds live objects for this worker; L2 holds ``dumps()`` payloads
+    shared by every worker on the same backend, so a cold worker loads
+    compiled policy data from L2 instead of the database.  L1 entries are
+    never invalidated, only aged out (``RBAC_L1_CACHE_SIZE`` /
+    ``RBAC_L1_CACHE_TTL``), so keys must carry the policy versions of the
+    data they hold.
+
+    Hits and misses are counted per tier as ``<name>.l1`` / ``<name>.l2``.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.l1_stats = CacheStats(f"{name}.l1")
+        self.l2_stats = CacheStats(f"{name}.l2")
+        self._l1 = None
+
+    def _local(self):
+        maxsize = rbac_setting("RBAC_L1_CACHE_SIZE")
+        ttl = rbac_setting("RBAC_L1_CACHE_TTL")
+        l1 = self._l1
+        if l1 is None or l1.maxsize != maxsize or l1.ttl != ttl:
+            l1 = self._l1 = LRUCache(maxsize, ttl)
+        return l1
+
+    def get(self, key, default=None):
+        l1 = self._local()
+        value = l1.get(key, _MISSING)
+        if value is not _MISSING:
+            self.l1_stats.hit()
+            return value
+        self.l1_stats.miss()
+
+        payload = get_rbac_cache().get(key)
+        if payload is None:
+            self.l2_stats.miss()
+            return default
+        self.l2_stats.hit()
+
+        value = loads(payload)
+        l1.set(key, value)
+        return value
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._local().set(key, value)
+        get_rbac_cache().set(key, dumps(value), timeout)
+
+    async def aget(self, key, default=None):
+        l1 = self._local()
+        value = l1.get(key, _MISSING)
+        if value is not _MISSING:
+            self.l1_stats.hit()
+            return value
+        self.l1_stats.miss()
+
+        payload = await get_rbac_cache().aget(key)
+        if payload is None:
+            self.l2_stats.miss()
+            return default
+        self.l2_stats.hit()
+
+        value = loads(payload)
+        l1.set(key, value)
+        return value
+
+    async def aset(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._local().set(key, value)
+        await get_rbac_cache().aset(key, dumps(value), timeout)
+
+    def pin(self, key, value):
+        """
+        Hold ``value`` in this worker's L1 without a TTL (e.g. data preloaded
+        before forking, which would otherwise age out of every worker).
+        """
+        self._local().set(key, value, expires=False)
+
+    def clear_local(self):
+        """
+        Drop this worker's L1 entries (L2 is left alone).
+        """
+        self._local().clear()
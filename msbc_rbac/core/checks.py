@@ -0,0 +1,32 @@
+"""
+System checks for the RBAC configuration.
+"""
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+from msbc_rbac.core.conf import rbac_setting
+
+PROCESS_LOCAL_CACHES = (
+    "django.core.cache.backends.locmem.LocMemCache",
+)
+
+
+def rbac_cache_is_process_local():
+    """
+    True when the ``RBAC_CACHE_ALIAS`` backend is private to each process.
+    """
+    backend = settings.CACHES.get(rbac_setting("RBAC_CACHE_ALIAS"), {}).get("BACKEND")
+    return backend in PROCESS_LOCAL_CACHES
+
+
+@register(Tags.caches)
+def check_rbac_cache(app_configs, **kwargs):
+    if rbac_cache_is_process_local() and not rbac_setting("RBAC_POLICY_SYNC"):
+        return [Warning(
+            "The RBAC cache is a per-process LocMemCache and RBAC_POLICY_SYNC is off: "
+            "policy version bumps only reach the process that made them.",
+            hint="Point RBAC_CACHE_ALIAS at a shared cache (Redis, memcached) or "
+                 "set RBAC_POLICY_SYNC when running more than one worker.",
+            id="msbc_rbac.W001",
+        )]
+    return []
@@ -5,12 +5,123 @@ To customize these settings, add them to your Django project's settings.py file.
 """
 from django.conf import settings
 
+
+# ─────────────────────────────
+# Package defaults
+# ─────────────────────────────
+RBAC_DEFAULTS = {
+    # Django cache alias holding shared RBAC state (policy versions, cached
+    # lookups).  Point this at a shared backend (Redis / memcached) when
+    # running more than one worker so invalidations reach every process.
+    "RBAC_CACHE_ALIAS": "default",
+
+    # Seconds a user's effective permission set stays cached.  Entries are
+    # also invalidated by policy version bumps.  0 disables the cache.
+    "RBAC_PERMISSION_CACHE_TIMEOUT": 300,
+
+    # Seconds CachedTokenAuthentication keeps a token with its user and
+    # tenant.  Entries are also invalidated by user policy version bumps
+    # (token deleted, user saved).  0 disables the cache.
+    "RBAC_TOKEN_CACHE_TIMEOUT": 300,
+
+    # Seconds a built sidebar stays cached, shared by the users of a tenant
+    # with the same role set.  Entries are also invalidated by policy
+    # version bumps.  0 disables the cache.
+    "RBAC_SIDEBAR_CACHE_TIMEOUT": 300,
+
+    # Seconds a user's access tree (dashboard, get_user_role_permission)
+    # stays cached.  Entries are also invalidated by policy version bumps.
+    # 0 disables the cache.
+    "RBAC_ACCESS_TREE_CACHE_TIMEOUT": 300,
+
+    # Signed claims tokens (see ``core.services.claims``): issue them from
+    # the token endpoint and authorize "Authorization: Claims <token>"
+    # requests from the claims while their policy versions are current.
+    # The secret (default SECRET_KEY) must match on every service.
+    "RBAC_CLAIMS_TOKENS": False,
+    "RBAC_CLAIMS_SECRET": None,
+    "RBAC_CLAIMS_TTL": 300,
+
+    # In-process L1 in front of the RBAC cache for compiled route tables,
+    # tenant policies and user role sets.  Keys are versioned, so the TTL
+    # (seconds) only bounds how long unused entries stay in memory.
+    "RBAC_L1_CACHE_SIZE": 1024,
+    "RBAC_L1_CACHE_TTL": 300,
+
+    # Compile the route table and module catalogue when RBACMiddleware is
+    # loaded (once per process, right after app loading; in the gunicorn
+    # master under preload_app) instead of on the first requests.
+    "RBAC_WARMUP": False,
+
+    # Propagate policy version bumps to workers that do not share the RBAC
+    # cache (see ``core.services.policy_sync``):
+    #   None      off
+    #   "auto"    LISTEN / NOTIFY on PostgreSQL, polling elsewhere
+    #   "listen"  LISTEN / NOTIFY (PostgreSQL only)
+    #   "poll"    poll the PolicyVersion table every
+    #             RBAC_POLICY_POLL_INTERVAL seconds (also the listener's
+    #             wait timeout)
+    "RBAC_POLICY_SYNC": None,
+    "RBAC_POLICY_POLL_INTERVAL": 2,
+
+    # How RBACMiddleware fetches policy inputs:
+    #   "default"       one query per policy step (cached where possible)
+    #   "single_query"  every input in one SQL statement per request
+    #   "remote"        ask the central RBAC service at RBAC_REMOTE_URL
+    "RBAC_DECISION_MODE": "default",
+
+    # Remote decisions (see ``core.services.remote_decision``):
+    #   RBAC_REMOTE_URL          the central service's /api/rbac/ URL
+    #   RBAC_REMOTE_TIMEOUT      seconds per HTTP request
+    #   RBAC_REMOTE_POOL_SIZE    keep-alive connections kept per worker
+    #   RBAC_REMOTE_FRESH_TTL    seconds a decision is served as is
+    #   RBAC_REMOTE_STALE_TTL    seconds it is served while revalidating
+    # Up to RBAC_DECISION_CACHE_SIZE decisions are cached per worker.
+    "RBAC_REMOTE_URL": None,
+    "RBAC_REMOTE_TIMEOUT": 2,
+    "RBAC_REMOTE_POOL_SIZE": 10,
+    "RBAC_REMOTE_FRESH_TTL": 5,
+    "RBAC_REMOTE_STALE_TTL": 60,
+
+    # Per-worker LRU of final allow / deny decisions.  Entries are keyed by
+    # the route, tenant and user policy versions, so a version bump makes
+    # them unreachable; the TTL (seconds) bounds their lifetime otherwise.
+    # A size of 0 disables the cache.
+    "RBAC_DECISION_CACHE_SIZE": 10000,
+    "RBAC_DECISION_CACHE_TTL": 60,
+
+    # Largest number of (method, path) pairs accepted by one
+    # POST /api/rbac/check-batch request.
+    "RBAC_CHECK_BATCH_MAX_ITEMS": 1000,
+
+    # Per-stage timing of RBACMiddleware (durations + query counts):
+    #   RBAC_TIMING_HEADER      add a Server-Timing header to responses
+    #   RBAC_TIMING_HISTOGRAMS  aggregate into per-worker histograms
+    "RBAC_TIMING_HEADER": False,
+    "RBAC_TIMING_HISTOGRAMS": False,
+
+    # Maintain the materialized UserEffectivePermission table from signals
+    # and read it instead of the Permission / Role / UserRole join (sidebar,
+    # single_query decisions; the access tree and default decisions use the
+    # per-tenant PermissionIndex either way).  Run
+    # ``manage.py rebuild_effective_permissions`` after enabling.
+    "RBAC_EFFECTIVE_PERMISSIONS": False,
+}
+
+
 def get_rbac_tenant_model():
     """
     Return the Tenant model that is active in this project.
     """
     return getattr(settings, 'RBAC_TENANT_MODEL', 'core.Tenant')
 
+
+def rbac_setting(name):
+    """
+    Return an RBAC setting from the project settings, falling back to the
+    package default declared in ``RBAC_DEFAULTS``.
+    """
+    return getattr(settings, name, RBAC_DEFAULTS[name])
+
 # Note: User model is configured via Django's AUTH_USER_MODEL setting
 # AUTH_USER_MODEL = 'accounts.User'  # or your custom user model
-
@@ -8,6 +8,7 @@ and returned as a descriptive 403 with the exact rule that was violated.
 import logging
 import traceback
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.core.exceptions import PermissionDenied, ValidationError
 from django.http import Http404, JsonResponse
@@ -29,10 +30,16 @@ class JSONExceptionMiddleware:
       5. Anything else         → 500  (traceback included in DEBUG mode)
     """
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
+        # In async mode this returns the handler's coroutine unchanged.
         return self.get_response(request)
 
     def process_exception(self, request, exception):
@@ -1,15 +1,29 @@
 from django.core.management.base import BaseCommand
 from django.apps import apps
-from django.urls import get_resolver, URLPattern, URLResolver
+from django.db import transaction
+from django.urls import get_resolver, LocalePrefixPattern, URLPattern, URLResolver
 from rest_framework.views import APIView
+import hashlib
+import json
 import re
 
-from msbc_rbac.core.models import ApiEndpoint, ApiOperation, Module, SubModule
+from msbc_rbac.core.models import ApiEndpoint, ApiOperation, ApiSyncFingerprint, Module, SubModule
+from msbc_rbac.core.services import policy_version
+
+BATCH_SIZE = 500
 
 
 class Command(BaseCommand):
     """
     Auto sync APIs + Module/SubModule from Django apps.py metadata.
+
+    The existing registry is loaded once and diffed against the URL conf;
+    the diff is applied with bulk inserts / updates in one transaction.
+
+    The rows each app contributes are fingerprinted; apps whose fingerprint
+    matches the last run are left out of the diff, and when no app changed
+    the registry is not read at all.  Fingerprints of apps missing from the
+    URL conf are only dropped with ``--prune``.
     """
 
     help = "Auto sync APIs + module/submodule from apps.py"
@@ -29,93 +43,283 @@ class Command(BaseCommand):
         "/accounts/",
         "/api/schema",
         "/api/docs",
+        "/api/rbac/",
     )
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Print the changes without applying them",
+        )
+        parser.add_argument(
+            "--prune",
+            action="store_true",
+            help="Delete endpoints and operations no longer served by any URL pattern",
+        )
+        parser.add_argument(
+            "--force",
+            action="store_true",
+            help="Sync every app, even those whose fingerprint is unchanged",
+        )
+
     def handle(self, *args, **options):
         resolver = get_resolver()
         urlpatterns = []
-        self._collect_urlpatterns(resolver.url_patterns, urlpatterns, "")
+        self._collect_urlpatterns(resolver.url_patterns, urlpatterns, "", "")
 
-        system_module = self._get_or_create_module("SYSTEM", "System")
+        endpoints, modules, submodules, fingerprints = self._desired_registry(urlpatterns, options["prune"])
+
+        stored = dict(ApiSyncFingerprint.objects.values_list("app_label", "fingerprint"))
+        if options["force"]:
+            changed_apps = set(fingerprints)
+        else:
+            changed_apps = {label for label, fingerprint in fingerprints.items() if stored.get(label) != fingerprint}
+        # Apps this URL conf does not serve may be synced by another service
+        # sharing the registry: their fingerprints are kept, unless --prune
+        # declares this URL conf the whole registry.
+        removed_apps = set(stored) - set(fingerprints) if options["prune"] else set()
+
+        if not changed_apps and not removed_apps:
+            self.stdout.write(self.style.SUCCESS(
+                f"✔ API registry unchanged ({len(fingerprints)} apps), nothing to sync"
+            ))
+            return
+
+        diff = self._diff(endpoints, modules, submodules, options["prune"], changed_apps)
+
+        if options["dry_run"]:
+            for label in sorted(changed_apps | removed_apps):
+                self.stdout.write(f"* app {label or '(project)'}")
+            self._print_diff(diff)
+            self.stdout.write(self.style.WARNING("Dry run: no changes saved"))
+            return
+
+        with transaction.atomic():
+            self._apply(diff)
+            # Bulk writes send no signals: invalidate cached route tables here
+            if any(diff.values()):
+                policy_version.bump_version_on_commit(policy_version.ROUTES)
+
+            ApiSyncFingerprint.objects.filter(app_label__in=changed_apps | removed_apps).delete()
+            ApiSyncFingerprint.objects.bulk_create([
+                ApiSyncFingerprint(app_label=label, fingerprint=fingerprints[label])
+                for label in changed_apps
+            ])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ API Sync Completed\n"
+            f"Apps synced: {len(changed_apps)} of {len(fingerprints)}\n"
+            f"Endpoints created: {len(diff['endpoints'])}\n"
+            f"Operations created: {len(diff['operations'])}\n"
+            f"Module mappings updated: {sum('module' in changes for _, changes in diff['endpoint_updates'])}\n"
+            f"Routes updated: {sum('route' in changes for _, changes in diff['endpoint_updates'])}"
+            + (
+                f"\nEndpoints removed: {len(diff['stale_endpoints'])}\n"
+                f"Operations removed: {len(diff['stale_operations'])}"
+                if options["prune"] else ""
+            )
+        ))
 
-        created_endpoints = 0
-        created_operations = 0
-        updated_module_map = 0
+    # ─────────────────────────────
+    # Diff
+    # ─────────────────────────────
+    def _desired_registry(self, urlpatterns, prune):
+        """
+        Registry described by the URL conf: ``{path: {"route", "module",
+        "submodule", "methods": {METHOD: permission_code}, "apps"}}``, the
+        module and submodule names it needs and a fingerprint per app label
+        (``""`` for views outside any app).
+        """
+        endpoints = {}
+        modules = {"SYSTEM": "System"}
+        submodules = {}
+        app_rows = {}
 
-        for raw_path, callback in urlpatterns:
+        for raw_path, route, callback in urlpatterns:
             path = self._normalize_path(raw_path)
 
             if self._should_skip_path(path):
                 continue
 
             # Detect module/submodule from app config
-            module_obj, submodule_obj = self._resolve_module_from_callback(callback)
-
-            if not module_obj:
-                module_obj = system_module
-                submodule_obj = None
-
-            # Create endpoint
-            endpoint, ep_created = ApiEndpoint.objects.get_or_create(
-                path=path,
-                defaults={
-                    "module": module_obj,
-                    "submodule": submodule_obj,
-                },
-            )
+            module_code, submodule_code = self._resolve_module_from_callback(callback)
 
-            # Update module mapping if changed
-            if not ep_created and (
-                    endpoint.module != module_obj or endpoint.submodule != submodule_obj
-            ):
-                endpoint.module = module_obj
-                endpoint.submodule = submodule_obj
-                endpoint.save(update_fields=["module", "submodule"])
-                updated_module_map += 1
+            if module_code:
+                modules.setdefault(module_code, module_code.title())
+                submodules.setdefault(submodule_code, submodule_code.title())
+            else:
+                module_code = "SYSTEM"
+                submodule_code = None
 
-            if ep_created:
-                created_endpoints += 1
+            # The first pattern normalizing to a path binds its route, the
+            # last one its module mapping
+            endpoint = endpoints.setdefault(path, {"route": route, "methods": {}, "apps": set()})
+            endpoint["module"] = module_code
+            endpoint["submodule"] = submodule_code
 
             # Resolve methods and action names
-            actions_map = self._resolve_actions(callback)
-
-            for method, action_name in actions_map.items():
-                std_action = action_name
-                if action_name in ['list', 'retrieve']:
-                    std_action = 'view'
-                elif action_name in ['create']:
-                    std_action = 'create'
-                elif action_name in ['update', 'partial_update']:
-                    std_action = 'update'
-                elif action_name in ['destroy']:
-                    std_action = 'delete'
-
-                # Format: submodule.action (e.g., enquiry.view, enquiry.qualify)
-
-
-                _, created = ApiOperation.objects.get_or_create(
-                    endpoint=endpoint,
-                    http_method=method.upper(),
-                    defaults={
-                        "permission_code": std_action,
-                        "is_enabled": True,
-                    },
-                )
-
-                if created:
-                    created_operations += 1
+            methods = {
+                method.upper(): self._standard_action(action_name)
+                for method, action_name in self._resolve_actions(callback).items()
+            }
+            for method, permission_code in methods.items():
+                endpoint["methods"].setdefault(method, permission_code)
+
+            app_label = self._app_label(callback)
+            endpoint["apps"].add(app_label)
+            app_rows.setdefault(app_label, []).append(
+                [path, route, module_code, submodule_code, sorted(methods.items())]
+            )
 
-        self.stdout.write(self.style.SUCCESS(
-            f"✔ API Sync Completed\n"
-            f"Endpoints created: {created_endpoints}\n"
-            f"Operations created: {created_operations}\n"
-            f"Module mappings updated: {updated_module_map}"
-        ))
+        # Pattern order matters (first route / last module wins), so rows
+        # are hashed in URL conf order.  Pruning changes what a sync does,
+        # so switching --prune on or off resyncs every app.
+        fingerprints = {
+            label: hashlib.sha256(json.dumps([prune, rows]).encode()).hexdigest()
+            for label, rows in app_rows.items()
+        }
+        return endpoints, modules, submodules, fingerprints
 
+    def _diff(self, endpoints, modules, submodules, prune, apps):
+        """
+        Compare the desired registry of the endpoints served by ``apps``
+        with the database (four queries).  Pruning considers every app.
+        """
+        existing_modules = set(Module.objects.values_list("code", flat=True))
+        existing_submodules = set(SubModule.objects.values_list("code", flat=True))
+
+        existing = {}
+        for endpoint in ApiEndpoint.objects.order_by("pk"):
+            existing.setdefault(endpoint.path, endpoint)
+
+        existing_operations = {}
+        for op_id, endpoint_id, method in ApiOperation.objects.values_list("id", "endpoint_id", "http_method"):
+            existing_operations[(endpoint_id, method)] = op_id
+
+        diff = {
+            "modules": [
+                Module(code=code, name=name)
+                for code, name in modules.items() if code not in existing_modules
+            ],
+            "submodules": [
+                SubModule(code=code, name=name)
+                for code, name in submodules.items() if code not in existing_submodules
+            ],
+            "endpoints": [],
+            "endpoint_updates": [],
+            "operations": [],
+            "stale_endpoints": [],
+            "stale_operations": [],
+        }
+
+        for path, desired in endpoints.items():
+            if not desired["apps"] & apps:
+                continue
 
-    def _collect_urlpatterns(self, patterns, urlpatterns, prefix):
+            endpoint = existing.get(path)
+            if endpoint is None:
+                diff["endpoints"].append(ApiEndpoint(
+                    path=path,
+                    route=desired["route"],
+                    module_id=desired["module"],
+                    submodule_id=desired["submodule"],
+                ))
+            else:
+                changes = {}
+                if endpoint.route != desired["route"]:
+                    changes["route"] = (endpoint.route, desired["route"])
+                if (endpoint.module_id, endpoint.submodule_id) != (desired["module"], desired["submodule"]):
+                    changes["module"] = (
+                        (endpoint.module_id, endpoint.submodule_id),
+                        (desired["module"], desired["submodule"]),
+                    )
+                if changes:
+                    diff["endpoint_updates"].append((endpoint, changes))
+
+            endpoint_id = endpoint.pk if endpoint is not None else None
+            for method, permission_code in desired["methods"].items():
+                if (endpoint_id, method) not in existing_operations:
+                    diff["operations"].append((path, endpoint_id, method, permission_code))
+
+        if prune:
+            for path, endpoint in existing.items():
+                if path not in endpoints and not self._should_skip_path(path):
+                    diff["stale_endpoints"].append(endpoint)
+            endpoint_paths = {endpoint.pk: path for path, endpoint in existing.items()}
+            for (endpoint_id, method), op_id in existing_operations.items():
+                path = endpoint_paths.get(endpoint_id)
+                if path in endpoints and method not in endpoints[path]["methods"]:
+                    diff["stale_operations"].append((op_id, path, method))
+
+        return diff
+
+    def _apply(self, diff):
+        Module.objects.bulk_create(diff["modules"])
+        SubModule.objects.bulk_create(diff["submodules"])
+
+        created = ApiEndpoint.objects.bulk_create(diff["endpoints"], batch_size=BATCH_SIZE)
+        endpoint_ids = {endpoint.path: endpoint.pk for endpoint in created}
+        if created and created[0].pk is None:
+            # Backend without RETURNING on bulk inserts: read the new ids back
+            endpoint_ids = dict(ApiEndpoint.objects.order_by("-pk").values_list("path", "id"))
+
+        for endpoint, changes in diff["endpoint_updates"]:
+            if "route" in changes:
+                endpoint.route = changes["route"][1]
+            if "module" in changes:
+                endpoint.module_id, endpoint.submodule_id = changes["module"][1]
+        ApiEndpoint.objects.bulk_update(
+            [endpoint for endpoint, _ in diff["endpoint_updates"]],
+            ["route", "module", "submodule"],
+            batch_size=BATCH_SIZE,
+        )
+
+        ApiOperation.objects.bulk_create(
+            [
+                ApiOperation(
+                    endpoint_id=endpoint_id or endpoint_ids[path],
+                    http_method=method,
+                    permission_code=permission_code,
+                    is_enabled=True,
+                )
+                for path, endpoint_id, method, permission_code in diff["operations"]
+            ],
+            batch_size=BATCH_SIZE,
+        )
+
+        # Deleting cascades to tenant overrides and user blocks, whose own
+        # signals invalidate the affected tenants and users
+        stale_operations = [op_id for op_id, _, _ in diff["stale_operations"]]
+        stale_endpoints = [endpoint.pk for endpoint in diff["stale_endpoints"]]
+        for start in range(0, len(stale_operations), BATCH_SIZE):
+            ApiOperation.objects.filter(pk__in=stale_operations[start:start + BATCH_SIZE]).delete()
+        for start in range(0, len(stale_endpoints), BATCH_SIZE):
+            ApiEndpoint.objects.filter(pk__in=stale_endpoints[start:start + BATCH_SIZE]).delete()
+
+    def _print_diff(self, diff):
+        for module in diff["modules"]:
+            self.stdout.write(f"+ module {module.code}")
+        for submodule in diff["submodules"]:
+            self.stdout.write(f"+ submodule {submodule.code}")
+        for endpoint in diff["endpoints"]:
+            self.stdout.write(
+                f"+ endpoint {endpoint.path} [{endpoint.module_id}/{endpoint.submodule_id or '-'}] {endpoint.route}"
+            )
+        for endpoint, changes in diff["endpoint_updates"]:
+            for field, (old, new) in changes.items():
+                self.stdout.write(f"~ endpoint {endpoint.path} {field}: {old} -> {new}")
+        for path, _, method, permission_code in diff["operations"]:
+            self.stdout.write(f"+ operation {method} {path} ({permission_code})")
+        for _, path, method in diff["stale_operations"]:
+            self.stdout.write(self.style.WARNING(f"- operation {method} {path}"))
+        for endpoint in diff["stale_endpoints"]:
+            self.stdout.write(self.style.WARNING(f"- endpoint {endpoint.path}"))
+
+    def _collect_urlpatterns(self, patterns, urlpatterns, prefix, route_prefix):
         for pattern in patterns:
             raw = str(pattern.pattern)
+            route = self._join_route(route_prefix, raw)
 
             # Strip regex markers early
             if raw.startswith("^"):
@@ -126,15 +330,31 @@ class Command(BaseCommand):
             full_path = prefix + raw
 
             if isinstance(pattern, URLPattern):
-                urlpatterns.append((full_path, pattern.callback))
+                urlpatterns.append((full_path, route, pattern.callback))
 
             elif isinstance(pattern, URLResolver):
+                if isinstance(pattern.pattern, LocalePrefixPattern):
+                    # Registered without the language prefix, which
+                    # RBACMiddleware strips from requests
+                    full_path, route = prefix, route_prefix
                 self._collect_urlpatterns(
                     pattern.url_patterns,
                     urlpatterns,
-                    full_path
+                    full_path,
+                    route
                 )
 
+    @staticmethod
+    def _join_route(route1, route2):
+        """
+        Join routes the way ``URLResolver`` builds ``ResolverMatch.route``.
+        """
+        if not route1:
+            return route2
+        if route2.startswith("^"):
+            route2 = route2[1:]
+        return route1 + route2
+
     def _resolve_module_from_callback(self, callback):
         """
         Detect Django app from callback and read RBAC_MODULE / RBAC_SUBMODULE
@@ -164,13 +384,16 @@ class Command(BaseCommand):
             if not module_code:
                 continue
 
-            module_obj = self._get_or_create_module(module_code, module_code.title())
-            submodule_obj = self._get_or_create_submodule(submodule_code, submodule_code.title())
-
-            return module_obj, submodule_obj
+            return module_code, submodule_code
 
         return None, None
 
+    @staticmethod
+    def _app_label(callback):
+        view_cls = getattr(callback, "cls", None)
+        app_config = apps.get_containing_app_config((view_cls or callback).__module__)
+        return app_config.label if app_config else ""
+
     def _normalize_path(self, raw_path):
         path = raw_path
 
@@ -218,8 +441,13 @@ class Command(BaseCommand):
     def _should_skip_path(self, path):
         return any(path.startswith(p) for p in self.SKIP_PATH_PREFIXES)
 
-    def _get_or_create_module(self, code, name):
-        return Module.objects.get_or_create(code=code, defaults={"name": name})[0]
-
-    def _get_or_create_submodule(self, code, name):
-        return SubModule.objects.get_or_create(code=code, defaults={"name": name})[0]
+    @staticmethod
+    def _standard_action(action_name):
+        if action_name in ['list', 'retrieve']:
+            return 'view'
+        if action_name in ['update', 'partial_update']:
+            return 'update'
+        if action_name in ['destroy']:
+            return 'delete'
+        # create and custom @action names are kept as is
+        return action_name
@@ -8,24 +8,39 @@ This command:
 4. Removes unused actions
 5. Consolidates duplicate format suffix endpoints
 
+Endpoints are streamed in chunks of ``--batch-size`` rows; the changes of
+each chunk are computed in memory and written with bulk updates / inserts
+in their own short transaction.
+
 Usage:
     python manage.py cleanup_api_endpoints --dry-run  # Preview changes
     python manage.py cleanup_api_endpoints             # Execute cleanup
 """
+import re
+import time
+
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from core.models import (
+
+from msbc_rbac.core.models import (
     ApiEndpoint,
     ApiOperation,
     Module,
     SubModule,
 )
-import re
+from msbc_rbac.core.services import policy_version
 
 
 class Command(BaseCommand):
     help = "Clean up and fix API endpoint registrations"
 
+    # Operations every standard detail endpoint (/api/things/{id}/) serves
+    DETAIL_METHODS = (
+        ('PUT', 'update'),
+        ('PATCH', 'update'),
+        ('DELETE', 'delete'),
+    )
+
     def add_arguments(self, parser):
         parser.add_argument(
             '--dry-run',
@@ -47,13 +62,23 @@ class Command(BaseCommand):
             action='store_true',
             help='Skip adding missing operations',
         )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Rows read and written per batch (default: 1000)',
+        )
 
     def handle(self, *args, **options):
         self.dry_run = options['dry_run']
-        
+        self.batch_size = max(options['batch_size'], 1)
+        # Cleaned paths by endpoint id, so later steps of a dry run see
+        # the paths a real run would have written
+        self.cleaned_paths = {}
+
         if self.dry_run:
             self.stdout.write(self.style.WARNING("\n🔍 DRY RUN MODE - No changes will be saved\n"))
-        
+
         self.stdout.write(self.style.SUCCESS("="*80))
         self.stdout.write(self.style.SUCCESS("API ENDPOINT CLEANUP"))
         self.stdout.write(self.style.SUCCESS("="*80 + "\n"))
@@ -66,243 +91,251 @@ class Command(BaseCommand):
             'format_suffixes_removed': 0,
             'actions_removed': 0,
         }
+        self.rows_scanned = 0
+        started = time.monotonic()
+
+        # Step 1: Clean up paths
+        if not options['skip_paths']:
+            self._clean_paths()
+
+        # Step 2: Fix module mappings
+        if not options['skip_modules']:
+            self._fix_module_mappings()
+
+        # Step 3: Add missing operations
+        if not options['skip_operations']:
+            self._add_missing_operations()
+
+        # Step 4: Remove unused action
+        self._remove_unused_actions()
+
+        # Bulk writes send no signals: invalidate cached route tables here
+        if not self.dry_run and sum(self.stats.values()):
+            policy_version.bump_version(policy_version.ROUTES)
+
+        self.elapsed = time.monotonic() - started
 
-        try:
-            with transaction.atomic():
-                # Step 1: Clean up paths
-                if not options['skip_paths']:
-                    self._clean_paths()
-                
-                # Step 2: Fix module mappings
-                if not options['skip_modules']:
-                    self._fix_module_mappings()
-                
-                # Step 3: Add missing operations
-                if not options['skip_operations']:
-                    self._add_missing_operations()
-                
-                # Step 4: Remove unused action
-                self._remove_unused_actions()
-                
-                if self.dry_run:
-                    raise Exception("Dry run - rolling back transaction")
-                
-        except Exception as e:
-            if self.dry_run:
-                self.stdout.write(self.style.WARNING("\n✓ Dry run completed - no changes saved"))
-            else:
-                self.stdout.write(self.style.ERROR(f"\n✗ Error: {e}"))
-                raise
-        
         # Print summary
         self._print_summary()
 
+    # ─────────────────────────────
+    # Batching helpers
+    # ─────────────────────────────
+    def _stream(self, queryset, *fields):
+        """
+        Yield lists of up to ``batch_size`` value tuples, reading the rows
+        in primary key order with a server-side cursor where available.
+        """
+        batch = []
+        rows = queryset.order_by('pk').values_list('pk', *fields).iterator(chunk_size=self.batch_size)
+        for row in rows:
+            self.rows_scanned += 1
+            batch.append(row)
+            if len(batch) >= self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _rate(self, rows, started):
+        elapsed = time.monotonic() - started
+        return f"{rows} rows in {elapsed:.2f}s, {rows / elapsed if elapsed else 0:,.0f} rows/s"
+
+    # ─────────────────────────────
+    # Step 1
+    # ─────────────────────────────
     def _clean_paths(self):
         """Remove regex patterns from endpoint paths"""
         self.stdout.write(self.style.SUCCESS("\n📝 Step 1: Cleaning endpoint paths"))
         self.stdout.write("-" * 80)
-        
-        endpoints = ApiEndpoint.objects.all()
-        
-        for endpoint in endpoints:
-            original_path = endpoint.path
-            cleaned_path = self._clean_path(original_path)
-            
-            if cleaned_path != original_path:
-                self.stdout.write(
-                    f"  {self.style.WARNING('CLEAN')}: {original_path}\n"
-                    f"      → {cleaned_path}"
-                )
-                endpoint.path = cleaned_path
-                
-                if not self.dry_run:
-                    endpoint.save()
-                
-                self.stats['paths_cleaned'] += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(f"\n✓ Cleaned {self.stats['paths_cleaned']} paths")
-        )
+
+        started, scanned = time.monotonic(), self.rows_scanned
+
+        for batch in self._stream(ApiEndpoint.objects.all(), 'path'):
+            changed = []
+            for pk, original_path in batch:
+                cleaned_path = self._clean_path(original_path)
+
+                if cleaned_path != original_path:
+                    self.stdout.write(
+                        f"  {self.style.WARNING('CLEAN')}: {original_path}\n"
+                        f"      → {cleaned_path}"
+                    )
+                    self.cleaned_paths[pk] = cleaned_path
+                    changed.append(ApiEndpoint(pk=pk, path=cleaned_path))
+
+            if changed and not self.dry_run:
+                with transaction.atomic():
+                    ApiEndpoint.objects.bulk_update(changed, ['path'], batch_size=self.batch_size)
+            self.stats['paths_cleaned'] += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ Cleaned {self.stats['paths_cleaned']} paths "
+            f"({self._rate(self.rows_scanned - scanned, started)})"
+        ))
 
     def _clean_path(self, path):
         """Convert regex path to clean REST path"""
         # Remove leading /api/^ if present
         if '/^' in path:
             path = path.replace('/^', '/')
-        
+
         # Replace (?P<pk>[^/.]+) with {id}
         path = re.sub(r'\(\?P<pk>\[.*?\]\+?\)', '{id}', path)
-        
+
         # Replace (?P<format>[a-z0-9]+) patterns - remove format suffix endpoints
         path = re.sub(r'\\\.?\(\?P<format>\[.*?\]\+?\)/?\$?', '', path)
-        
+
         # Remove trailing regex patterns
         path = re.sub(r'/?\$+$', '/', path)
         path = re.sub(r'/\$$', '/', path)
-        
+
         # Ensure trailing slash
         if not path.endswith('/') and path != '/':
             path += '/'
-        
+
         # Clean double slashes
         path = re.sub(r'/+', '/', path)
-        
+
         return path
 
+    # ─────────────────────────────
+    # Step 2
+    # ─────────────────────────────
     def _fix_module_mappings(self):
         """Fix incorrect module/submodule mappings"""
         self.stdout.write(self.style.SUCCESS("\n🔧 Step 2: Fixing module mappings"))
         self.stdout.write("-" * 80)
-        
+
+        started, scanned = time.monotonic(), self.rows_scanned
+
         # Fix: Organizations should be CRM/ORGS not OPS/REPORTS
-        try:
-            crm_module = Module.objects.get(code='CRM')
-            
+        if Module.objects.filter(code='CRM').exists():
             # Create ORGS submodule if it doesn't exist
-            orgs_submodule, created = SubModule.objects.get_or_create(
-                code='ORGS',
-                defaults={'name': 'Organizations'}
-            )
-            
-            if created:
-                self.stdout.write(
-                    self.style.SUCCESS(f"  ✓ Created SubModule: ORGS (Organizations)")
-                )
-            
-            # Find organization endpoints
-            org_endpoints = ApiEndpoint.objects.filter(
-                path__icontains='organizations'
-            )
-            
-            for endpoint in org_endpoints:
-                old_module = endpoint.module.code if endpoint.module else 'NULL'
-                old_submodule = endpoint.submodule.code if endpoint.submodule else 'NULL'
-                
-                endpoint.module = crm_module
-                endpoint.submodule = orgs_submodule
-                
+            if not SubModule.objects.filter(code='ORGS').exists():
                 if not self.dry_run:
-                    endpoint.save()
-                
+                    SubModule.objects.bulk_create(
+                        [SubModule(code='ORGS', name='Organizations')],
+                        ignore_conflicts=True,
+                    )
                 self.stdout.write(
-                    f"  {self.style.WARNING('FIX')}: {endpoint.path}\n"
-                    f"      {old_module}/{old_submodule} → CRM/ORGS"
+                    self.style.SUCCESS("  ✓ Created SubModule: ORGS (Organizations)")
                 )
-                self.stats['modules_fixed'] += 1
-        
-        except Module.DoesNotExist:
+
+            # Find organization endpoints not mapped to CRM/ORGS yet
+            org_endpoints = ApiEndpoint.objects.filter(path__icontains='organizations')
+
+            for batch in self._stream(org_endpoints, 'path', 'module_id', 'submodule_id'):
+                fixed = []
+                for pk, path, module_id, submodule_id in batch:
+                    path = self.cleaned_paths.get(pk, path)
+                    if (module_id, submodule_id) == ('CRM', 'ORGS'):
+                        continue
+
+                    self.stdout.write(
+                        f"  {self.style.WARNING('FIX')}: {path}\n"
+                        f"      {module_id or 'NULL'}/{submodule_id or 'NULL'} → CRM/ORGS"
+                    )
+                    fixed.append(pk)
+
+                if fixed and not self.dry_run:
+                    with transaction.atomic():
+                        ApiEndpoint.objects.filter(pk__in=fixed).update(module='CRM', submodule='ORGS')
+                self.stats['modules_fixed'] += len(fixed)
+
+        else:
             self.stdout.write(
                 self.style.ERROR("  ✗ CRM module not found - skipping")
             )
-        
+
         # Fix: Empty module cleanup
-        empty_module_endpoints = ApiEndpoint.objects.filter(module__code='')
-        if empty_module_endpoints.exists():
+        empty_module_count = ApiEndpoint.objects.filter(module__code='').count()
+        if empty_module_count:
             self.stdout.write(
-                self.style.WARNING(f"\n  ⚠ Found {empty_module_endpoints.count()} endpoints with empty module")
+                self.style.WARNING(f"\n  ⚠ Found {empty_module_count} endpoints with empty module")
             )
             # These should be manually reviewed
-        
-        self.stdout.write(
-            self.style.SUCCESS(f"\n✓ Fixed {self.stats['modules_fixed']} module mappings")
-        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ Fixed {self.stats['modules_fixed']} module mappings "
+            f"({self._rate(self.rows_scanned - scanned, started)})"
+        ))
+
+    # ─────────────────────────────
+    # Step 3
+    # ─────────────────────────────
+    def _is_detail_path(self, path):
+        # Skip if not a detail endpoint or if it's a custom action
+        if '{id}' not in path:
+            return False
+
+        # Custom action endpoints (e.g., /api/enquiries/{id}/close/) are
+        # not standard detail endpoints like /api/enquiries/{id}/
+        path_parts = path.rstrip('/').split('/')
+        return path_parts[-1] in ['{id}', 'id}']
 
     def _add_missing_operations(self):
         """Add missing UPDATE and DELETE operations where appropriate"""
         self.stdout.write(self.style.SUCCESS("\n➕ Step 3: Adding missing operations"))
         self.stdout.write("-" * 80)
-        
-        # Get or create UPDATE and DELETE actions
-
-        # Find detail endpoints (containing {id})
-        all_endpoints = ApiEndpoint.objects.all()
-        
-        for endpoint in all_endpoints:
-            path = endpoint.path
-            
-            # Skip if not a detail endpoint or if it's a custom action
-            if '{id}' not in path:
-                continue
-            
-            # Check if it's a custom action endpoint (e.g., /api/enquiries/{id}/close/)
-            path_parts = path.rstrip('/').split('/')
-            if len(path_parts) > 0 and path_parts[-1] not in ['{id}', 'id}']:
-                # This is a custom action endpoint like /enquiries/{id}/close/
+
+        started, scanned = time.monotonic(), self.rows_scanned
+
+        for batch in self._stream(ApiEndpoint.objects.all(), 'path'):
+            details = {}
+            for pk, path in batch:
+                path = self.cleaned_paths.get(pk, path)
+                if self._is_detail_path(path):
+                    details[pk] = path
+            if not details:
                 continue
-            
-            # This is a standard detail endpoint like /api/enquiries/{id}/
-            # Add PUT/PATCH (update) operation
-            put_op, put_created = ApiOperation.objects.get_or_create(
-                endpoint=endpoint,
-                http_method='PUT',
-                defaults={
-
-                    'is_enabled': True,
-                }
-            )
-            
-            if put_created:
-                self.stdout.write(
-                    f"  {self.style.SUCCESS('ADD')}: PUT {path} → update"
-                )
-                self.stats['operations_added'] += 1
-            
-            patch_op, patch_created = ApiOperation.objects.get_or_create(
-                endpoint=endpoint,
-                http_method='PATCH',
-                defaults={
-                    'is_enabled': True,
-                }
-            )
-            
-            if patch_created:
-                self.stdout.write(
-                    f"  {self.style.SUCCESS('ADD')}: PATCH {path} → update"
-                )
-                self.stats['operations_added'] += 1
-            
-            # Add DELETE operation
-            delete_op, delete_created = ApiOperation.objects.get_or_create(
-                endpoint=endpoint,
-                http_method='DELETE',
-                defaults={
-                    'is_enabled': True,
-                }
+
+            # One query per batch for the operations that already exist
+            existing = set(
+                ApiOperation.objects.filter(endpoint_id__in=details)
+                .values_list('endpoint_id', 'http_method')
             )
-            
-            if delete_created:
-                self.stdout.write(
-                    f"  {self.style.SUCCESS('ADD')}: DELETE {path} → delete"
-                )
-                self.stats['operations_added'] += 1
-        
-        self.stdout.write(
-            self.style.SUCCESS(f"\n✓ Added {self.stats['operations_added']} operations")
-        )
 
+            missing = []
+            for pk, path in details.items():
+                for method, action in self.DETAIL_METHODS:
+                    if (pk, method) in existing:
+                        continue
+                    self.stdout.write(
+                        f"  {self.style.SUCCESS('ADD')}: {method} {path} → {action}"
+                    )
+                    missing.append(ApiOperation(endpoint_id=pk, http_method=method, is_enabled=True))
+
+            if missing and not self.dry_run:
+                with transaction.atomic():
+                    ApiOperation.objects.bulk_create(missing, batch_size=self.batch_size, ignore_conflicts=True)
+            self.stats['operations_added'] += len(missing)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"\n✓ Added {self.stats['operations_added']} operations "
+            f"({self._rate(self.rows_scanned - scanned, started)})"
+        ))
+
+    # ─────────────────────────────
+    # Step 4
+    # ─────────────────────────────
     def _remove_unused_actions(self):
         """Remove unused 'read' action if it exists"""
         self.stdout.write(self.style.SUCCESS("\n🗑️  Step 4: Removing unused actions"))
         self.stdout.write("-" * 80)
-        
-        try:
 
-            # Check if it's used
-            usage_count = ApiOperation.objects.filter().count()
-            
-            if usage_count == 0:
-                self.stdout.write(
-                    f"  {self.style.WARNING('REMOVE')}: Action 'read' (unused)"
-                )
-                
+        # Check if it's used
+        usage_count = ApiOperation.objects.count()
 
-                self.stats['actions_removed'] += 1
-            else:
-                self.stdout.write(
-                    f"  ⚠ Action 'read' is used by {usage_count} operations - keeping it"
-                )
-        except :
-            print("Error")
+        if usage_count == 0:
+            self.stdout.write(
+                f"  {self.style.WARNING('REMOVE')}: Action 'read' (unused)"
+            )
+            self.stats['actions_removed'] += 1
+        else:
+            self.stdout.write(
+                f"  ⚠ Action 'read' is used by {usage_count} operations - keeping it"
+            )
 
         self.stdout.write(
             self.style.SUCCESS(f"\n✓ Removed {self.stats['actions_removed']} unused actions")
@@ -313,15 +346,19 @@ class Command(BaseCommand):
         self.stdout.write(self.style.SUCCESS("\n" + "="*80))
         self.stdout.write(self.style.SUCCESS("CLEANUP SUMMARY"))
         self.stdout.write(self.style.SUCCESS("="*80))
-        
+
         self.stdout.write(f"\n  Paths cleaned:        {self.stats['paths_cleaned']}")
         self.stdout.write(f"  Modules fixed:        {self.stats['modules_fixed']}")
         self.stdout.write(f"  Operations added:     {self.stats['operations_added']}")
         self.stdout.write(f"  Actions removed:      {self.stats['actions_removed']}")
-        
+
         total_changes = sum(self.stats.values())
-        self.stdout.write(self.style.SUCCESS(f"\n  Total changes:        {total_changes}\n"))
-        
+        self.stdout.write(self.style.SUCCESS(f"\n  Total changes:        {total_changes}"))
+        rate = self.rows_scanned / self.elapsed if self.elapsed else 0
+        self.stdout.write(
+            f"  Rows scanned:         {self.rows_scanned} in {self.elapsed:.2f}s ({rate:,.0f} rows/s)\n"
+        )
+
         if self.dry_run:
             self.stdout.write(self.style.WARNING("  ⚠ DRY RUN - No changes were saved\n"))
         else:
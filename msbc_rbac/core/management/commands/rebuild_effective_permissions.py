@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from msbc_rbac.core.services import effective_permissions
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the materialized UserEffectivePermission table.
+    """
+
+    help = "Rebuild UserEffectivePermission rows from roles and permissions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--tenant",
+            type=int,
+            help="Only rebuild users of this tenant id",
+        )
+
+    def handle(self, *args, **options):
+        users, created, deleted = effective_permissions.rebuild(tenant=options["tenant"])
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✔ Effective permissions rebuilt\n"
+            f"Users refreshed: {users}\n"
+            f"Rows created: {created}\n"
+            f"Rows deleted: {deleted}"
+        ))
+        if not effective_permissions.is_enabled():
+            self.stdout.write(self.style.WARNING(
+                "RBAC_EFFECTIVE_PERMISSIONS is off: rows are not kept current until it is enabled."
+            ))
@@ -1,22 +1,36 @@
-from django.utils.deprecation import MiddlewareMixin
-from django.apps import apps
-from django.conf import settings
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
 from msbc_rbac.core.tenant_context import (
+    aget_user_tenant,
     set_current_tenant,
     clear_current_tenant,
 )
 
 
-class CurrentTenantMiddleware(MiddlewareMixin):
+class CurrentTenantMiddleware:
     """
-    Resolves tenant for the request and stores it in thread-local storage.
+    Resolves tenant for the request and stores it in the tenant context.
+
+    Sync and async capable, so it does not force a thread hop under ASGI.
     """
 
-    def process_request(self, request):
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
         """
-        Determines the current tenant from the user object and sets it in the thread-local context.
+        Determines the current tenant from the user object and sets it in the
+        tenant context; the context is cleared once the response is built.
         """
+        if self.async_mode:
+            return self.__acall__(request)
+
         tenant = None
 
         if request.user.is_authenticated:
@@ -25,10 +39,22 @@ class CurrentTenantMiddleware(MiddlewareMixin):
         if tenant:
             set_current_tenant(tenant)
 
-    def process_response(self, request, response):
-        """
-        Clears the tenant from the thread-local context after the request is processed.
-        """
-        clear_current_tenant()
-        return response
+        try:
+            return self.get_response(request)
+        finally:
+            clear_current_tenant()
+
+    async def __acall__(self, request):
+        tenant = None
+
+        user = await request.auser()
+        if user.is_authenticated:
+            tenant = await aget_user_tenant(user)
+
+        if tenant:
+            set_current_tenant(tenant)
 
+        try:
+            return await self.get_response(request)
+        finally:
+            clear_current_tenant()
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0006_alter_module_options_alter_submodule_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='apiendpoint',
+            name='route',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+    ]
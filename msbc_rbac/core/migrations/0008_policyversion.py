@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_apiendpoint_route'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PolicyVersion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=100, unique=True)),
+                ('token', models.CharField(max_length=32)),
+                ('changed_at', models.DateTimeField(db_index=True)),
+            ],
+            options={
+                'db_table': 'admin_policy_version',
+            },
+        ),
+    ]
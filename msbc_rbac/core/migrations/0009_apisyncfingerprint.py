@@ -0,0 +1,25 @@
+# Generated by Django 5.2.18 on 2026-10-17 06:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_policyversion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApiSyncFingerprint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('app_label', models.CharField(blank=True, max_length=100, unique=True)),
+                ('fingerprint', models.CharField(max_length=64)),
+                ('synced_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'admin_api_sync_fingerprint',
+            },
+        ),
+    ]
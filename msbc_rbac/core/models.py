@@ -219,6 +219,9 @@ class ApiEndpoint(models.Model):
     Represents a backend API endpoint path, linked to a Module and optional SubModule.
     """
     path = models.CharField(max_length=200)
+    # Django URL route the endpoint was synced from, as reported by
+    # ``request.resolver_match.route`` (e.g. ``api/core/roles/(?P<pk>[0-9]+)/$``).
+    route = models.CharField(max_length=255, blank=True, default="")
     module = models.ForeignKey(Module, on_delete=models.CASCADE)
     submodule = models.ForeignKey(
         SubModule, null=True, blank=True, on_delete=models.CASCADE
@@ -274,3 +277,38 @@ class TenantApiOverride(models.Model):
         unique_together = ('tenant', 'api_operation')
 
 
+
+
+class PolicyVersion(models.Model):
+    """
+    Latest policy version token per scope (e.g. ``tenant:5``).
+
+    Written after every version bump when ``RBAC_POLICY_SYNC`` is on, so
+    workers on other nodes can pick the token up (see
+    ``core.services.policy_sync``).
+    """
+    scope = models.CharField(max_length=100, unique=True)
+    token = models.CharField(max_length=32)
+    changed_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = "admin_policy_version"
+
+    def __str__(self):
+        return f"{self.scope} @ {self.token}"
+
+
+class ApiSyncFingerprint(models.Model):
+    """
+    Hash of the API registry rows one app contributed at the last
+    ``api_sync_db_operation`` run; apps whose hash is unchanged are skipped.
+    """
+    app_label = models.CharField(max_length=100, unique=True, blank=True)
+    fingerprint = models.CharField(max_length=64)
+    synced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = "admin_api_sync_fingerprint"
+
+    def __str__(self):
+        return f"{self.app_label or '(project)'} @ {self.fingerprint[:12]}"
@@ -1,9 +1,27 @@
+from msbc_rbac.core.models import ModuleSubModuleMapping
+
+
 def serialize_modules(modules):
     """
     Serializes a list of Module objects into a dictionary format suitable for API responses.
     
-    Includes nested submodules.
+    Includes nested submodules, loaded for all modules with one query.
     """
+    modules = list(modules)
+
+    submodules = {}
+    mappings = (
+        ModuleSubModuleMapping.objects.filter(module__in=[m.code for m in modules])
+        .select_related('submodule')
+        .order_by('id')
+    )
+    for sm in mappings:
+        submodules.setdefault(sm.module_id, []).append({
+            "code": sm.submodule.code,
+            "name": sm.submodule.name,
+            "icon": sm.submodule.icon,
+        })
+
     data = []
 
     for m in modules:
@@ -11,14 +29,7 @@ def serialize_modules(modules):
             "code": m.code,
             "name": m.name,
             "icon": m.icon,
-            "submodules": [
-                {
-                    "code": sm.submodule.code,
-                    "name": sm.submodule.name,
-                    "icon": sm.submodule.icon,
-                }
-                for sm in m.submodules.select_related('submodule').all()
-            ],
+            "submodules": submodules.get(m.code, []),
         })
 
     return data
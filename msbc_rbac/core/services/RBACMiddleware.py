@@ -11,25 +11,147 @@ Priority Order (Deny Wins):
  7. User-level explicit API block  (highest-priority deny)
  8. Role → Permission check  (module-level, then submodule-level)
  9. Default deny
+
+Steps 4-10 live in ``policy_decision.evaluate_policy``.  With
+``RBAC_DECISION_MODE = "single_query"`` their inputs are fetched with one
+SQL statement instead of one query per step.
+
+The checks run in ``process_view``, after Django has resolved the URL, so
+the operation is found through ``request.resolver_match.route`` instead of
+matching the path a second time.  URLs Django cannot resolve never reach
+the checks (Django answers them with a 404).  Under ``i18n_patterns()``
+the language prefix is removed before the bypass check and the lookup.
+
+The middleware is sync and async capable.  Under ASGI it runs natively on
+the event loop and loads its inputs with the async ORM / cache APIs
+(``RBAC_DECISION_MODE`` does not apply there).
+
+With ``RBAC_CLAIMS_TOKENS``, callers sending ``Authorization: Claims
+<token>`` are authorized from the signed claims while their policy
+versions are current (``services.claims``).
+
+With ``RBAC_DECISION_MODE = "remote"`` decisions come from a central RBAC
+service over HTTP instead (``services.remote_decision``).
+
+Per-stage durations and query counts can be exported through a
+``Server-Timing`` header and in-process histograms (``stage_timing``).
+
+With ``RBAC_WARMUP`` the route table and module catalogue are compiled when
+the (sync) middleware is loaded, see ``services.warmup``.  With
+``RBAC_POLICY_SYNC`` loading it also starts the thread that applies policy
+version bumps from other nodes (``services.policy_sync``).
 """
 import logging
 import threading
-from datetime import date
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from django.conf import settings
-from django.db.models import Q
 
-from msbc_rbac.core.models import TenantModule
 from django.http import JsonResponse
-from msbc_rbac.core.rbac.constants import HTTP_METHOD_ACTION_MAP
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+from msbc_rbac.core.services import decision_cache, policy_sync, remote_decision
+from msbc_rbac.core.services.stage_timing import NULL_TIMER, add_server_timing, start_timer
+from msbc_rbac.core.services.warmup import warm_up
+from msbc_rbac.core.tenant_context import aget_user_tenant
 from msbc_rbac.core.services.permission_api_resolver import (
-    has_permission,
-    get_user_permissions,
-    user_api_blocked,
-    tenant_api_disabled,
+    aresolve_api_operation,
+    request_path_and_route,
     resolve_api_operation,
 )
+from msbc_rbac.core.services.claims import (
+    claims_are_current,
+    claims_from_request,
+    load_claims_user,
+)
+from msbc_rbac.core.services.policy_decision import (
+    AsyncPolicyInputs,
+    ClaimsPolicyInputs,
+    DatabasePolicyInputs,
+    SingleQueryPolicyInputs,
+    deny,
+    evaluate_policy,
+)
 
 
+# violation → (log message, response "error", response "message")
+DENIAL_MESSAGES = {
+    RBACPermissionDenied.API_NOT_REGISTERED: (
+        "No operation associated with user {user} and tenant {tenant} ",
+        "User is not authorized",
+        "User is not authorized",
+    ),
+    RBACPermissionDenied.API_DISABLED_GLOBALLY: (
+        "No operation is enabled {user} and tenant {tenant} ",
+        "User is not authorized",
+        "User is not authorized",
+    ),
+    RBACPermissionDenied.TENANT_NOT_SUBSCRIBED: (
+        "No module found for tenant {user} and tenant {tenant} ",
+        "No Module associated . Kindly connect with provider",
+        "No Module associated . Kindly connect with provider",
+    ),
+    RBACPermissionDenied.MODULE_DISABLED: (
+        "Module is disabled {user} and tenant {tenant} ",
+        "Module is disabled . Kindly connect with provider",
+        "Module is disabled . Kindly connect with provider",
+    ),
+    RBACPermissionDenied.SUBSCRIPTION_EXPIRED: (
+        "Tenant module is expired {user} and tenant {tenant} ",
+        "Module license expired . Kindly connect with provider",
+        "Module license expired . Kindly connect with provider",
+    ),
+    RBACPermissionDenied.API_DISABLED_FOR_TENANT: (
+        "API disabled for tenant {user} and tenant {tenant} ",
+        "API is disabled . Kindly connect with provider",
+        "API is disabled . Kindly connect with provider""API is disabled . Kindly connect with provider",
+    ),
+    RBACPermissionDenied.API_BLOCKED_FOR_USER: (
+        "API is blocked for user {user} and tenant {tenant} ",
+        "Admin blocked you. Kindly connect with admin",
+        "Admin blocked you. Kindly connect with admin",
+    ),
+    RBACPermissionDenied.UNKNOWN_ACTION: (
+        "Action code mismatch {user} and tenant {tenant} ",
+        "Action code mismatch. Kindly connect with provider",
+        "Action code mismatch. Kindly connect with provider",
+    ),
+    RBACPermissionDenied.PERMISSION_DENIED: (
+        "Not authorized to perform action {user} and tenant {tenant} ",
+        "User is not authorized to perform this action",
+        "User is not authorized to perform this action",
+    ),
+}
+
+
+def denial_response(violation, user, tenant):
+    """
+    Log a denial and build the 401 JSON response for ``violation``.
+    """
+    log_message, error, message = DENIAL_MESSAGES[violation]
+    logging.error(f"{threading.get_native_id()} " + log_message.format(user=user, tenant=tenant))
+
+    return JsonResponse(
+        {"data": {}, "success": False,
+         "error": error,
+         "message": message},
+        status=401
+    )
+
+
+def is_bypassed(path, prefixes=None):
+    """
+    True when ``path`` falls under one of ``prefixes`` (by default
+    ``settings.BYPASS_PATH_PREFIXES``) and is never RBAC-checked.
+    """
+    if prefixes is None:
+        prefixes = settings.BYPASS_PATH_PREFIXES
+    for prefix in prefixes:
+        path = path.rstrip("/") or "/"
+        prefix = prefix.rstrip("/") or "/"
+        if path == prefix or path.startswith(prefix + "/"):
+            return True
+    return False
 
 
 class RBACMiddleware:
@@ -47,183 +169,248 @@ class RBACMiddleware:
 
     print("BYPASS_PATH_PREFIXES >>>>> ",BYPASS_PATH_PREFIXES)
 
+    sync_capable = True
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django picks process_view up from the instance; hand it the
+            # coroutine so the async handler does not wrap it in a thread.
+            self.process_view = self.aprocess_view
+        elif rbac_setting("RBAC_WARMUP"):
+            # ASGI servers load the app inside the event loop, where the
+            # sync ORM is off limits; there the data loads on first use.
+            warm_up()
+        policy_sync.start()
+
+    def is_bypassed(self, path):
+        return is_bypassed(path, self.BYPASS_PATH_PREFIXES)
 
     def __call__(self, request):
-        path = request.path
-
+        # Checks run in process_view, once request.resolver_match is set.
+        if self.async_mode:
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        add_server_timing(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        add_server_timing(request, response)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        timer = start_timer(request)
+        try:
+            return self.check(request, timer)
+        finally:
+            timer.finish()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        timer = start_timer(request)
+        try:
+            return await self.acheck(request, timer)
+        finally:
+            timer.finish()
+
+    def check(self, request, timer):
+        """
+        Run the policy steps; return a denial response or ``None``.
+        """
         # ─────────────────────────────────────────────────────
         # 1. Infrastructure bypass
         # ─────────────────────────────────────────────────────
-        for prefix in self.BYPASS_PATH_PREFIXES:
-            path = path.rstrip("/") or "/"
-            prefix = prefix.rstrip("/") or "/"
-            path = path.rstrip("/") or "/"
-            if path == prefix or path.startswith(prefix + "/"):
-                return self.get_response(request)
-
-        user = request.user
+        with timer.stage("bypass"):
+            bypassed = self.is_bypassed(request_path_and_route(request)[0])
+        if bypassed:
+            return None
+
+        if rbac_setting("RBAC_DECISION_MODE") == "remote":
+            return self.check_remote(request, timer)
+
+        claims = self.request_claims(request)
+        if claims is not None:
+            with timer.stage("claims"):
+                current = claims_are_current(claims)
+            if current:
+                return self.check_claims(request, claims, timer)
+            # Stale claims: back to the database
+            user = load_claims_user(claims)
+        else:
+            user = request.user
 
         # ─────────────────────────────────────────────────────
         # 2. Anonymous users bypass  (auth handled separately)
         # ─────────────────────────────────────────────────────
         if not user or not user.is_authenticated:
-            return self.get_response(request)
+            return None
 
         tenant = getattr(user, "tenant", None)
 
         # ─────────────────────────────────────────────────────
         # 3. API must be registered
         # ─────────────────────────────────────────────────────
-        operation = resolve_api_operation(request)
+        with timer.stage("resolve"):
+            operation = resolve_api_operation(request)
         if not operation:
-            logging.error(f"{threading.get_native_id()} No operation associated with user {user} and tenant {tenant} ")
-
-            return JsonResponse(
-                {"data": {}, "success": False,
-                 "error": "User is not authorized",
-                 "message": "User is not authorized"},
-                status=401
-            )
+            return denial_response(RBACPermissionDenied.API_NOT_REGISTERED, user, tenant)
 
         # ─────────────────────────────────────────────────────
-        # 4. Platform-level API disable
+        # 4-10. Policy evaluation  (deny wins, default deny)
         # ─────────────────────────────────────────────────────
-        if not operation.is_enabled:
-            logging.error(f"{threading.get_native_id()} No operation is enabled {user} and tenant {tenant} ")
+        decision = self.decide(tenant, user, operation, request.method, timer)
+
+        if not decision.allowed:
+            return denial_response(decision.violation, user, tenant)
+
+        return None
+
+    async def acheck(self, request, timer):
+        """
+        Same steps as ``check`` without leaving the event loop.
+        """
+        with timer.stage("bypass"):
+            bypassed = self.is_bypassed(request_path_and_route(request)[0])
+        if bypassed:
+            return None
+
+        if rbac_setting("RBAC_DECISION_MODE") == "remote":
+            # Blocking HTTP: off the event loop, outside the ORM thread.
+            return await sync_to_async(self.check_remote, thread_sensitive=False)(request, timer)
+
+        claims = self.request_claims(request)
+        if claims is not None:
+            if await sync_to_async(claims_are_current)(claims):
+                return await sync_to_async(self.check_claims)(request, claims, timer)
+            user = await sync_to_async(load_claims_user)(claims)
+        else:
+            user = await request.auser()
+        if not user or not user.is_authenticated:
+            return None
 
+        tenant = await aget_user_tenant(user)
 
-            return JsonResponse(
-                {"data": {}, "success": False,
-                 "error": "User is not authorized",
-                 "message": "User is not authorized"},
-                status=401
-            )
+        with timer.stage("resolve"):
+            operation = await aresolve_api_operation(request)
+        if not operation:
+            return denial_response(RBACPermissionDenied.API_NOT_REGISTERED, user, tenant)
 
-        # ─────────────────────────────────────────────────────
-        # 5. Tenant module subscription check
-        # ─────────────────────────────────────────────────────
-        if tenant:
-            tm = TenantModule.objects.filter(
-                tenant=tenant,
-                module=operation.endpoint.module
-            ).filter(
-                Q(submodule__isnull=True) |
-                Q(submodule=operation.endpoint.submodule)
-            ).first()
-
-            if not tm:
-                logging.error(
-                    f"{threading.get_native_id()} No module found for tenant {user} and tenant {tenant} "
-                )
+        decision = await self.adecide(tenant, user, operation, request.method, timer)
 
-                return JsonResponse(
-                    {"data": {}, "success": False,
-                     "error": "No Module associated . Kindly connect with provider",
-                     "message": "No Module associated . Kindly connect with provider"},
-                    status=401
-                )
+        if not decision.allowed:
+            return denial_response(decision.violation, user, tenant)
 
-            if not tm.is_enabled:
-                logging.error(
-                    f"{threading.get_native_id()} Module is disabled {user} and tenant {tenant} "
-                )
-                return JsonResponse(
-                    {"data": {}, "success": False,
-                     "error": "Module is disabled . Kindly connect with provider",
-                     "message": "Module is disabled . Kindly connect with provider"},
-                    status=401
-                )
+        return None
 
-            if tm.expiration_date and tm.expiration_date < date.today():
-                logging.error(
-                    f"{threading.get_native_id()} Tenant module is expired {user} and tenant {tenant} ")
+    def request_claims(self, request):
+        if not rbac_setting("RBAC_CLAIMS_TOKENS"):
+            return None
+        return claims_from_request(request)
 
+    def check_claims(self, request, claims, timer):
+        """
+        Steps 3-10 for a caller presenting current claims: the user is
+        never loaded.
+        """
+        with timer.stage("resolve"):
+            operation = resolve_api_operation(request)
+        if not operation:
+            return denial_response(RBACPermissionDenied.API_NOT_REGISTERED, claims.username, claims.tenant_id)
+
+        with timer.stage("inputs"):
+            inputs = ClaimsPolicyInputs(claims, operation)
+        decision = evaluate_policy(operation, claims.tenant_id, request.method, inputs, timer)
+
+        if not decision.allowed:
+            return denial_response(decision.violation, claims.username, claims.tenant_id)
+        return None
+
+    def check_remote(self, request, timer):
+        """
+        Steps 2-10 answered by the central RBAC service (remote mode); this
+        process reads no RBAC tables.
+        """
+        credentials = remote_decision.forwarded_credentials(request)
+        if credentials is None:
+            return None
+
+        path, route = request_path_and_route(request)
+        with timer.stage("remote"):
+            try:
+                decision = remote_decision.get_client().decide(credentials, request.method, path, route)
+            except remote_decision.RemoteDecisionError as exc:
+                logging.error(f"{threading.get_native_id()} RBAC service unavailable: {exc}")
                 return JsonResponse(
                     {"data": {}, "success": False,
-                     "error": "Module license expired . Kindly connect with provider",
-                     "message": "Module license expired . Kindly connect with provider"},
-                    status=401
+                     "error": "Authorization service unavailable",
+                     "message": "Authorization service unavailable"},
+                    status=503
                 )
 
-        # ─────────────────────────────────────────────────────
-        # 6. Tenant-level API override
-        # ─────────────────────────────────────────────────────
-        if tenant_api_disabled(tenant, operation):
-
-            logging.error(f"{threading.get_native_id()} API disabled for tenant {user} and tenant {tenant} ")
-
-            return JsonResponse(
-                {"data": {}, "success": False,
-                 "error": "API is disabled . Kindly connect with provider",
-                 "message": "API is disabled . Kindly connect with provider""API is disabled . Kindly connect with provider"},
-                status=401
-            )
-
-        # ─────────────────────────────────────────────────────
-        # 7. User-level explicit API block  (highest-priority deny)
-        # ─────────────────────────────────────────────────────
-        if user_api_blocked(tenant, user, operation):
-            logging.error(f"{threading.get_native_id()} API is blocked for user {user} and tenant {tenant} ")
-
-            return JsonResponse(
-                {"data": {}, "success": False,
-                 "error": "Admin blocked you. Kindly connect with admin",
-                 "message": "Admin blocked you. Kindly connect with admin"
-                 },
-                status=401
-            )
-
-        # ─────────────────────────────────────────────────────
-        # 8. Resolve permission action code
-        # ─────────────────────────────────────────────────────
-        action_code = (
-                operation.permission_code
-                or HTTP_METHOD_ACTION_MAP.get(request.method.upper())
-        )
-
-        if not action_code:
-            logging.error(f"{threading.get_native_id()} Action code mismatch {user} and tenant {tenant} ")
-
-            return JsonResponse(
-                {"data": {}, "success": False,
-                 "error": "Action code mismatch. Kindly connect with provider",
-                 "message": "Action code mismatch. Kindly connect with provider"},
-                status=401
-            )
-
-        # ─────────────────────────────────────────────────────
-        # 9. Fetch user permissions and check module / submodule
-        # ─────────────────────────────────────────────────────
-        permissions = get_user_permissions(tenant, user)
-
-        # Module-level: permission at module level covers all submodules
-        if has_permission(
-            permissions,
-            module=operation.endpoint.module,
-            submodule=None,
-            action=action_code,
-        ):
-            return self.get_response(request)
-
-        # Submodule-level fallback
-        if operation.endpoint.submodule and has_permission(
-            permissions,
-            module=operation.endpoint.module,
-            submodule=operation.endpoint.submodule,
-            action=action_code,
-        ):
-            return self.get_response(request)
-
-        # ─────────────────────────────────────────────────────
-        # 10. Final deny  (default-deny policy)
-        # ─────────────────────────────────────────────────────
-        logging.error(f"{threading.get_native_id()} Not authorized to perform action {user} and tenant {tenant} ")
-
-        return JsonResponse(
-            {"data": {}, "success": False,
-             "error": "User is not authorized to perform this action",
-             "message": "User is not authorized to perform this action"},
-            status=401
-        )
+        # Credentials the central service does not authenticate: anonymous,
+        # unless this service authenticated the caller (fail closed)
+        if decision is None:
+            user = getattr(request, "user", None)
+            if user is None or not user.is_authenticated:
+                return None
+            decision = deny(RBACPermissionDenied.PERMISSION_DENIED)
+
+        if decision.allowed:
+            return None
+
+        violation = decision.violation
+        if violation not in DENIAL_MESSAGES:
+            violation = RBACPermissionDenied.PERMISSION_DENIED
+        return denial_response(violation, "(remote)", None)
+
+    def decide(self, tenant, user, operation, method, timer=NULL_TIMER):
+        """
+        Evaluate steps 4-10, going through the decision cache when enabled.
+        """
+        if not decision_cache.is_enabled():
+            return self.evaluate(tenant, user, operation, method, timer)
+
+        with timer.stage("decision_cache"):
+            key = decision_cache.decision_key(tenant, user, operation, method)
+            decision = decision_cache.get_decision(key)
+        if decision is None:
+            decision = self.evaluate(tenant, user, operation, method, timer)
+            decision_cache.store_decision(key, decision)
+        return decision
+
+    async def adecide(self, tenant, user, operation, method, timer=NULL_TIMER):
+        """
+        Async counterpart of ``decide``.
+        """
+        if not decision_cache.is_enabled():
+            return await self.aevaluate(tenant, user, operation, method, timer)
+
+        with timer.stage("decision_cache"):
+            key = await decision_cache.adecision_key(tenant, user, operation, method)
+            decision = decision_cache.get_decision(key)
+        if decision is None:
+            decision = await self.aevaluate(tenant, user, operation, method, timer)
+            decision_cache.store_decision(key, decision)
+        return decision
+
+    def evaluate(self, tenant, user, operation, method, timer):
+        with timer.stage("inputs"):
+            inputs = self.get_policy_inputs(tenant, user, operation, method)
+        return evaluate_policy(operation, tenant, method, inputs, timer)
+
+    async def aevaluate(self, tenant, user, operation, method, timer):
+        with timer.stage("inputs"):
+            inputs = await AsyncPolicyInputs(tenant, user, operation, method).load()
+        return evaluate_policy(operation, tenant, method, inputs, timer)
+
+    def get_policy_inputs(self, tenant, user, operation, method):
+        """
+        Pick the input source for ``RBAC_DECISION_MODE``.
+        """
+        if tenant and rbac_setting("RBAC_DECISION_MODE") == "single_query":
+            return SingleQueryPolicyInputs(tenant, user, operation, method)
+        return DatabasePolicyInputs(tenant, user, operation, method)
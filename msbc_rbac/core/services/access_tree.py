@@ -0,0 +1,162 @@
+"""
+Per-user access tree (dashboard, ``get_user_role_permission``).
+
+The tree lists the tenant's enabled modules and submodules with the
+user's action flags and the API blocks that apply to them:
+
+    {
+        "modules": [
+            {"code", "name", "permissions": {flag: bool},
+             "blocked_apis": [...], "sub_modules": [...]},
+        ],
+        "global_blocked_apis": [{"method", "path", "reason"}],
+        "roles": [{"name", "id"}],
+    }
+
+Permissions come from the cached ``PermissionSet``; flags are derived from
+the action part of each permission code (``parse_action``: ``invoice.read``
+→ ``read``) rather than by substring search.  A submodule inherits its
+module's flags, as module-level permissions grant access to every
+submodule in ``RBACMiddleware``.
+
+The finished tree is cached in the RBAC cache per tenant and user, tagged
+with the ``routes``, tenant and user policy versions.
+"""
+from msbc_rbac.accounts.models import UserApiBlock
+from msbc_rbac.core.cache import CacheStats, get_rbac_cache
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.models import Role, TenantApiOverride, TenantModule
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.permission_api_resolver import (
+    action_flags,
+    get_user_role_ids,
+    parse_action,
+)
+from msbc_rbac.core.services.permission_bits import get_permission_index
+
+access_tree_stats = CacheStats("access_trees")
+
+
+def _block_data(operation, reason=None):
+    return {
+        "method": operation.http_method,
+        "path": operation.endpoint.path,
+        "reason": reason,
+    }
+
+
+def _compile_access_tree(tenant_id, user, permissions):
+    modules = {}
+    submodule_index = {}
+
+    # Enabled modules / submodules for the tenant
+    tenant_modules = (
+        TenantModule.objects
+        .filter(tenant_id=tenant_id, is_enabled=True)
+        .select_related("module", "submodule")
+    )
+    for tm in tenant_modules:
+        m = tm.module
+        sm = tm.submodule
+
+        if m.pk not in modules:
+            modules[m.pk] = {
+                "code": m.pk,
+                "name": m.name,
+                "permissions": set(),
+                "blocked_apis": [],
+                "sub_modules": [],
+            }
+        if sm and (m.pk, sm.pk) not in submodule_index:
+            sm_dict = {
+                "code": sm.pk,
+                "name": sm.name,
+                "permissions": set(),
+                "blocked_apis": [],
+            }
+            modules[m.pk]["sub_modules"].append(sm_dict)
+            submodule_index[(m.pk, sm.pk)] = sm_dict
+
+    # Permission actions; submodule permissions also count for the module
+    for module_code, submodule_code, code in permissions:
+        if module_code not in modules or not code:
+            continue
+        action = parse_action(code)
+        modules[module_code]["permissions"].add(action)
+        if submodule_code and (module_code, submodule_code) in submodule_index:
+            submodule_index[(module_code, submodule_code)]["permissions"].add(action)
+
+    def attach(operation, data):
+        endpoint = operation.endpoint
+        if endpoint.submodule_id:
+            target = submodule_index.get((endpoint.module_id, endpoint.submodule_id))
+        else:
+            target = modules.get(endpoint.module_id)
+        if target is not None:
+            target["blocked_apis"].append(data)
+
+    # User blocks, then operations disabled for the tenant
+    global_blocked_apis = []
+    user_blocks = (
+        UserApiBlock.objects.filter(tenant_id=tenant_id, user=user)
+        .select_related("api_operation__endpoint")
+    )
+    for block in user_blocks:
+        data = _block_data(block.api_operation, getattr(block, "reason", None))
+        global_blocked_apis.append(data)
+        attach(block.api_operation, data)
+
+    tenant_blocks = (
+        TenantApiOverride.objects.filter(tenant_id=tenant_id, is_enabled=False)
+        .select_related("api_operation__endpoint")
+    )
+    for override in tenant_blocks:
+        attach(override.api_operation, _block_data(override.api_operation))
+
+    for m in modules.values():
+        m["permissions"] = action_flags(m["permissions"])
+        for sm in m["sub_modules"]:
+            flags = action_flags(sm["permissions"])
+            sm["permissions"] = {
+                flag: value or m["permissions"][flag] for flag, value in flags.items()
+            }
+
+    return {
+        "modules": list(modules.values()),
+        "global_blocked_apis": global_blocked_apis,
+        "roles": list(
+            Role.objects.filter(tenant_id=tenant_id, role_users__user=user).values("name", "id")
+        ),
+    }
+
+
+def build_access_tree(tenant, user):
+    """
+    Access tree of ``user`` in ``tenant`` (instance or id), cached for
+    ``RBAC_ACCESS_TREE_CACHE_TIMEOUT`` seconds (0 disables the cache).
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    routes_version, tenant_version, user_version = policy_version.get_versions(
+        (policy_version.ROUTES, None),
+        (policy_version.TENANT, tenant_id),
+        (policy_version.USER, user.pk),
+    )
+
+    timeout = rbac_setting("RBAC_ACCESS_TREE_CACHE_TIMEOUT")
+    key = f"rbac:access_tree:{tenant_id}:{user.pk}:{routes_version}:{tenant_version}:{user_version}"
+    # Through the Django cache only: callers get their own copy of the tree.
+    cache = get_rbac_cache()
+    if timeout:
+        tree = cache.get(key)
+        if tree is not None:
+            access_tree_stats.hit()
+            return tree
+        access_tree_stats.miss()
+
+    permissions = get_permission_index(tenant_id, version=tenant_version).permission_set(
+        get_user_role_ids(user, version=user_version)
+    )
+    tree = _compile_access_tree(tenant_id, user, permissions)
+    if timeout:
+        cache.set(key, tree, timeout)
+    return tree
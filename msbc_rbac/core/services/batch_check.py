@@ -0,0 +1,106 @@
+"""
+Batch authorization checks (``POST /api/rbac/check-batch``).
+
+Answers "may this user call METHOD PATH?" for many pairs at once, the way
+``RBACMiddleware`` would for real requests.  Each path goes through
+Django's URL resolver and one route table lookup; the user's permissions,
+blocks and tenant policy are loaded once (``PreloadedPolicyInputs``) and
+shared by every item, so a batch costs the same few lookups as a single
+request.
+"""
+from collections import namedtuple
+
+from django.urls import Resolver404, resolve
+
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.policy_decision import (
+    ALLOW,
+    PreloadedPolicyInputs,
+    deny,
+    evaluate_policy,
+)
+from msbc_rbac.core.services.RBACMiddleware import is_bypassed
+from msbc_rbac.core.services.route_table import get_route_table, strip_locale_prefix
+
+# Django cannot resolve the path: a real request would get a 404.
+NOT_FOUND = "not_found"
+
+CheckResult = namedtuple("CheckResult", ["method", "path", "allowed", "violation"])
+
+
+def _route(path, routes):
+    """
+    ``path`` and its Django URL route without the language prefix
+    (``False`` when unresolvable), memoized per batch in ``routes``.
+    """
+    if path not in routes:
+        try:
+            routes[path] = strip_locale_prefix(path, resolve(path).route)
+        except Resolver404:
+            routes[path] = False
+    return routes[path]
+
+
+def check_batch(tenant, user, checks, resolve_urls=True):
+    """
+    Evaluate ``(method, path)`` pairs for ``user``.
+
+    Returns one ``CheckResult`` per pair, in order; ``violation`` is an
+    ``RBACPermissionDenied`` violation type or ``NOT_FOUND``.
+
+    With ``resolve_urls=False`` (decisions for other services, whose URLs
+    this project cannot resolve) items are ``(method, path, route)``, where
+    ``route`` is the caller's resolved Django route or ``None``; bypass
+    prefixes are then left to the caller.
+    """
+    table = get_route_table()
+    inputs = PreloadedPolicyInputs(tenant, user)
+    routes = {}
+    # Operations are method-specific, so the decision depends on the
+    # operation alone (many paths share one parameterized endpoint).
+    decisions = {}
+
+    def evaluate(method, path, route):
+        operation = table.resolve(path, method, route)
+        if operation is None:
+            return deny(RBACPermissionDenied.API_NOT_REGISTERED)
+
+        decision = decisions.get(operation.pk)
+        if decision is None:
+            decision = evaluate_policy(operation, tenant, method, inputs.for_operation(operation))
+            decisions[operation.pk] = decision
+        return decision
+
+    results = []
+    for item in checks:
+        if resolve_urls:
+            method, path = item
+            resolved = _route(path, routes)
+        else:
+            method, path, route = item
+        method = method.upper()
+
+        if not resolve_urls:
+            decision = evaluate(method, path, route)
+        elif resolved is False:
+            decision = deny(NOT_FOUND)
+        elif is_bypassed(resolved[0]):
+            decision = ALLOW
+        else:
+            decision = evaluate(method, *resolved)
+
+        results.append(CheckResult(method, path, decision.allowed, decision.violation))
+    return results
+
+
+def policy_version_tag(tenant, user):
+    """
+    One string covering every policy version a decision for ``user``
+    depends on; remote clients key their cached decisions by it.
+    """
+    return ".".join(policy_version.get_versions(
+        (policy_version.ROUTES, None),
+        (policy_version.TENANT, getattr(tenant, "pk", tenant)),
+        (policy_version.USER, user.pk),
+    ))
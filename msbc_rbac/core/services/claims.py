@@ -0,0 +1,202 @@
+"""
+Signed permission claims tokens.
+
+A claims token carries what a policy decision needs to know about the
+caller, signed with HMAC-SHA256:
+
+    c1.<base64url JSON payload>.<base64url signature>
+
+    u / n / t   user id, username, tenant id
+    r           role ids
+    p           permission bitset (hex) over the tenant's PermissionIndex
+    b           blocked ApiOperation ids
+    tv / uv     tenant and user policy versions the claims were built from
+    exp         expiry (Unix time)
+
+While both versions are still current the claims are exactly what the
+database would say, so a service holding the signing secret can authorize
+from them (plus the tenant policy and route table in its RBAC cache)
+without loading the user.  Once either version has been bumped the claims
+are stale and callers fall back to the database.
+
+The secret is ``RBAC_CLAIMS_SECRET`` (default: ``SECRET_KEY``); every
+service verifying tokens needs the same value.
+"""
+import base64
+import hashlib
+import hmac
+import json
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import router
+
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.permission_api_resolver import get_user_role_ids
+from msbc_rbac.core.services.permission_bits import get_permission_index
+from msbc_rbac.core.services.user_blocks import get_block_index, get_blocked_operations
+
+KEYWORD = "Claims"
+FORMAT = "c1"
+
+Claims = namedtuple("Claims", [
+    "user_id", "username", "tenant_id", "role_ids", "mask", "blocked",
+    "tenant_version", "user_version", "expires",
+])
+
+
+class ClaimsError(Exception):
+    """
+    A claims token is malformed, wrongly signed or expired.
+    """
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode()
+
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + "=" * (-len(text) % 4))
+
+
+def _signature(signed_part):
+    secret = rbac_setting("RBAC_CLAIMS_SECRET") or settings.SECRET_KEY
+    # Derived key: the raw SECRET_KEY is not used as an HMAC key elsewhere.
+    key = hashlib.sha256(b"msbc_rbac.claims:" + secret.encode()).digest()
+    return hmac.new(key, signed_part.encode(), hashlib.sha256).digest()
+
+
+# ─────────────────────────────
+# Issuing
+# ─────────────────────────────
+def issue_claims_token(user):
+    """
+    Build a signed claims token for ``user`` valid for
+    ``RBAC_CLAIMS_TTL`` seconds.
+    """
+    tenant_id = user.tenant_id
+    if tenant_id is None:
+        raise ClaimsError("No tenant found for user")
+
+    tenant_version, user_version = policy_version.get_versions(
+        (policy_version.TENANT, tenant_id),
+        (policy_version.USER, user.pk),
+    )
+    role_ids = get_user_role_ids(user, version=user_version)
+    mask = get_permission_index(tenant_id, version=tenant_version).permission_set(role_ids).mask
+    blocked = ()
+    if user.pk in get_block_index(tenant_id).blocked_user_ids:
+        blocked = get_blocked_operations(tenant_id, user)
+
+    payload = {
+        "u": user.pk,
+        "n": user.get_username(),
+        "t": tenant_id,
+        "r": sorted(role_ids),
+        "p": format(mask, "x"),
+        "b": sorted(blocked),
+        "tv": tenant_version,
+        "uv": user_version,
+        "exp": int(time.time()) + rbac_setting("RBAC_CLAIMS_TTL"),
+    }
+    signed_part = f"{FORMAT}.{_b64encode(json.dumps(payload, separators=(',', ':')).encode())}"
+    return f"{signed_part}.{_b64encode(_signature(signed_part))}"
+
+
+# ─────────────────────────────
+# Verification
+# ─────────────────────────────
+def verify_claims_token(token):
+    """
+    Check the signature and expiry of ``token`` and return its ``Claims``.
+    Raises ``ClaimsError``.
+    """
+    try:
+        prefix, payload, signature = token.split(".")
+    except ValueError:
+        raise ClaimsError("Malformed claims token")
+    if prefix != FORMAT:
+        raise ClaimsError("Unknown claims token format")
+
+    try:
+        valid = hmac.compare_digest(_b64decode(signature), _signature(f"{prefix}.{payload}"))
+        data = json.loads(_b64decode(payload)) if valid else None
+    except ValueError:
+        raise ClaimsError("Malformed claims token")
+    if not valid:
+        raise ClaimsError("Invalid claims token signature")
+    if data["exp"] <= time.time():
+        raise ClaimsError("Claims token expired")
+
+    return Claims(
+        user_id=data["u"],
+        username=data["n"],
+        tenant_id=data["t"],
+        role_ids=frozenset(data["r"]),
+        mask=int(data["p"], 16),
+        blocked=frozenset(data["b"]),
+        tenant_version=data["tv"],
+        user_version=data["uv"],
+        expires=data["exp"],
+    )
+
+
+def claims_from_request(request):
+    """
+    Verified ``Claims`` from an ``Authorization: Claims <token>`` header,
+    or ``None`` (no such header, or a token that does not verify).
+    """
+    keyword, _, token = request.META.get("HTTP_AUTHORIZATION", "").partition(" ")
+    if keyword != KEYWORD or not token:
+        return None
+    try:
+        return verify_claims_token(token.strip())
+    except ClaimsError:
+        return None
+
+
+def claims_are_current(claims):
+    """
+    True while neither policy version the claims were built from has been
+    bumped (one RBAC cache round trip).
+    """
+    return policy_version.get_versions(
+        (policy_version.TENANT, claims.tenant_id),
+        (policy_version.USER, claims.user_id),
+    ) == [claims.tenant_version, claims.user_version]
+
+
+def claims_user(claims):
+    """
+    User instance with the claimed id, username and tenant id, built
+    without a query.  Every other field is deferred: it is loaded from the
+    user's row on first access (``is_staff``, ``is_superuser``, ...), and
+    ``save()`` only writes loaded or assigned fields, as for ``.only()``.
+    """
+    model = get_user_model()
+    known = {
+        model._meta.pk.attname: claims.user_id,
+        model.USERNAME_FIELD: claims.username,
+        "tenant_id": claims.tenant_id,
+    }
+    field_names = [field.attname for field in model._meta.concrete_fields if field.attname in known]
+    return model.from_db(
+        router.db_for_read(model),
+        field_names,
+        [known[name] for name in field_names],
+    )
+
+
+def load_claims_user(claims):
+    """
+    The claimed user from the database (fallback for stale claims), or
+    ``None`` when deleted or inactive.
+    """
+    return (
+        get_user_model()._default_manager.select_related("tenant")
+        .filter(pk=claims.user_id, is_active=True)
+        .first()
+    )
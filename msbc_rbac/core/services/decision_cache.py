@@ -0,0 +1,84 @@
+"""
+Per-worker cache of final RBAC decisions.
+
+Traffic is dominated by the same users polling the same endpoints, so the
+outcome of ``evaluate_policy`` is remembered per
+``(user, tenant, operation, method, policy versions, day)``.
+
+The route, tenant and user policy versions are part of the key: bumping
+any of them makes older entries unreachable, and they age out of the LRU
+without a global flush.  The day is part of the key because module expiry
+is evaluated against today's date.
+"""
+from datetime import date
+
+from msbc_rbac.core.cache import CacheStats, LRUCache
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.services import policy_version
+
+decision_stats = CacheStats("decisions")
+
+_cache = None
+
+
+def _get_cache():
+    global _cache
+    size = rbac_setting("RBAC_DECISION_CACHE_SIZE")
+    ttl = rbac_setting("RBAC_DECISION_CACHE_TTL")
+    if _cache is None or _cache.maxsize != size or _cache.ttl != ttl:
+        _cache = LRUCache(size, ttl)
+    return _cache
+
+
+def decision_key(tenant, user, operation, method):
+    """
+    Build the cache key for a decision, reading the current policy versions
+    in one cache round trip.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    versions = policy_version.get_versions(
+        (policy_version.ROUTES, None),
+        (policy_version.TENANT, tenant_id),
+        (policy_version.USER, user.pk),
+    )
+    return (user.pk, tenant_id, operation.pk, method.upper(), *versions, date.today().toordinal())
+
+
+async def adecision_key(tenant, user, operation, method):
+    """
+    Async counterpart of ``decision_key``.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    versions = await policy_version.aget_versions(
+        (policy_version.ROUTES, None),
+        (policy_version.TENANT, tenant_id),
+        (policy_version.USER, user.pk),
+    )
+    return (user.pk, tenant_id, operation.pk, method.upper(), *versions, date.today().toordinal())
+
+
+def get_decision(key):
+    """
+    Return the cached ``Decision`` for ``key`` or ``None``.
+    """
+    decision = _get_cache().get(key)
+    if decision is None:
+        decision_stats.miss()
+    else:
+        decision_stats.hit()
+    return decision
+
+
+def store_decision(key, decision):
+    _get_cache().set(key, decision)
+
+
+def is_enabled():
+    return rbac_setting("RBAC_DECISION_CACHE_SIZE") > 0
+
+
+def clear_decisions():
+    """
+    Drop every cached decision held by this worker.
+    """
+    _get_cache().clear()
@@ -0,0 +1,132 @@
+"""
+Maintenance of the materialized ``UserEffectivePermission`` table.
+
+A row exists for every (user, permission) pair the user holds through an
+allowed RolePermission on one of their roles, so permission lookups read
+one indexed table instead of the Permission ⋈ RolePermission ⋈ Role ⋈
+UserRole join.
+
+With ``RBAC_EFFECTIVE_PERMISSIONS`` on, the signal receivers in
+``core.signals`` refresh the rows of every user affected by a write, and
+the sidebar and ``single_query`` decisions read the table.  The access
+tree and default decisions go through ``get_user_permissions``, which uses
+the tenant's ``PermissionIndex`` (``core.services.permission_bits``)
+instead.
+``rebuild_effective_permissions`` rebuilds it in bulk: run it after
+turning the setting on and after bulk writes that bypass signals.
+"""
+from django.db import transaction
+
+from msbc_rbac.accounts.models import UserEffectivePermission, UserRole
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.models import Permission
+
+BATCH_SIZE = 500
+
+
+def is_enabled():
+    return rbac_setting("RBAC_EFFECTIVE_PERMISSIONS")
+
+
+def user_permissions(tenant, user):
+    """
+    ``UserEffectivePermission`` rows of ``user`` within ``tenant``.
+
+    Rows carry ``module``, ``submodule`` and ``code`` like ``Permission``,
+    so they can stand in for a Permission queryset.
+    """
+    return UserEffectivePermission.objects.filter(tenant=tenant, user=user)
+
+
+# ─────────────────────────────
+# Affected users
+# ─────────────────────────────
+def users_with_role(role_id):
+    return UserRole.objects.filter(role_id=role_id).values_list("user_id", flat=True)
+
+
+def users_granted(permission_id):
+    """
+    Users holding a role with any RolePermission on ``permission_id``.
+    """
+    return (
+        UserRole.objects.filter(role__permissions__permission_id=permission_id)
+        .values_list("user_id", flat=True)
+        .distinct()
+    )
+
+
+# ─────────────────────────────
+# Refresh
+# ─────────────────────────────
+_COLUMNS = ("user_id", "permission_id", "tenant_id", "module_id", "submodule_id", "code")
+
+
+def _granted_rows(user_ids):
+    return (
+        Permission.objects.filter(
+            is_active=True,
+            roles__allowed=True,
+            roles__role__role_users__user_id__in=user_ids,
+        )
+        .values_list(
+            "roles__role__role_users__user_id",
+            "id",
+            "tenant_id",
+            "module_id",
+            "submodule_id",
+            "code",
+        )
+        .distinct()
+    )
+
+
+def refresh_users(user_ids):
+    """
+    Bring the rows of ``user_ids`` in line with their current grants.
+
+    Only the difference is written: rows no longer granted (or whose
+    denormalized columns changed) are deleted, missing ones are created.
+    Returns ``(created, deleted)``.
+    """
+    user_ids = sorted(set(user_ids))
+    created = deleted = 0
+
+    for start in range(0, len(user_ids), BATCH_SIZE):
+        batch = user_ids[start:start + BATCH_SIZE]
+        with transaction.atomic():
+            wanted = set(_granted_rows(batch))
+            existing = {
+                row[1:]: row[0]
+                for row in UserEffectivePermission.objects.filter(user_id__in=batch)
+                .values_list("id", *_COLUMNS)
+            }
+
+            stale = [pk for row, pk in existing.items() if row not in wanted]
+            if stale:
+                deleted += UserEffectivePermission.objects.filter(pk__in=stale).delete()[0]
+
+            missing = [row for row in wanted if row not in existing]
+            UserEffectivePermission.objects.bulk_create(
+                (UserEffectivePermission(**dict(zip(_COLUMNS, row))) for row in missing),
+                batch_size=BATCH_SIZE,
+            )
+            created += len(missing)
+
+    return created, deleted
+
+
+def rebuild(tenant=None):
+    """
+    Refresh every user that has roles or materialized rows (optionally only
+    users of ``tenant``).  Returns ``(users, created, deleted)``.
+    """
+    assigned = UserRole.objects.values_list("user_id", flat=True)
+    materialized = UserEffectivePermission.objects.values_list("user_id", flat=True)
+    if tenant is not None:
+        assigned = assigned.filter(user__tenant=tenant)
+        materialized = materialized.filter(user__tenant=tenant)
+
+    user_ids = set(assigned) | set(materialized)
+    created, deleted = refresh_users(user_ids)
+    return len(user_ids), created, deleted
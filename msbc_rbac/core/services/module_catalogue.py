@@ -0,0 +1,70 @@
+"""
+Immutable catalogue of modules and their submodules.
+
+Modules, submodules and ``ModuleSubModuleMapping`` rows only change with
+registry syncs and admin edits, so, like the route table, the catalogue is
+compiled once per ``routes`` policy version and shared through the
+two-tier RBAC cache.
+"""
+from collections import namedtuple
+
+from msbc_rbac.core.cache import TieredCache
+from msbc_rbac.core.models import Module, ModuleSubModuleMapping, SubModule
+from msbc_rbac.core.services import policy_version
+
+SubModuleEntry = namedtuple("SubModuleEntry", ["code", "name", "icon", "order"])
+ModuleEntry = namedtuple("ModuleEntry", ["code", "name", "icon", "order", "submodules"])
+ModuleCatalogue = namedtuple("ModuleCatalogue", ["version", "modules"])
+
+
+def build_module_catalogue(version=None):
+    """
+    Load modules (in ``Module`` ordering) with their mapped submodules (in
+    mapping order) as nested tuples.
+    """
+    submodules = {
+        code: SubModuleEntry(code, name, icon, order)
+        for code, name, icon, order in SubModule.objects.values_list("code", "name", "icon", "order")
+    }
+
+    mapped = {}
+    mappings = ModuleSubModuleMapping.objects.order_by("id").values_list("module_id", "submodule_id")
+    for module_id, submodule_id in mappings:
+        mapped.setdefault(module_id, []).append(submodules[submodule_id])
+
+    modules = tuple(
+        ModuleEntry(code, name, icon, order, tuple(mapped.get(code, ())))
+        for code, name, icon, order in Module.objects.values_list("code", "name", "icon", "order")
+    )
+    return ModuleCatalogue(version, modules)
+
+
+module_catalogue_cache = TieredCache("module_catalogue")
+
+
+def _module_catalogue_key(version):
+    return f"rbac:module_catalogue:{version}"
+
+
+def get_module_catalogue():
+    """
+    Return the ``ModuleCatalogue`` for the current ``routes`` version.
+    """
+    version = policy_version.get_version(policy_version.ROUTES)
+    key = _module_catalogue_key(version)
+
+    catalogue = module_catalogue_cache.get(key)
+    if catalogue is None:
+        catalogue = build_module_catalogue(version=version)
+        module_catalogue_cache.set(key, catalogue)
+    return catalogue
+
+
+def preload_module_catalogue():
+    """
+    Load the current catalogue and pin it in this worker's L1 (used by the
+    warm-up before forking).
+    """
+    catalogue = get_module_catalogue()
+    module_catalogue_cache.pin(_module_catalogue_key(catalogue.version), catalogue)
+    return catalogue
@@ -1,9 +1,14 @@
-from msbc_rbac.accounts.models import UserApiBlock
+from msbc_rbac.accounts.models import UserApiBlock, UserRole
 from msbc_rbac.core.models import ApiEndpoint, ApiOperation, TenantApiOverride, Permission, TenantModule, Permission, \
     TenantApiOverride, Role
-import re
-
+from msbc_rbac.core.cache import TieredCache
+from msbc_rbac.core.conf import rbac_setting
 from msbc_rbac.core.rbac.constants import HTTP_METHOD_ACTION_MAP
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.permission_bits import aget_permission_index, get_permission_index
+from msbc_rbac.core.services.route_table import aget_route_table, get_route_table, strip_locale_prefix
+from msbc_rbac.core.services.tenant_policy import get_tenant_policy
+from msbc_rbac.core.services.user_blocks import is_user_blocked
 
 DENY = False
 ALLOW = True
@@ -16,25 +21,32 @@ def resolve_api_operation(request):
     """
     Resolve API operation by matching request path + method.
     Supports parameterized URLs like /leads/{id}/
-    """
 
-    request_path = request.path.rstrip("/")
-    method = request.method.upper()
+    Once Django has resolved the URL, the endpoint is found by its route
+    (one dict lookup); otherwise the path goes through the compiled route
+    table, whose cost depends on path depth, not on the endpoint count.
+    """
+    path, route = request_path_and_route(request)
+    return get_route_table().resolve(path, request.method, route)
 
-    # 1️⃣ Exact match first
-    endpoint = ApiEndpoint.objects.filter(path=request_path).first()
-    if endpoint:
-        return ApiOperation.objects.filter(endpoint=endpoint, http_method=method).first()
 
-    # 2️⃣ Pattern match
-    for endpoint in ApiEndpoint.objects.all():
-        pattern = re.sub(r'\{(\w+)\}', r'[^/]+', endpoint.path)
-        pattern = f'^{pattern.rstrip("/")}$'
+async def aresolve_api_operation(request):
+    """
+    Async counterpart of ``resolve_api_operation``.
+    """
+    path, route = request_path_and_route(request)
+    return (await aget_route_table()).resolve(path, request.method, route)
 
-        if re.match(pattern, request_path):
-            return ApiOperation.objects.filter(endpoint=endpoint, http_method=method).first()
 
-    return None
+def request_path_and_route(request):
+    """
+    The request path and its resolved URL route (``None`` before URL
+    resolution), without the ``i18n_patterns()`` language prefix.
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return request.path, None
+    return strip_locale_prefix(request.path, match.route, getattr(request, "urlconf", None))
 
 
 # ─────────────────────────────
@@ -42,19 +54,17 @@ def resolve_api_operation(request):
 # ─────────────────────────────
 
 def tenant_api_disabled(tenant, operation):
-    return TenantApiOverride.objects.filter(
-        tenant=tenant,
-        api_operation=operation,
-        is_enabled=False,
-    ).exists()
+    # Overrides always belong to a tenant
+    if not tenant:
+        return False
+    return get_tenant_policy(tenant).api_disabled(operation.pk)
 
 
 def user_api_blocked(tenant, user, operation):
-    return UserApiBlock.objects.filter(
-        tenant=tenant,
-        user=user,
-        api_operation=operation,
-    ).exists()
+    # Blocks always belong to a tenant
+    if not tenant:
+        return False
+    return is_user_blocked(tenant, user, operation)
 
 
 # ─────────────────────────────
@@ -62,42 +72,114 @@ def user_api_blocked(tenant, user, operation):
 # ─────────────────────────────
 
 
+user_permission_cache = TieredCache("user_permissions")
+
+
 def get_user_permissions(tenant, user):
     """
-    Returns permission tuples:
-    (module_code, submodule_code, action_code)
+    Returns the user's permissions as a ``PermissionSet``, which answers
+    ``(module_code, submodule_code, action_code) in permissions``.
+
+    The user's role ids are cached per user policy version; their
+    permission bitsets come from the tenant's ``PermissionIndex``, rebuilt
+    on tenant policy changes, so role / permission changes take effect
+    immediately.
     """
     if not tenant and not user:
         raise Exception("Tenant or user must be specified")
 
-    if not tenant and not user.get_attr("tenant", None):
+    if not tenant and not getattr(user, "tenant", None):
         raise Exception("No tenant found for user")
 
     tenant = tenant if tenant else user.tenant
+    tenant_version, user_version = policy_version.get_versions(
+        (policy_version.TENANT, getattr(tenant, "pk", tenant)),
+        (policy_version.USER, user.pk),
+    )
+    index = get_permission_index(tenant, version=tenant_version)
+    return index.permission_set(get_user_role_ids(user, version=user_version))
+
 
-    qs = (
-        Permission.objects.filter(
-            tenant=tenant,
-            roles__role__role_users__user=user,
-            roles__allowed=True,
-            is_active=True,
-        )
-        .select_related("module", "submodule")
-        .values_list(
-            "module__code",
-            "submodule__code",
-            "code",
-        )
-        .distinct()
+async def aget_user_permissions(tenant, user):
+    """
+    Async counterpart of ``get_user_permissions`` for a known ``tenant``.
+    """
+    tenant_version, user_version = await policy_version.aget_versions(
+        (policy_version.TENANT, getattr(tenant, "pk", tenant)),
+        (policy_version.USER, user.pk),
     )
+    index = await aget_permission_index(tenant, version=tenant_version)
+    return index.permission_set(await aget_user_role_ids(user, version=user_version))
+
+
+def get_user_role_ids(user, version=None):
+    """
+    Ids of the roles assigned to ``user``, cached in the two-tier RBAC cache
+    per user policy version (``version`` when the caller already read it).
+    """
+    timeout = rbac_setting("RBAC_PERMISSION_CACHE_TIMEOUT")
+    if not timeout:
+        return query_user_role_ids(user)
+
+    if version is None:
+        version = policy_version.get_version(policy_version.USER, user.pk)
+    cache_key = _user_roles_key(user, version)
+
+    role_ids = user_permission_cache.get(cache_key)
+    if role_ids is not None:
+        return role_ids
+
+    role_ids = query_user_role_ids(user)
+    user_permission_cache.set(cache_key, role_ids, timeout)
+    return role_ids
+
+
+async def aget_user_role_ids(user, version=None):
+    """
+    Async counterpart of ``get_user_role_ids``.
+    """
+    timeout = rbac_setting("RBAC_PERMISSION_CACHE_TIMEOUT")
+    if not timeout:
+        return await aquery_user_role_ids(user)
+
+    if version is None:
+        version = await policy_version.aget_version(policy_version.USER, user.pk)
+    cache_key = _user_roles_key(user, version)
 
-    return set(qs)
+    role_ids = await user_permission_cache.aget(cache_key)
+    if role_ids is not None:
+        return role_ids
+
+    role_ids = await aquery_user_role_ids(user)
+    await user_permission_cache.aset(cache_key, role_ids, timeout)
+    return role_ids
+
+
+def _user_roles_key(user, user_version):
+    return f"rbac:roles:{user.pk}:{user_version}"
+
+
+def _user_roles_queryset(user):
+    return UserRole.objects.filter(user=user).values_list("role_id", flat=True)
+
+
+def query_user_role_ids(user):
+    """
+    Uncached UserRole lookup behind ``get_user_role_ids``.
+    """
+    return frozenset(_user_roles_queryset(user))
+
+
+async def aquery_user_role_ids(user):
+    return frozenset([role_id async for role_id in _user_roles_queryset(user)])
 
 
 def has_permission(permissions, module, submodule, action):
     """
     Check if a permission tuple exists in the user's permissions set.
 
+    With a ``PermissionSet`` this is one registry lookup and a bit test.
+
     Note: Module and SubModule use 'code' as primary key, not 'id'
     """
     key = (
@@ -112,6 +194,39 @@ def has_permission(permissions, module, submodule, action):
 # Optional helper (non-middleware)
 # ─────────────────────────────
 
+# Permission action → access tree flag
+ACTION_FLAGS = {
+    "read": "read",
+    "view": "read",
+    "create": "create",
+    "update": "update",
+    "delete": "delete",
+    "approve": "approve",
+}
+FLAGS = ("read", "create", "update", "delete", "approve")
+
+
+def parse_action(code):
+    """
+    Action part of a permission code: ``"invoice.read"`` → ``"read"``,
+    ``"view"`` → ``"view"``.
+    """
+    return code.lower().rpartition(".")[2]
+
+
+def action_flags(actions):
+    """
+    Flag dict (``read``, ``create``, ``update``, ``delete``, ``approve``)
+    for a collection of parsed actions.
+    """
+    flags = dict.fromkeys(FLAGS, False)
+    for action in actions:
+        flag = ACTION_FLAGS.get(action)
+        if flag:
+            flags[flag] = True
+    return flags
+
+
 def perm_flags(perms):
     """
     Converts a list of permission strings into a dictionary of boolean flags.
@@ -121,15 +236,9 @@ def perm_flags(perms):
 
     Returns:
         dict: Dictionary with keys 'read', 'create', 'update', 'delete', 'approve'
-              and boolean values.
+              and boolean values ('view' counts as 'read').
     """
-    return {
-        "read": any("read" in p or "view" in p for p in perms),
-        "create": any("create" in p for p in perms),
-        "update": any("update" in p for p in perms),
-        "delete": any("delete" in p for p in perms),
-        "approve": any("approve" in p for p in perms),
-    }
+    return action_flags(parse_action(p) for p in perms)
 
 
 def check_user_permission(request):
@@ -165,129 +274,10 @@ def check_user_permission(request):
 
 
 def get_user_role_permission(tenant, user):
-    # 1. Enabled Modules for Tenant
-    enabled_matches = (
-        TenantModule.objects
-        .filter(tenant=tenant, is_enabled=True)
-        .select_related("module", "submodule")
-    )
-
-    # 2. User Permissions (Replica of permission_api_resolver logic but with objects)
-    permissions = Permission.objects.filter(
-        tenant=tenant,
-        roles__role__role_users__user=user,
-        roles__allowed=True,
-        is_active=True
-    ).select_related("module", "submodule").distinct()
-
-    # 3. Blocked APIs
-
-    blocked_apis = UserApiBlock.objects.filter(
-        tenant=tenant,
-        user=user,
-    ).select_related("api_operation__endpoint__module", "api_operation__endpoint__submodule")
-
-    tenant_blocks = TenantApiOverride.objects.filter(
-        tenant=tenant,
-        is_enabled=False
-    ).select_related("api_operation__endpoint__module", "api_operation__endpoint__submodule")
-
-    # 4. Build Access Tree
-    modules = {}
-    submodule_index = {}
-
-    # Initialize modules/submodules from enabled modules
-    for tm in enabled_matches:
-        m = tm.module
-        sm = tm.submodule
-
-        if m.pk not in modules:
-            modules[m.pk] = {
-                "code": m.pk,
-                "name": m.name,
-                "permissions": set(),
-                "blocked_apis": [],
-                "sub_modules": []
-            }
-        if sm:
-            key = (m.pk, sm.pk)
-            if key not in submodule_index:
-                sm_dict = {
-                    "code": sm.pk,
-                    "name": sm.name,
-                    "permissions": set(),
-                    "blocked_apis": []
-                }
-                modules[m.pk]["sub_modules"].append(sm_dict)
-                submodule_index[key] = sm_dict
-
-    for perm in permissions:
-        m = perm.module
-        sm = perm.submodule
-        code = perm.code.lower()  # invoice.read, invoice.approve
-
-        if m.pk in modules:
-            modules[m.pk]["permissions"].add(code)
-
-            if sm and (m.pk, sm.pk) in submodule_index:
-                submodule_index[(m.pk, sm.pk)]["permissions"].add(code)
-
-    # 5. Attach Blocks
-    for block in blocked_apis:
-        op = block.api_operation
-        ep = op.endpoint
-
-        data = {
-            "method": op.http_method,
-            "path": ep.path,
-            "reason": getattr(block, "reason", None)
-        }
-
-        if ep.submodule:
-            key = (ep.module.pk, ep.submodule.pk)
-            if key in submodule_index:
-                submodule_index[key]["blocked_apis"].append(data)
-        else:
-            if ep.module.pk in modules:
-                modules[ep.module.pk]["blocked_apis"].append(data)
-
-    for block in tenant_blocks:
-        op = block.api_operation
-        ep = op.endpoint
-
-        data = {
-            "method": op.http_method,
-            "path": ep.path,
-            "reason": getattr(block, "reason", None)
-        }
-
-        if ep.submodule:
-            key = (ep.module.pk, ep.submodule.pk)
-            if key in submodule_index:
-                submodule_index[key]["blocked_apis"].append(data)
-        else:
-            if ep.module.pk in modules:
-                modules[ep.module.pk]["blocked_apis"].append(data)
-
-    for m in modules.values():
-
-        module_permissions = perm_flags(m["permissions"])
-        m["permissions"] = module_permissions
-
-        for sm in m["sub_modules"]:
-
-            submodule_permissions = perm_flags(sm["permissions"])
-
-            for perm, value in module_permissions.items():
-                if value:
-                    submodule_permissions[perm] = True
-
-            sm["permissions"] = submodule_permissions
-
-    return {
-        "modules": list(modules.values()),
-        "global_blocked_apis": blocked_apis,
-        "roles": Role.objects.filter(tenant=tenant, role_users__user=user)
-        .values("name", "id"),
-    }
+    """
+    The user's access tree (modules, action flags, blocked APIs, roles);
+    see ``core.services.access_tree``.
+    """
+    from msbc_rbac.core.services.access_tree import build_access_tree
 
+    return build_access_tree(tenant, user)
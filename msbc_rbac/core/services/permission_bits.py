@@ -0,0 +1,192 @@
+"""
+Bitset encoding of effective permissions.
+
+Each tenant's active ``(module_code, submodule_code, action)`` permission
+triples are given dense bit positions, and every role's allowed
+permissions are folded into one ``int``.  A user's effective permissions
+are the OR of their roles' bitsets, so a permission check is a single bit
+test instead of a tuple-set lookup, and the per-user cache entry shrinks
+to the user's role ids.
+
+The registry is built per tenant rather than globally: ``Permission`` rows
+belong to a tenant, and tagging the registry with the tenant policy version
+means Role / Permission / RolePermission writes rebuild it together with
+the role bitsets.  Bitsets are only ever cached inside the index that
+assigned their positions, so positions cannot be mixed up between
+processes.  Claims tokens (``core.services.claims``) carry a bitset
+outside the index together with the tenant version it belongs to; they
+are only evaluated against the index of that same version.
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+from msbc_rbac.core.cache import TieredCache
+from msbc_rbac.core.models import Permission, RolePermission
+from msbc_rbac.core.services import policy_version
+
+
+class PermissionSet:
+    """
+    A user's effective permissions as a bitmask over a tenant registry.
+
+    Supports ``(module_code, submodule_code, action) in permissions``,
+    iteration and ``len`` like the frozenset it replaces.
+    """
+
+    __slots__ = ("index", "mask")
+
+    def __init__(self, index, mask):
+        self.index = index
+        self.mask = mask
+
+    def __contains__(self, triple):
+        bit = self.index.bits.get(triple)
+        return bit is not None and bool(self.mask >> bit & 1)
+
+    def __iter__(self):
+        for triple, bit in self.index.bits.items():
+            if self.mask >> bit & 1:
+                yield triple
+
+    def __len__(self):
+        return bin(self.mask).count("1")
+
+    def __repr__(self):
+        return f"<PermissionSet tenant={self.index.tenant_id} {len(self)} permissions>"
+
+
+class PermissionIndex(namedtuple(
+    "PermissionIndex", ["tenant_id", "version", "bits", "role_bits"]
+)):
+    """
+    Immutable per-tenant permission registry.
+
+    ``bits``       (module_code, submodule_code, action) → bit position
+    ``role_bits``  Role id → bitset of the role's allowed permissions
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, tenant_id, version, bits, role_bits):
+        return super().__new__(
+            cls,
+            tenant_id,
+            version,
+            MappingProxyType(dict(bits)),
+            MappingProxyType(dict(role_bits)),
+        )
+
+    def __getnewargs__(self):
+        # mappingproxy cannot be pickled; rebuild it through __new__
+        return (self.tenant_id, self.version, dict(self.bits), dict(self.role_bits))
+
+    def permission_set(self, role_ids):
+        mask = 0
+        for role_id in role_ids:
+            mask |= self.role_bits.get(role_id, 0)
+        return PermissionSet(self, mask)
+
+
+def _triple_order(triple):
+    # Total order over triples that may contain None
+    return tuple((value is None, value or "") for value in triple)
+
+
+def _compile_permission_index(tenant_id, version, triples, role_rows):
+    bits = {
+        triple: position
+        for position, triple in enumerate(sorted(set(triples), key=_triple_order))
+    }
+
+    role_bits = {}
+    for role_id, module_id, submodule_id, code in role_rows:
+        bit = bits.get((module_id, submodule_id, code))
+        if bit is not None:
+            role_bits[role_id] = role_bits.get(role_id, 0) | 1 << bit
+
+    return PermissionIndex(tenant_id, version, bits, role_bits)
+
+
+def _index_querysets(tenant_id):
+    return (
+        Permission.objects.filter(tenant_id=tenant_id, is_active=True)
+        .values_list("module_id", "submodule_id", "code"),
+        RolePermission.objects.filter(
+            permission__tenant_id=tenant_id,
+            permission__is_active=True,
+            allowed=True,
+        ).values_list(
+            "role_id",
+            "permission__module_id",
+            "permission__submodule_id",
+            "permission__code",
+        ),
+    )
+
+
+def build_permission_index(tenant_id, version=None):
+    """
+    Load a tenant's permissions and role grants and compile them.
+    """
+    return _compile_permission_index(tenant_id, version, *_index_querysets(tenant_id))
+
+
+async def abuild_permission_index(tenant_id, version=None):
+    """
+    Async counterpart of ``build_permission_index``.
+    """
+    triples, role_rows = _index_querysets(tenant_id)
+    return _compile_permission_index(
+        tenant_id,
+        version,
+        [row async for row in triples],
+        [row async for row in role_rows],
+    )
+
+
+permission_index_cache = TieredCache("permission_index")
+
+
+def _permission_index_key(tenant_id, version):
+    return f"rbac:permission_index:{tenant_id}:{version}"
+
+
+def get_permission_index(tenant, version=None):
+    """
+    Return the ``PermissionIndex`` for ``tenant`` (instance or id) at the
+    tenant's current policy version, from the two-tier RBAC cache or
+    freshly built.  Pass ``version`` when the caller already read it.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    if version is None:
+        version = policy_version.get_version(policy_version.TENANT, tenant_id)
+    key = _permission_index_key(tenant_id, version)
+
+    index = permission_index_cache.get(key)
+    if index is None:
+        index = build_permission_index(tenant_id, version=version)
+        permission_index_cache.set(key, index)
+    return index
+
+
+async def aget_permission_index(tenant, version=None):
+    """
+    Async counterpart of ``get_permission_index``.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    if version is None:
+        version = await policy_version.aget_version(policy_version.TENANT, tenant_id)
+    key = _permission_index_key(tenant_id, version)
+
+    index = await permission_index_cache.aget(key)
+    if index is None:
+        index = await abuild_permission_index(tenant_id, version=version)
+        await permission_index_cache.aset(key, index)
+    return index
+
+
+def clear_permission_indexes():
+    """
+    Drop every permission index held in this worker's L1.
+    """
+    permission_index_cache.clear_local()
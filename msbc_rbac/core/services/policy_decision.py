@@ -0,0 +1,441 @@
+"""
+RBAC policy evaluation (steps 4-10 of ``RBACMiddleware``).
+
+``evaluate_policy`` walks the policy steps in a fixed order and returns a
+``Decision``.  Where the inputs come from is up to the ``*PolicyInputs``
+object handed in:
+
+  - ``DatabasePolicyInputs``     compiled tenant policy + lazy per-step
+                                 lookups (default mode)
+  - ``SingleQueryPolicyInputs``  every input fetched with one SQL statement
+  - ``AsyncPolicyInputs``        async ORM / cache, loaded before evaluation
+  - ``PreloadedPolicyInputs``    one load per (tenant, user), reused for many
+                                 operations (batch checks)
+  - ``ClaimsPolicyInputs``       user inputs from a verified claims token
+
+All produce identical decisions; only the number of round trips differs.
+"""
+from collections import namedtuple
+from datetime import date
+
+from django.db import connection, models
+
+from msbc_rbac.accounts.models import UserApiBlock, UserEffectivePermission, UserRole
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+from msbc_rbac.core.models import (
+    Permission,
+    RolePermission,
+    TenantApiOverride,
+    TenantModule,
+)
+from msbc_rbac.core.rbac.constants import HTTP_METHOD_ACTION_MAP
+from msbc_rbac.core.services import effective_permissions
+from msbc_rbac.core.services.permission_api_resolver import (
+    aget_user_permissions,
+    get_user_permissions,
+    has_permission,
+    tenant_api_disabled,
+    user_api_blocked,
+)
+from msbc_rbac.core.services.permission_bits import PermissionSet, get_permission_index
+from msbc_rbac.core.services.stage_timing import NULL_TIMER
+from msbc_rbac.core.services.tenant_policy import (
+    TenantModuleState,
+    aget_tenant_policy,
+    get_tenant_policy,
+)
+from msbc_rbac.core.services.user_blocks import (
+    ais_user_blocked,
+    get_block_index,
+    get_blocked_operations,
+)
+
+Decision = namedtuple("Decision", ["allowed", "violation"])
+
+ALLOW = Decision(True, None)
+
+
+def deny(violation):
+    return Decision(False, violation)
+
+
+def action_code_for(operation, method):
+    """
+    Permission action required for ``operation`` (step 8).
+    """
+    return operation.permission_code or HTTP_METHOD_ACTION_MAP.get(method.upper())
+
+
+# ─────────────────────────────
+# Input sources
+# ─────────────────────────────
+class DatabasePolicyInputs:
+    """
+    Fetches each policy input on demand.
+
+    Tenant subscription and override checks are answered from the worker's
+    compiled ``TenantPolicy``; the remaining steps query (or hit the
+    permission cache) one step at a time.
+    """
+
+    def __init__(self, tenant, user, operation, method):
+        self.tenant = tenant
+        self.user = user
+        self.operation = operation
+        self.method = method
+        self._permissions = None
+
+    def tenant_module(self):
+        endpoint = self.operation.endpoint
+        return get_tenant_policy(self.tenant).tenant_module(
+            endpoint.module_id,
+            endpoint.submodule_id,
+        )
+
+    def tenant_api_disabled(self):
+        return tenant_api_disabled(self.tenant, self.operation)
+
+    def user_api_blocked(self):
+        return user_api_blocked(self.tenant, self.user, self.operation)
+
+    def has_permission(self, submodule, action):
+        if self._permissions is None:
+            self._permissions = get_user_permissions(self.tenant, self.user)
+        return has_permission(
+            self._permissions,
+            module=self.operation.endpoint.module,
+            submodule=submodule,
+            action=action,
+        )
+
+
+class SingleQueryPolicyInputs:
+    """
+    Fetches every input for steps 5-9 with a single SQL statement.
+
+    The operation itself comes from the in-memory route table, so a full
+    policy evaluation costs exactly one database round trip.  Requires a
+    tenant; callers fall back to ``DatabasePolicyInputs`` without one.
+    """
+
+    def __init__(self, tenant, user, operation, method):
+        self.tenant = tenant
+        self.user = user
+        self.operation = operation
+        self.method = method
+        self._row = self._fetch()
+
+    def _fetch(self):
+        endpoint = self.operation.endpoint
+        tenant_id = getattr(self.tenant, "pk", self.tenant)
+        action = action_code_for(self.operation, self.method)
+
+        effective = effective_permissions.is_enabled()
+        # rp.allowed / p.is_active are already applied to materialized rows
+        grant_flags = [] if effective else [True, True]
+
+        params = [
+            # tm CTE
+            tenant_id, endpoint.module_id, endpoint.submodule_id,
+            # tenant override
+            tenant_id, self.operation.pk, False,
+            # user block
+            tenant_id, self.user.pk, self.operation.pk,
+            # module-level permission
+            tenant_id, self.user.pk, *grant_flags, endpoint.module_id, action,
+            # submodule-level permission
+            tenant_id, self.user.pk, *grant_flags, endpoint.module_id, endpoint.submodule_id, action,
+        ]
+
+        with connection.cursor() as cursor:
+            cursor.execute(_decision_sql(effective), params)
+            return cursor.fetchone()
+
+    def tenant_module(self):
+        found, is_enabled, expiration_date = self._row[:3]
+        if not found:
+            return None
+        return TenantModuleState(
+            bool(is_enabled),
+            models.DateField().to_python(expiration_date),
+        )
+
+    def tenant_api_disabled(self):
+        return bool(self._row[3])
+
+    def user_api_blocked(self):
+        return bool(self._row[4])
+
+    def has_permission(self, submodule, action):
+        return bool(self._row[6] if submodule else self._row[5])
+
+
+class AsyncPolicyInputs:
+    """
+    Policy inputs for the async middleware path.
+
+    ``evaluate_policy`` is synchronous, so ``load()`` awaits everything it
+    may ask for up front using the async ORM and cache APIs.  On a warm
+    worker these are in-memory snapshots and cache reads, never queries.
+    """
+
+    def __init__(self, tenant, user, operation, method):
+        self.tenant = tenant
+        self.user = user
+        self.operation = operation
+        self.method = method
+        self._tenant_module = None
+        self._tenant_api_disabled = False
+        self._user_api_blocked = False
+        self._permissions = None
+
+    async def load(self):
+        if self.tenant:
+            endpoint = self.operation.endpoint
+            policy = await aget_tenant_policy(self.tenant)
+            self._tenant_module = policy.tenant_module(endpoint.module_id, endpoint.submodule_id)
+            self._tenant_api_disabled = policy.api_disabled(self.operation.pk)
+            self._user_api_blocked = await ais_user_blocked(self.tenant, self.user, self.operation)
+            self._permissions = await aget_user_permissions(self.tenant, self.user)
+        return self
+
+    def tenant_module(self):
+        return self._tenant_module
+
+    def tenant_api_disabled(self):
+        return self._tenant_api_disabled
+
+    def user_api_blocked(self):
+        return self._user_api_blocked
+
+    def has_permission(self, submodule, action):
+        if self._permissions is None:
+            # Tenant-less users: raises exactly like the sync path, before
+            # touching the database (the tenant is already cached as None).
+            self._permissions = get_user_permissions(self.tenant, self.user)
+        return has_permission(
+            self._permissions,
+            module=self.operation.endpoint.module,
+            submodule=submodule,
+            action=action,
+        )
+
+
+class PreloadedPolicyInputs:
+    """
+    Policy inputs for many operations of one (tenant, user).
+
+    The tenant policy, the user's blocked operations and permission set
+    are loaded once; ``for_operation`` then points the inputs at each
+    operation in turn, so every further evaluation is in-memory.
+    """
+
+    def __init__(self, tenant, user):
+        self.tenant = tenant
+        self.user = user
+        self.operation = None
+        self._policy = None
+        self._blocked = frozenset()
+        self._permissions = None
+        if tenant:
+            self._policy = get_tenant_policy(tenant)
+            if user.pk in get_block_index(tenant).blocked_user_ids:
+                self._blocked = get_blocked_operations(tenant, user)
+            self._permissions = get_user_permissions(tenant, user)
+
+    def for_operation(self, operation):
+        self.operation = operation
+        return self
+
+    def tenant_module(self):
+        endpoint = self.operation.endpoint
+        return self._policy.tenant_module(endpoint.module_id, endpoint.submodule_id)
+
+    def tenant_api_disabled(self):
+        return bool(self._policy) and self._policy.api_disabled(self.operation.pk)
+
+    def user_api_blocked(self):
+        return self.operation.pk in self._blocked
+
+    def has_permission(self, submodule, action):
+        if self._permissions is None:
+            # Tenant-less users: raises like the other input sources.
+            self._permissions = get_user_permissions(self.tenant, self.user)
+        return has_permission(
+            self._permissions,
+            module=self.operation.endpoint.module,
+            submodule=submodule,
+            action=action,
+        )
+
+
+class ClaimsPolicyInputs:
+    """
+    Policy inputs for a caller presenting current ``Claims``.
+
+    Permissions and blocks come from the claims; the tenant subscription
+    and override checks from the compiled ``TenantPolicy``.  Nothing is
+    loaded per user.
+    """
+
+    def __init__(self, claims, operation):
+        self.claims = claims
+        self.operation = operation
+        self._policy = get_tenant_policy(claims.tenant_id)
+        self._permissions = PermissionSet(
+            get_permission_index(claims.tenant_id, version=claims.tenant_version),
+            claims.mask,
+        )
+
+    def tenant_module(self):
+        endpoint = self.operation.endpoint
+        return self._policy.tenant_module(endpoint.module_id, endpoint.submodule_id)
+
+    def tenant_api_disabled(self):
+        return self._policy.api_disabled(self.operation.pk)
+
+    def user_api_blocked(self):
+        return self.operation.pk in self.claims.blocked
+
+    def has_permission(self, submodule, action):
+        return has_permission(
+            self._permissions,
+            module=self.operation.endpoint.module,
+            submodule=submodule,
+            action=action,
+        )
+
+
+_DECISION_SQL = {}
+
+
+def _decision_sql(effective=False):
+    """
+    Build (once per variant) the decision statement from the models' table
+    names so custom ``db_table`` settings are honoured.
+
+    With ``effective`` the permission checks read the materialized
+    ``UserEffectivePermission`` table instead of joining the grant tables.
+    """
+    if effective not in _DECISION_SQL:
+        tables = {
+            "tm": TenantModule._meta.db_table,
+            "override": TenantApiOverride._meta.db_table,
+            "block": UserApiBlock._meta.db_table,
+            "perm": Permission._meta.db_table,
+            "role_perm": RolePermission._meta.db_table,
+            "user_role": UserRole._meta.db_table,
+            "effective": UserEffectivePermission._meta.db_table,
+        }
+        if effective:
+            permission_exists = """
+            EXISTS (
+                SELECT 1
+                FROM {effective} p
+                WHERE p.tenant_id = %s
+                  AND p.user_id = %s
+                  AND p.module_id = %s
+                  AND {submodule_clause}
+                  AND p.code = %s
+            )
+        """
+        else:
+            permission_exists = """
+            EXISTS (
+                SELECT 1
+                FROM {perm} p
+                JOIN {role_perm} rp ON rp.permission_id = p.id
+                JOIN {user_role} ur ON ur.role_id = rp.role_id
+                WHERE p.tenant_id = %s
+                  AND ur.user_id = %s
+                  AND rp.allowed = %s
+                  AND p.is_active = %s
+                  AND p.module_id = %s
+                  AND {submodule_clause}
+                  AND p.code = %s
+            )
+        """
+        _DECISION_SQL[effective] = f"""
+            WITH tm AS (
+                SELECT is_enabled, expiration_date
+                FROM {tables['tm']}
+                WHERE tenant_id = %s
+                  AND module_id = %s
+                  AND (submodule_id IS NULL OR submodule_id = %s)
+                ORDER BY id
+                LIMIT 1
+            )
+            SELECT
+                EXISTS (SELECT 1 FROM tm),
+                (SELECT is_enabled FROM tm),
+                (SELECT expiration_date FROM tm),
+                EXISTS (
+                    SELECT 1 FROM {tables['override']}
+                    WHERE tenant_id = %s AND api_operation_id = %s AND is_enabled = %s
+                ),
+                EXISTS (
+                    SELECT 1 FROM {tables['block']}
+                    WHERE tenant_id = %s AND user_id = %s AND api_operation_id = %s
+                ),
+                {permission_exists.format(submodule_clause='p.submodule_id IS NULL', **tables)},
+                {permission_exists.format(submodule_clause='p.submodule_id = %s', **tables)}
+        """
+    return _DECISION_SQL[effective]
+
+
+# ─────────────────────────────
+# Evaluation
+# ─────────────────────────────
+def evaluate_policy(operation, tenant, method, inputs, timer=NULL_TIMER):
+    """
+    Run policy steps 4-10 for an already resolved ``operation``.
+
+    The first failing step determines the violation (deny wins).  Input
+    lookups are timed per stage on ``timer``.
+    """
+    # 4. Platform-level API disable
+    if not operation.is_enabled:
+        return deny(RBACPermissionDenied.API_DISABLED_GLOBALLY)
+
+    # 5. Tenant module subscription check
+    if tenant:
+        with timer.stage("subscription"):
+            tm = inputs.tenant_module()
+
+        if not tm:
+            return deny(RBACPermissionDenied.TENANT_NOT_SUBSCRIBED)
+
+        if not tm.is_enabled:
+            return deny(RBACPermissionDenied.MODULE_DISABLED)
+
+        if tm.expiration_date and tm.expiration_date < date.today():
+            return deny(RBACPermissionDenied.SUBSCRIPTION_EXPIRED)
+
+    # 6. Tenant-level API override
+    with timer.stage("tenant_override"):
+        api_disabled = inputs.tenant_api_disabled()
+    if api_disabled:
+        return deny(RBACPermissionDenied.API_DISABLED_FOR_TENANT)
+
+    # 7. User-level explicit API block
+    with timer.stage("user_block"):
+        blocked = inputs.user_api_blocked()
+    if blocked:
+        return deny(RBACPermissionDenied.API_BLOCKED_FOR_USER)
+
+    # 8. Resolve permission action code
+    action_code = action_code_for(operation, method)
+    if not action_code:
+        return deny(RBACPermissionDenied.UNKNOWN_ACTION)
+
+    # 9. Module-level permission covers all submodules, then submodule-level
+    with timer.stage("permission"):
+        allowed = inputs.has_permission(None, action_code)
+        if not allowed:
+            submodule = operation.endpoint.submodule
+            allowed = bool(submodule) and inputs.has_permission(submodule, action_code)
+    if allowed:
+        return ALLOW
+
+    # 10. Default deny
+    return deny(RBACPermissionDenied.PERMISSION_DENIED)
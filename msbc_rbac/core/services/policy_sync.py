@@ -0,0 +1,207 @@
+"""
+Cross-node propagation of policy version bumps.
+
+Version tokens live in the RBAC cache.  When that cache is not shared by
+every worker (``LocMemCache``, one memcached per node), a bump only reaches
+the workers reading the cache it was written to.  With ``RBAC_POLICY_SYNC``
+every bump is also
+
+  - upserted into ``PolicyVersion`` (one row per scope), and
+  - on PostgreSQL, sent with ``NOTIFY rbac_policy``.
+
+A daemon thread in every worker (``PolicySyncThread``) picks the bumps up,
+through ``LISTEN`` on PostgreSQL or by polling ``PolicyVersion``
+otherwise, and stores each token in its own RBAC cache, so only entries of
+the bumped scope (e.g. one tenant) become unreachable.  After every
+(re)connect the listener polls once to catch bumps it missed.
+
+The delay between a bump and its arrival is recorded in the
+``policy_propagation`` histogram (``/api/rbac/stage-timings/``).  Across
+nodes it includes their clock skew.
+"""
+import json
+import logging
+import os
+import select
+import threading
+import time
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils import timezone
+
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.models import PolicyVersion
+from msbc_rbac.core.services import policy_version
+from msbc_rbac.core.services.stage_timing import get_histogram
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "rbac_policy"
+
+# Bumps are re-read for this long: commits can land out of timestamp order
+# and node clocks drift.  Tokens already applied are skipped.
+LOOKBACK = timedelta(seconds=30)
+
+# Window re-applied after (re)connecting.  Cached values expire within
+# minutes, so older bumps can no longer hide stale entries.
+CATCH_UP = timedelta(hours=1)
+
+
+def sync_mode():
+    """
+    ``"listen"``, ``"poll"`` or ``None`` (off), resolving ``"auto"``.
+    """
+    mode = rbac_setting("RBAC_POLICY_SYNC")
+    if mode == "auto":
+        vendor = connections[DEFAULT_DB_ALIAS].vendor
+        return "listen" if vendor == "postgresql" else "poll"
+    return mode or None
+
+
+# ─────────────────────────────
+# Publishing
+# ─────────────────────────────
+def publish(scope, token):
+    """
+    Record ``token`` as the latest version of ``scope`` (``"tenant:5"``)
+    and notify listeners.  Failures are logged, not raised: the local
+    cache has already been bumped.
+    """
+    now = timezone.now()
+    connection = connections[DEFAULT_DB_ALIAS]
+    try:
+        PolicyVersion.objects.update_or_create(
+            scope=scope,
+            defaults={"token": token, "changed_at": now},
+        )
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT pg_notify(%s, %s)",
+                    [CHANNEL, json.dumps([scope, token, now.timestamp()])],
+                )
+    except DatabaseError:
+        logger.exception("Could not publish RBAC policy version for %s", scope)
+
+
+# ─────────────────────────────
+# Receiving
+# ─────────────────────────────
+class PolicySyncThread(threading.Thread):
+    """
+    Applies policy version bumps published by other processes to this
+    worker's RBAC cache.
+    """
+
+    def __init__(self, mode, interval):
+        super().__init__(name="rbac-policy-sync", daemon=True)
+        self.mode = mode
+        self.interval = interval
+        self.pid = os.getpid()
+        self.applied = {}
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def run(self):
+        try:
+            while not self._stopped.is_set():
+                try:
+                    if self.mode == "listen":
+                        self._listen()
+                    else:
+                        self._poll_forever()
+                except Exception:
+                    logger.exception("RBAC policy sync failed; retrying in %ss", self.interval)
+                    connections.close_all()
+                    self._stopped.wait(self.interval)
+        finally:
+            connections.close_all()
+
+    def _apply(self, scope, token, sent_at, record):
+        if self.applied.get(scope) == token:
+            return
+        self.applied[scope] = token
+        policy_version.set_version(scope, token)
+        if record:
+            delay_ns = max(0.0, time.time() - sent_at) * 1e9
+            get_histogram("policy_propagation").observe(delay_ns, 0)
+
+    def _poll(self, window, record=True):
+        rows = PolicyVersion.objects.filter(
+            changed_at__gte=timezone.now() - window,
+        ).values_list("scope", "token", "changed_at")
+        for scope, token, changed_at in rows:
+            self._apply(scope, token, changed_at.timestamp(), record)
+
+    def _poll_forever(self):
+        self._poll(CATCH_UP, record=False)
+        while not self._stopped.wait(self.interval):
+            self._poll(LOOKBACK)
+
+    def _listen(self):
+        wrapper = connections[DEFAULT_DB_ALIAS]
+        raw = wrapper.get_new_connection(wrapper.get_connection_params())
+        try:
+            raw.autocommit = True
+            with raw.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANNEL}")
+
+            self._poll(CATCH_UP, record=False)
+            while not self._stopped.is_set():
+                for payload in self._notifications(raw):
+                    scope, token, sent_at = json.loads(payload)
+                    self._apply(scope, token, sent_at, record=True)
+        finally:
+            raw.close()
+
+    def _notifications(self, raw):
+        if hasattr(raw, "poll"):
+            # psycopg2
+            if select.select([raw], [], [], self.interval) == ([], [], []):
+                return []
+            raw.poll()
+            payloads = [notify.payload for notify in raw.notifies]
+            raw.notifies.clear()
+            return payloads
+        # psycopg 3
+        return [notify.payload for notify in raw.notifies(timeout=self.interval)]
+
+
+_thread = None
+_thread_lock = threading.Lock()
+
+
+def start():
+    """
+    Start this process's sync thread (no-op when ``RBAC_POLICY_SYNC`` is
+    off or the thread already runs in this process).
+    """
+    global _thread
+
+    mode = sync_mode()
+    if mode is None:
+        return None
+
+    with _thread_lock:
+        thread = _thread
+        if thread is None or not thread.is_alive() or thread.pid != os.getpid():
+            thread = _thread = PolicySyncThread(mode, rbac_setting("RBAC_POLICY_POLL_INTERVAL"))
+            thread.start()
+    return thread
+
+
+def stop():
+    """
+    Stop this process's sync thread, e.g. in a gunicorn master before it
+    forks workers (threads do not survive fork).
+    """
+    global _thread
+
+    with _thread_lock:
+        thread, _thread = _thread, None
+    if thread is not None and thread.pid == os.getpid():
+        thread.stop()
+        thread.join(timeout=thread.interval + 1)
@@ -0,0 +1,137 @@
+"""
+Policy version tokens.
+
+Every piece of cached RBAC data is tagged with the version token of the
+scope it was built from.  A write to the underlying tables bumps the token
+(after the transaction commits), so values tagged with the old token are
+simply never read again by any worker sharing the RBAC cache.  Workers
+on other caches learn about bumps through ``core.services.policy_sync``
+when ``RBAC_POLICY_SYNC`` is on.
+
+Scopes:
+  - ``routes``            → ApiEndpoint / ApiOperation registry (global)
+  - ``tenant:<id>``       → Role / Permission / RolePermission, TenantModule
+                            and TenantApiOverride rows of a tenant
+  - ``blocks:<id>``       → which users of a tenant have UserApiBlock rows
+  - ``user:<id>``         → UserRole / UserApiBlock rows of a user
+"""
+import uuid
+
+from django.db import transaction
+
+from msbc_rbac.core.cache import get_rbac_cache
+from msbc_rbac.core.conf import rbac_setting
+
+ROUTES = "routes"
+TENANT = "tenant"
+BLOCKS = "blocks"
+USER = "user"
+
+
+def scope_name(scope, key=None):
+    """
+    ``"routes"``, ``"tenant:5"``, ... as used in cache keys and by
+    ``policy_sync``.
+    """
+    if key is None:
+        return scope
+    return f"{scope}:{key}"
+
+
+def _version_key(scope, key=None):
+    return f"rbac:version:{scope_name(scope, key)}"
+
+
+def _new_token():
+    return uuid.uuid4().hex[:12]
+
+
+def get_version(scope, key=None):
+    """
+    Return the current version token for ``scope`` (and optional ``key``),
+    creating one if the cache has none yet.
+    """
+    cache = get_rbac_cache()
+    cache_key = _version_key(scope, key)
+
+    version = cache.get(cache_key)
+    if version is None:
+        version = _new_token()
+        if not cache.add(cache_key, version, timeout=None):
+            version = cache.get(cache_key, version)
+    return version
+
+
+def get_versions(*scopes):
+    """
+    Return the version tokens for several ``(scope, key)`` pairs using a
+    single cache round trip (missing tokens are created individually).
+    """
+    cache = get_rbac_cache()
+    cache_keys = [_version_key(scope, key) for scope, key in scopes]
+    found = cache.get_many(cache_keys)
+
+    return [
+        found[cache_key] if cache_key in found else get_version(scope, key)
+        for cache_key, (scope, key) in zip(cache_keys, scopes)
+    ]
+
+
+async def aget_version(scope, key=None):
+    """
+    Async counterpart of ``get_version``.
+    """
+    cache = get_rbac_cache()
+    cache_key = _version_key(scope, key)
+
+    version = await cache.aget(cache_key)
+    if version is None:
+        version = _new_token()
+        if not await cache.aadd(cache_key, version, timeout=None):
+            version = await cache.aget(cache_key, version)
+    return version
+
+
+async def aget_versions(*scopes):
+    """
+    Async counterpart of ``get_versions``.
+    """
+    cache = get_rbac_cache()
+    cache_keys = [_version_key(scope, key) for scope, key in scopes]
+    found = await cache.aget_many(cache_keys)
+
+    return [
+        found[cache_key] if cache_key in found else await aget_version(scope, key)
+        for cache_key, (scope, key) in zip(cache_keys, scopes)
+    ]
+
+
+def bump_version(scope, key=None):
+    """
+    Replace the version token for ``scope`` immediately.
+    """
+    version = _new_token()
+    get_rbac_cache().set(_version_key(scope, key), version, timeout=None)
+    if rbac_setting("RBAC_POLICY_SYNC"):
+        from msbc_rbac.core.services import policy_sync
+
+        policy_sync.publish(scope_name(scope, key), version)
+    return version
+
+
+def set_version(name, version):
+    """
+    Store a token received from another process for the scope ``name``
+    (see ``scope_name``).
+    """
+    get_rbac_cache().set(_version_key(name), version, timeout=None)
+
+
+def bump_version_on_commit(scope, key=None):
+    """
+    Bump the version token once the current transaction commits.
+
+    Bumping before commit would let another worker rebuild from
+    uncommitted state and cache it under the new token.
+    """
+    transaction.on_commit(lambda: bump_version(scope, key))
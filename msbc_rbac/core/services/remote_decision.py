@@ -0,0 +1,263 @@
+"""
+Remote RBAC decisions (``RBAC_DECISION_MODE = "remote"``).
+
+Services that should not read the RBAC tables themselves delegate each
+decision to a central RBAC service (``POST <RBAC_REMOTE_URL>decide``),
+forwarding the caller's credentials (``Authorization`` header or session
+cookie).  The central service authenticates the caller, evaluates the
+policy and returns the decision with the caller's policy version tag.
+
+Decisions are cached per worker, keyed by the caller's latest known
+version tag:
+
+  - younger than ``RBAC_REMOTE_FRESH_TTL``: served from the cache
+  - younger than ``RBAC_REMOTE_STALE_TTL``: served from the cache while a
+    background request revalidates it (stale-while-revalidate); when that
+    request returns a new tag, every older decision of the caller becomes
+    unreachable
+  - otherwise: fetched synchronously
+
+The central service answers 401 for credentials it does not authenticate
+(``decide`` returns ``None``) and 403 for a caller it refuses (a denial).
+
+Requests go over a small pool of keep-alive connections.  If the central
+service cannot be reached, stale decisions are still served until they
+expire; without one, ``RemoteDecisionError`` is raised (the middleware
+answers 503).
+"""
+import hashlib
+import http.client
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+from msbc_rbac.core.cache import CacheStats, LRUCache
+from msbc_rbac.core.conf import rbac_setting
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+from msbc_rbac.core.services.policy_decision import Decision, deny
+
+logger = logging.getLogger(__name__)
+
+remote_decision_stats = CacheStats("remote_decisions")
+
+
+class RemoteDecisionError(Exception):
+    """
+    The central RBAC service could not answer.
+    """
+
+
+def forwarded_credentials(request):
+    """
+    Headers carrying the caller's credentials to the central service, or
+    ``None`` for an anonymous request.
+    """
+    authorization = request.META.get("HTTP_AUTHORIZATION")
+    if authorization:
+        return {"Authorization": authorization}
+
+    session = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if session:
+        return {"Cookie": f"{settings.SESSION_COOKIE_NAME}={session}"}
+    return None
+
+
+# ─────────────────────────────
+# Transport
+# ─────────────────────────────
+class ConnectionPool:
+    """
+    Keep-alive HTTP(S) connections to one host, reused across requests.
+    """
+
+    def __init__(self, url, size, timeout):
+        parts = urlsplit(url)
+        self.connection_class = (
+            http.client.HTTPSConnection if parts.scheme == "https" else http.client.HTTPConnection
+        )
+        self.host = parts.netloc
+        self.base_path = parts.path.rstrip("/") + "/"
+        self.timeout = timeout
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.connection_class(self.host, timeout=self.timeout)
+
+    def _release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            connection.close()
+
+    def post_json(self, path, payload, headers):
+        """
+        POST ``payload`` as JSON; returns ``(status, parsed body or None)``.
+        """
+        body = json.dumps(payload)
+        headers = {**headers, "Content-Type": "application/json", "Accept": "application/json"}
+
+        # An idle connection may have been closed by the server: retry once
+        # on a fresh one.
+        for attempt in (1, 2):
+            connection = self._acquire() if attempt == 1 else self.connection_class(
+                self.host, timeout=self.timeout,
+            )
+            try:
+                connection.request("POST", self.base_path + path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except (OSError, http.client.HTTPException) as exc:
+                connection.close()
+                if attempt == 2:
+                    raise RemoteDecisionError(f"RBAC service unreachable: {exc}") from exc
+                continue
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._release(connection)
+            try:
+                return response.status, json.loads(data) if data else None
+            except ValueError:
+                return response.status, None
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+# ─────────────────────────────
+# Client
+# ─────────────────────────────
+class RemoteDecisionClient:
+    """
+    Cached client for the central service's ``decide`` endpoint.
+    """
+
+    def __init__(self, url, timeout=2, pool_size=10, fresh_ttl=5, stale_ttl=60, maxsize=10000):
+        self.pool = ConnectionPool(url, pool_size, timeout)
+        self.fresh_ttl = fresh_ttl
+        # principal → latest version tag; (principal, tag, method, target)
+        # → (Decision, fetched at)
+        self._versions = LRUCache(maxsize, stale_ttl)
+        self._decisions = LRUCache(maxsize, stale_ttl)
+        self._refreshing = set()
+        self._refreshing_lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="rbac-remote")
+
+    @staticmethod
+    def _principal(credentials):
+        raw = "\n".join(f"{name}:{value}" for name, value in sorted(credentials.items()))
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def decide(self, credentials, method, path, route=None):
+        """
+        ``Decision`` for the caller identified by ``credentials`` (see
+        ``forwarded_credentials``), or ``None`` when the central service
+        does not authenticate them.
+        """
+        method = method.upper()
+        principal = self._principal(credentials)
+        version = self._versions.get(principal)
+
+        entry = None
+        if version is not None:
+            entry = self._decisions.get((principal, version, method, route or path))
+        if entry is None:
+            remote_decision_stats.miss()
+            return self._fetch(credentials, principal, method, path, route)
+
+        remote_decision_stats.hit()
+        decision, fetched_at = entry
+        if time.monotonic() - fetched_at >= self.fresh_ttl:
+            self._revalidate(credentials, principal, method, path, route)
+        return decision
+
+    def _fetch(self, credentials, principal, method, path, route):
+        status, data = self.pool.post_json(
+            "decide",
+            {"method": method, "path": path, "route": route},
+            credentials,
+        )
+        if status == 401:
+            return None
+        if status == 403:
+            return deny(RBACPermissionDenied.PERMISSION_DENIED)
+        if status != 200 or not isinstance(data, dict):
+            raise RemoteDecisionError(f"RBAC service answered {status}")
+
+        decision = Decision(bool(data["allowed"]), data.get("violation"))
+        version = data["version"]
+        self._versions.set(principal, version)
+        self._decisions.set((principal, version, method, route or path), (decision, time.monotonic()))
+        return decision
+
+    def _revalidate(self, credentials, principal, method, path, route):
+        key = (principal, method, route or path)
+        with self._refreshing_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self._fetch(credentials, principal, method, path, route)
+            except RemoteDecisionError as exc:
+                logger.warning("Serving stale RBAC decision: %s", exc)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(key)
+
+        self._executor.submit(refresh)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+        self.pool.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _client_config():
+    return (
+        rbac_setting("RBAC_REMOTE_URL"),
+        rbac_setting("RBAC_REMOTE_TIMEOUT"),
+        rbac_setting("RBAC_REMOTE_POOL_SIZE"),
+        rbac_setting("RBAC_REMOTE_FRESH_TTL"),
+        rbac_setting("RBAC_REMOTE_STALE_TTL"),
+        rbac_setting("RBAC_DECISION_CACHE_SIZE"),
+    )
+
+
+def get_client():
+    """
+    This process's ``RemoteDecisionClient`` (rebuilt when the settings
+    change, or in a forked child).
+    """
+    global _client
+
+    config = _client_config()
+    if not config[0]:
+        raise RemoteDecisionError("RBAC_REMOTE_URL is not set")
+
+    with _client_lock:
+        current = _client
+        if current is None or current[0] != config or current[1] != os.getpid():
+            if current is not None and current[1] == os.getpid():
+                current[2].close()
+            current = _client = (config, os.getpid(), RemoteDecisionClient(*config))
+    return current[2]
@@ -0,0 +1,349 @@
+"""
+Compiled API route table.
+
+Registered ``ApiEndpoint`` paths are compiled once into a segment trie so
+that resolving a request path costs one dict lookup per path segment,
+independent of how many endpoints are registered.
+
+Requests Django has already resolved are looked up by their URL route
+(``request.resolver_match.route``, stored on ``ApiEndpoint.route`` by
+``api_sync_db_operation``) with a single dict lookup.  Other requests fall
+back to matching the path against the trie.
+
+Routes and paths are registered without the language prefix that
+``i18n_patterns()`` adds; ``strip_locale_prefix`` removes it from requests.
+
+Path matching rules (same as the original table-scan resolver):
+  - trailing slashes are ignored on both sides
+  - ``{param}`` matches exactly one non-empty segment
+  - at each segment, static children are tried before ``{param}`` wildcards
+
+The compiled table is tagged with the ``routes`` policy version and is
+rebuilt lazily on the first lookup after ApiEndpoint / ApiOperation change.
+It is shared between workers through the two-tier RBAC cache.
+"""
+import functools
+import re
+import threading
+from collections import namedtuple
+
+from django.conf import settings
+from django.urls import LocalePrefixPattern, get_resolver
+
+from msbc_rbac.core.cache import TieredCache
+from msbc_rbac.core.models import ApiEndpoint, ApiOperation, Module, SubModule
+from msbc_rbac.core.services import policy_version
+
+PARAM_SEGMENT_RE = re.compile(r'^\{\w+\}$')
+PARAM_RE = re.compile(r'\{(\w+)\}')
+
+# Paths still containing raw regex syntax (never cleaned up by
+# ``cleanup_api_endpoints``) cannot be split into segments safely.
+LEGACY_REGEX_CHARS = set('^$()[]*+?\\|')
+
+EndpointRecord = namedtuple(
+    "EndpointRecord", ["id", "path", "route", "module_id", "submodule_id", "operations"]
+)
+OperationRecord = namedtuple(
+    "OperationRecord", ["id", "http_method", "is_enabled", "permission_code"]
+)
+
+
+class _Node:
+    __slots__ = ("static", "wildcard", "patterns", "endpoint")
+
+    def __init__(self):
+        self.static = {}
+        self.wildcard = None
+        self.patterns = []
+        self.endpoint = None
+
+
+def _split(path):
+    return path.rstrip("/").split("/")
+
+
+def _endpoint_priority(record):
+    # Mirrors the old resolver: an exact (slash-less) path match won over
+    # pattern matches, then the lowest id won.
+    return (0 if record.path == record.path.rstrip("/") else 1, record.id)
+
+
+class RouteTable:
+    """
+    Immutable snapshot of the API registry compiled into a segment trie.
+    """
+
+    def __init__(self, endpoints, modules, submodules, version=None):
+        self.version = version
+        self._modules = modules
+        self._submodules = submodules
+        self._root = _Node()
+        self._legacy = []
+        self._routes = {}
+
+        for record in sorted(endpoints, key=lambda r: r.id):
+            if record.route:
+                current = self._routes.get(record.route)
+                if current is None or _endpoint_priority(record) < _endpoint_priority(current):
+                    self._routes[record.route] = record
+
+            if LEGACY_REGEX_CHARS.intersection(record.path):
+                pattern = PARAM_RE.sub(r'[^/]+', record.path)
+                self._legacy.append((re.compile(f'^{pattern.rstrip("/")}$'), record))
+                continue
+            self._insert(record)
+
+    def _insert(self, record):
+        node = self._root
+        for segment in _split(record.path):
+            if "{" not in segment:
+                node = node.static.setdefault(segment, _Node())
+            elif PARAM_SEGMENT_RE.match(segment):
+                if node.wildcard is None:
+                    node.wildcard = _Node()
+                node = node.wildcard
+            else:
+                pattern = re.compile('^' + PARAM_RE.sub(r'[^/]+', segment) + '$')
+                for existing, child in node.patterns:
+                    if existing.pattern == pattern.pattern:
+                        node = child
+                        break
+                else:
+                    child = _Node()
+                    node.patterns.append((pattern, child))
+                    node = child
+
+        if node.endpoint is None or _endpoint_priority(record) < _endpoint_priority(node.endpoint):
+            node.endpoint = record
+
+    def _match(self, node, segments, index):
+        if index == len(segments):
+            return node.endpoint
+
+        segment = segments[index]
+
+        child = node.static.get(segment)
+        if child is not None:
+            found = self._match(child, segments, index + 1)
+            if found is not None:
+                return found
+
+        if segment and node.wildcard is not None:
+            found = self._match(node.wildcard, segments, index + 1)
+            if found is not None:
+                return found
+
+        for pattern, child in node.patterns:
+            if pattern.match(segment):
+                found = self._match(child, segments, index + 1)
+                if found is not None:
+                    return found
+
+        return None
+
+    def path_count(self):
+        """
+        Number of distinct endpoint paths in the table.
+        """
+        count = len(self._legacy)
+        nodes = [self._root]
+        while nodes:
+            node = nodes.pop()
+            count += node.endpoint is not None
+            nodes.extend(node.static.values())
+            nodes.extend(child for _, child in node.patterns)
+            if node.wildcard is not None:
+                nodes.append(node.wildcard)
+        return count
+
+    def find_endpoint(self, path):
+        """
+        Return the ``EndpointRecord`` registered for ``path`` or ``None``.
+        """
+        record = self._match(self._root, _split(path), 0)
+        if record is not None:
+            return record
+
+        request_path = path.rstrip("/")
+        for pattern, legacy in self._legacy:
+            if pattern.match(request_path):
+                return legacy
+        return None
+
+    def resolve(self, path, method, route=None):
+        """
+        Return an unsaved-but-populated ``ApiOperation`` (with its endpoint,
+        module and submodule attached) for ``path`` + ``method``, or ``None``.
+
+        ``route`` is the Django URL route the request resolved to; when an
+        endpoint is bound to it, the path is not matched at all.
+        """
+        record = self._routes.get(route) if route else None
+        if record is None:
+            record = self.find_endpoint(path)
+        if record is None:
+            return None
+
+        op = record.operations.get(method.upper())
+        if op is None:
+            return None
+
+        endpoint = ApiEndpoint(
+            id=record.id,
+            path=record.path,
+            route=record.route,
+            module=self._modules.get(record.module_id),
+            submodule=self._submodules.get(record.submodule_id),
+        )
+        operation = ApiOperation(
+            id=op.id,
+            endpoint=endpoint,
+            http_method=op.http_method,
+            is_enabled=op.is_enabled,
+            permission_code=op.permission_code,
+        )
+        # Instances mirror committed rows; mark them as loaded from the DB
+        # so that a save() issues an UPDATE rather than an INSERT.
+        endpoint._state.adding = False
+        operation._state.adding = False
+        return operation
+
+
+@functools.lru_cache(maxsize=None)
+def _locale_prefix_pattern(urlconf):
+    # i18n_patterns() is only allowed in the root URL conf
+    for pattern in get_resolver(urlconf).url_patterns:
+        if isinstance(pattern.pattern, LocalePrefixPattern):
+            return pattern.pattern
+    return None
+
+
+def strip_locale_prefix(path, route, urlconf=None):
+    """
+    Return ``path`` and ``route`` (as resolved by Django in this process)
+    without the active language's ``i18n_patterns()`` prefix:
+    ``/fr/api/orders/`` and ``fr/api/orders/`` become ``/api/orders/`` and
+    ``api/orders/``, the way ``api_sync_db_operation`` registers them.
+    """
+    if not route:
+        return path, route
+    locale = _locale_prefix_pattern(urlconf or settings.ROOT_URLCONF)
+    prefix = locale.language_prefix if locale is not None else ""
+    if not prefix or not route.startswith(prefix):
+        return path, route
+    if path.startswith("/" + prefix):
+        path = path[len(prefix):]
+    return path, route[len(prefix):]
+
+
+def _compile_route_table(operation_rows, endpoint_rows, modules, submodules, version):
+    operations = {}
+    for op_id, endpoint_id, method, is_enabled, permission_code in operation_rows:
+        # unique_together guarantees one operation per (endpoint, method)
+        operations.setdefault(endpoint_id, {})[method.upper()] = OperationRecord(
+            op_id, method, is_enabled, permission_code
+        )
+
+    endpoints = [
+        EndpointRecord(ep_id, path, route, module_id, submodule_id, operations.get(ep_id, {}))
+        for ep_id, path, route, module_id, submodule_id in endpoint_rows
+    ]
+
+    return RouteTable(
+        endpoints,
+        {m.pk: m for m in modules},
+        {sm.pk: sm for sm in submodules},
+        version=version,
+    )
+
+
+def _registry_querysets():
+    return (
+        ApiOperation.objects.values_list(
+            "id", "endpoint_id", "http_method", "is_enabled", "permission_code"
+        ).order_by("id"),
+        ApiEndpoint.objects.values_list("id", "path", "route", "module_id", "submodule_id"),
+        Module.objects.all(),
+        SubModule.objects.all(),
+    )
+
+
+def build_route_table(version=None):
+    """
+    Load the API registry from the database and compile it.
+    """
+    return _compile_route_table(*_registry_querysets(), version=version)
+
+
+async def abuild_route_table(version=None):
+    """
+    Async counterpart of ``build_route_table``.
+    """
+    rows = []
+    for qs in _registry_querysets():
+        rows.append([row async for row in qs])
+    return _compile_route_table(*rows, version=version)
+
+
+route_table_cache = TieredCache("route_table")
+_build_lock = threading.Lock()
+
+
+def _route_table_key(version):
+    return f"rbac:routes:{version}"
+
+
+def get_route_table():
+    """
+    Return the compiled route table for the current ``routes`` version,
+    rebuilding it if the registry changed since it was compiled.
+
+    Compiled tables go through the two-tier RBAC cache, so a worker whose
+    L1 is cold loads the table another worker compiled from L2.
+    """
+    version = policy_version.get_version(policy_version.ROUTES)
+    key = _route_table_key(version)
+    table = route_table_cache.get(key)
+    if table is not None:
+        return table
+
+    with _build_lock:
+        table = route_table_cache.get(key)
+        if table is None:
+            table = build_route_table(version=version)
+            route_table_cache.set(key, table)
+    return table
+
+
+async def aget_route_table():
+    """
+    Async counterpart of ``get_route_table``.
+
+    Runs on the event loop thread, so no lock is taken; two coroutines
+    rebuilding at once simply both produce the same table.
+    """
+    version = await policy_version.aget_version(policy_version.ROUTES)
+    key = _route_table_key(version)
+    table = await route_table_cache.aget(key)
+    if table is None:
+        table = await abuild_route_table(version=version)
+        await route_table_cache.aset(key, table)
+    return table
+
+
+def preload_route_table():
+    """
+    Load the current route table and pin it in this worker's L1 so that it
+    does not age out (used by the warm-up before forking).
+    """
+    table = get_route_table()
+    route_table_cache.pin(_route_table_key(table.version), table)
+    return table
+
+
+def clear_route_table():
+    """
+    Drop this worker's compiled table (it is reloaded on the next lookup).
+    """
+    route_table_cache.clear_local()
@@ -1,24 +1,76 @@
+"""
+Sidebar data for templates (``sidebar_context`` context processor).
+
+A tenant user's sidebar depends only on the tenant's modules and the
+permissions of the user's roles, so built sidebars are shared through the
+RBAC cache per (tenant, role set), tagged with the ``routes`` and tenant
+policy versions.  Superusers share one global sidebar per ``routes``
+version.
+"""
+import hashlib
+
+from msbc_rbac.core.cache import CacheStats, get_rbac_cache
+from msbc_rbac.core.conf import rbac_setting
 from msbc_rbac.core.models import (
     Module,
     SubModule,
     TenantModule,
     Permission,
 )
+from msbc_rbac.core.services import effective_permissions, policy_version
+from msbc_rbac.core.services.permission_api_resolver import get_user_role_ids
 from msbc_rbac.core.serializers import serialize_tenant_modules, serialize_modules
 
+sidebar_stats = CacheStats("sidebars")
+
+
+def _sidebar_key(user, tenant):
+    if user.is_superuser:
+        return f"rbac:sidebar:global:{policy_version.get_version(policy_version.ROUTES)}"
+
+    tenant_id = getattr(tenant, "pk", tenant)
+    routes_version, tenant_version, user_version = policy_version.get_versions(
+        (policy_version.ROUTES, None),
+        (policy_version.TENANT, tenant_id),
+        (policy_version.USER, user.pk),
+    )
+    role_ids = ",".join(str(role_id) for role_id in sorted(get_user_role_ids(user, version=user_version)))
+    roles = hashlib.sha256(role_ids.encode()).hexdigest()[:24]
+    return f"rbac:sidebar:{tenant_id}:{roles}:{routes_version}:{tenant_version}"
+
 
 def build_sidebar_context(user):
+    """
+    Sidebar modules for ``user``, cached for
+    ``RBAC_SIDEBAR_CACHE_TIMEOUT`` seconds (0 disables the cache).
+    """
     tenant = getattr(user, "tenant", None)
+    timeout = rbac_setting("RBAC_SIDEBAR_CACHE_TIMEOUT")
+    if not timeout or not (tenant or user.is_superuser):
+        return _build_sidebar(user, tenant)
+
+    # Read through the Django cache rather than an in-process L1: every
+    # caller gets its own copy of the (mutable) lists and dicts.
+    cache = get_rbac_cache()
+    key = _sidebar_key(user, tenant)
+
+    sidebar = cache.get(key)
+    if sidebar is not None:
+        sidebar_stats.hit()
+        return sidebar
+
+    sidebar_stats.miss()
+    sidebar = _build_sidebar(user, tenant)
+    cache.set(key, sidebar, timeout)
+    return sidebar
+
 
+def _build_sidebar(user, tenant):
     # ─────────────────────────────
     # SUPER ADMIN (GLOBAL SIDEBAR)
     # ─────────────────────────────
     if user.is_superuser:
-        modules = (
-            Module.objects.all()
-            .prefetch_related("submodules")
-            .order_by("order")
-        )
+        modules = Module.objects.all().order_by("order")
 
         return serialize_modules(modules)
 
@@ -33,10 +85,13 @@ def build_sidebar_context(user):
     )
 
     # User permissions
-    permissions = Permission.objects.filter(
-        tenant=tenant,
-        roles__role__role_users__user=user,
-        roles__allowed=True,
-    ).select_related("module", "submodule")
+    if effective_permissions.is_enabled():
+        permissions = effective_permissions.user_permissions(tenant, user)
+    else:
+        permissions = Permission.objects.filter(
+            tenant=tenant,
+            roles__role__role_users__user=user,
+            roles__allowed=True,
+        ).select_related("module", "submodule")
 
     return serialize_tenant_modules(tenant_modules, permissions)
@@ -0,0 +1,217 @@
+"""
+Per-stage timing of ``RBACMiddleware``.
+
+Each request gets a ``StageTimer`` that records, per policy stage, the
+elapsed monotonic time and the number of queries run on the default
+database connection:
+
+  bypass, resolve, decision_cache, inputs, subscription, tenant_override,
+  user_block, permission
+
+Results go to a ``Server-Timing`` response header (``RBAC_TIMING_HEADER``)
+and / or to in-process per-stage histograms (``RBAC_TIMING_HISTOGRAMS``).
+With both settings off the middleware gets ``NULL_TIMER``, whose stages are
+shared no-op context managers.
+
+Query counts are only collected on the sync path: under ASGI, queries run
+on a worker thread with its own connection.
+"""
+from bisect import bisect_left
+from time import perf_counter_ns
+
+from django.db import connection
+
+from msbc_rbac.core.conf import rbac_setting
+
+# Histogram bucket upper bounds, in microseconds (the last bucket is open).
+BUCKET_BOUNDS_US = (10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000)
+
+
+# ─────────────────────────────
+# Histograms
+# ─────────────────────────────
+_histograms = {}
+
+
+class StageHistogram:
+    """
+    In-process latency histogram for one stage.
+
+    Counters are per worker process; they are reset on restart.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.reset()
+        _histograms[name] = self
+
+    def observe(self, duration_ns, queries):
+        duration_us = duration_ns / 1000
+        self.count += 1
+        self.total_us += duration_us
+        self.queries += queries
+        if duration_us > self.max_us:
+            self.max_us = duration_us
+        self.buckets[bisect_left(BUCKET_BOUNDS_US, duration_us)] += 1
+
+    def percentile(self, fraction):
+        """
+        Upper bound of the bucket holding the ``fraction`` quantile.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, count in zip(BUCKET_BOUNDS_US, self.buckets):
+            seen += count
+            if seen >= rank:
+                return float(bound)
+        return round(self.max_us, 1)
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "mean_us": round(self.total_us / self.count, 1) if self.count else 0.0,
+            "p50_us": self.percentile(0.50),
+            "p99_us": self.percentile(0.99),
+            "max_us": round(self.max_us, 1),
+            "queries": self.queries,
+            "buckets": {
+                **{f"le_{bound}": count for bound, count in zip(BUCKET_BOUNDS_US, self.buckets)},
+                "inf": self.buckets[-1],
+            },
+        }
+
+    def reset(self):
+        self.count = 0
+        self.total_us = 0.0
+        self.max_us = 0.0
+        self.queries = 0
+        self.buckets = [0] * (len(BUCKET_BOUNDS_US) + 1)
+
+
+def get_histogram(name):
+    histogram = _histograms.get(name)
+    if histogram is None:
+        histogram = StageHistogram(name)
+    return histogram
+
+
+def get_stage_timings():
+    """
+    Return ``{stage: histogram snapshot}`` for this process.
+    """
+    return {name: histogram.snapshot() for name, histogram in _histograms.items()}
+
+
+# ─────────────────────────────
+# Timers
+# ─────────────────────────────
+class _Stage:
+    __slots__ = ("timer", "name", "started", "queries")
+
+    def __init__(self, timer, name):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.queries = self.timer.queries
+        self.started = perf_counter_ns()
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter_ns() - self.started
+        self.timer.stages.append((self.name, elapsed, self.timer.queries - self.queries))
+
+
+class StageTimer:
+    """
+    Records ``(stage, duration_ns, queries)`` for one request.
+    """
+
+    def __init__(self, header, histograms):
+        self.header = header
+        self.histograms = histograms
+        self.stages = []
+        self.queries = 0
+        self.started = perf_counter_ns()
+        self.total_ns = 0
+        self._query_counter = connection.execute_wrapper(self._count_query)
+        self._query_counter.__enter__()
+
+    def _count_query(self, execute, sql, params, many, context):
+        self.queries += 1
+        return execute(sql, params, many, context)
+
+    def stage(self, name):
+        return _Stage(self, name)
+
+    def finish(self):
+        self._query_counter.__exit__(None, None, None)
+        self.total_ns = perf_counter_ns() - self.started
+
+        if self.histograms:
+            for name, elapsed, queries in self.stages:
+                get_histogram(name).observe(elapsed, queries)
+            get_histogram("total").observe(self.total_ns, self.queries)
+
+    def server_timing(self):
+        metrics = [
+            f'rbac-{name};dur={elapsed / 1e6:.3f};desc="{queries} queries"'
+            for name, elapsed, queries in self.stages
+        ]
+        metrics.append(f'rbac;dur={self.total_ns / 1e6:.3f};desc="{self.queries} queries"')
+        return ", ".join(metrics)
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    header = False
+    _stage = _NullStage()
+
+    def stage(self, name):
+        return self._stage
+
+    def finish(self):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+def start_timer(request):
+    """
+    Return a running ``StageTimer`` for ``request``, or ``NULL_TIMER`` when
+    timing is switched off.
+    """
+    header = rbac_setting("RBAC_TIMING_HEADER")
+    histograms = rbac_setting("RBAC_TIMING_HISTOGRAMS")
+    if not header and not histograms:
+        return NULL_TIMER
+
+    timer = StageTimer(header, histograms)
+    request._rbac_timer = timer
+    return timer
+
+
+def add_server_timing(request, response):
+    """
+    Append the request's stage timings to ``response``'s Server-Timing header.
+    """
+    timer = getattr(request, "_rbac_timer", None)
+    if timer is None or not timer.header:
+        return
+
+    existing = response.get("Server-Timing")
+    value = timer.server_timing()
+    response["Server-Timing"] = f"{existing}, {value}" if existing else value
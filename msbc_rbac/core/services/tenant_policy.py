@@ -0,0 +1,154 @@
+"""
+Compiled per-tenant policy.
+
+Tenant-level state (module subscriptions, expiry dates, tenant API
+overrides) changes rarely, so each worker keeps one immutable
+``TenantPolicy`` per tenant and answers steps 5 and 6 of ``RBACMiddleware``
+from memory.  A policy is cached under the tenant's policy version in the
+two-tier RBAC cache; when the version moves on, a fresh snapshot is built
+(or loaded from L2), so concurrent readers always see a complete snapshot.
+"""
+from collections import namedtuple
+from types import MappingProxyType
+
+from msbc_rbac.core.cache import TieredCache
+from msbc_rbac.core.models import TenantApiOverride, TenantModule
+from msbc_rbac.core.services import policy_version
+
+TenantModuleState = namedtuple("TenantModuleState", ["is_enabled", "expiration_date"])
+
+
+class TenantPolicy(namedtuple(
+    "TenantPolicy", ["tenant_id", "version", "subscriptions", "disabled_operations"]
+)):
+    """
+    Immutable snapshot of one tenant's subscription and override state.
+
+    ``subscriptions``        (module_code, submodule_code | None) →
+                             (TenantModule id, TenantModuleState)
+    ``disabled_operations``  ApiOperation ids disabled for this tenant
+    """
+
+    __slots__ = ()
+
+    def __new__(cls, tenant_id, version, subscriptions, disabled_operations):
+        return super().__new__(
+            cls,
+            tenant_id,
+            version,
+            MappingProxyType(dict(subscriptions)),
+            frozenset(disabled_operations),
+        )
+
+    def __getnewargs__(self):
+        # mappingproxy cannot be pickled; rebuild it through __new__
+        return (self.tenant_id, self.version, dict(self.subscriptions), self.disabled_operations)
+
+    def tenant_module(self, module_code, submodule_code):
+        """
+        Return the ``TenantModuleState`` governing ``module`` / ``submodule``
+        or ``None`` when the tenant is not subscribed.
+
+        Same rule as the ORM lookup: the lowest-id row that either covers the
+        whole module (no submodule) or matches the submodule exactly.
+        """
+        candidates = [self.subscriptions.get((module_code, None))]
+        if submodule_code is not None:
+            candidates.append(self.subscriptions.get((module_code, submodule_code)))
+
+        candidates = [c for c in candidates if c is not None]
+        if not candidates:
+            return None
+        return min(candidates, key=lambda c: c[0])[1]
+
+    def api_disabled(self, operation_id):
+        return operation_id in self.disabled_operations
+
+
+def _compile_tenant_policy(tenant_id, version, subscription_rows, disabled_operations):
+    subscriptions = {}
+    for pk, module_id, submodule_id, is_enabled, expiration_date in subscription_rows:
+        # Keep the lowest id per key (NULL submodules are not unique)
+        subscriptions.setdefault(
+            (module_id, submodule_id),
+            (pk, TenantModuleState(is_enabled, expiration_date)),
+        )
+    return TenantPolicy(tenant_id, version, subscriptions, disabled_operations)
+
+
+def _policy_querysets(tenant_id):
+    return (
+        TenantModule.objects.filter(tenant_id=tenant_id)
+        .values_list("id", "module_id", "submodule_id", "is_enabled", "expiration_date")
+        .order_by("id"),
+        TenantApiOverride.objects.filter(
+            tenant_id=tenant_id,
+            is_enabled=False,
+        ).values_list("api_operation_id", flat=True),
+    )
+
+
+def build_tenant_policy(tenant_id, version=None):
+    """
+    Load a tenant's subscription and override rows and compile them.
+    """
+    return _compile_tenant_policy(tenant_id, version, *_policy_querysets(tenant_id))
+
+
+async def abuild_tenant_policy(tenant_id, version=None):
+    """
+    Async counterpart of ``build_tenant_policy``.
+    """
+    subscriptions, overrides = _policy_querysets(tenant_id)
+    return _compile_tenant_policy(
+        tenant_id,
+        version,
+        [row async for row in subscriptions],
+        [op_id async for op_id in overrides],
+    )
+
+
+tenant_policy_cache = TieredCache("tenant_policy")
+
+
+def _tenant_policy_key(tenant_id, version):
+    return f"rbac:tenant_policy:{tenant_id}:{version}"
+
+
+def get_tenant_policy(tenant):
+    """
+    Return the ``TenantPolicy`` for ``tenant`` (instance or id) at the
+    tenant's current policy version, from the two-tier RBAC cache or
+    freshly built.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    version = policy_version.get_version(policy_version.TENANT, tenant_id)
+    key = _tenant_policy_key(tenant_id, version)
+
+    policy = tenant_policy_cache.get(key)
+    if policy is None:
+        policy = build_tenant_policy(tenant_id, version=version)
+        tenant_policy_cache.set(key, policy)
+    return policy
+
+
+async def aget_tenant_policy(tenant):
+    """
+    Async counterpart of ``get_tenant_policy``.
+    """
+    tenant_id = getattr(tenant, "pk", tenant)
+    version = await policy_version.aget_version(policy_version.TENANT, tenant_id)
+    key = _tenant_policy_key(tenant_id, version)
+
+    policy = await tenant_policy_cache.aget(key)
+    if policy is None:
+        policy = await abuild_tenant_policy(tenant_id, version=version)
+        await tenant_policy_cache.aset(key, policy)
+    return policy
+
+
+def clear_tenant_policies():
+    """
+    Drop every policy held in this worker's L1.
+    """
+    tenant_policy_cache.clear_local()
@@ -0,0 +1,102 @@
+"""
+Process warm-up for the RBAC policy data.
+
+``warm_up()`` compiles the route table (ApiEndpoint / ApiOperation with
+their modules and submodules) and the module catalogue (Module /
+SubModule / ModuleSubModuleMapping) and pins both in the process's L1.
+Run in the gunicorn master with ``preload_app`` (see ``gunicorn.conf.py``),
+workers inherit the compiled structures through fork instead of each
+paying the cold-miss cost on their first requests.
+
+Pages holding these objects stay shared copy-on-write until a worker
+writes to them.  ``gc.freeze()`` before forking keeps the garbage collector
+from doing so; reference counting on the objects a worker touches still
+does.
+"""
+import gc
+import logging
+import time
+import tracemalloc
+from collections import namedtuple
+
+from django.core.cache import caches
+from django.db import DatabaseError, connections
+
+from msbc_rbac.core.cache import reset_cache_stats
+from msbc_rbac.core.services import policy_sync
+from msbc_rbac.core.services.module_catalogue import preload_module_catalogue
+from msbc_rbac.core.services.route_table import preload_route_table
+
+logger = logging.getLogger(__name__)
+
+
+class WarmupReport(namedtuple(
+    "WarmupReport", ["paths", "modules", "submodules", "seconds", "retained_bytes"]
+)):
+    __slots__ = ()
+
+    def __str__(self):
+        return (
+            f"RBAC warm-up: {self.paths} endpoint paths, {self.modules} modules, "
+            f"{self.submodules} submodule mappings in {self.seconds * 1000:.1f} ms, "
+            f"{self.retained_bytes / 1024:.1f} KiB retained"
+        )
+
+
+def warm_up():
+    """
+    Compile and pin the route table and module catalogue.
+
+    Returns a ``WarmupReport`` (also logged), or ``None`` when the database
+    is not reachable or not migrated yet; the data is then loaded lazily
+    on the first requests as usual.
+    """
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    allocated_before = tracemalloc.get_traced_memory()[0]
+    started = time.perf_counter()
+
+    try:
+        table = preload_route_table()
+        catalogue = preload_module_catalogue()
+    except DatabaseError as exc:
+        logger.warning("RBAC warm-up skipped: %s", exc)
+        return None
+    finally:
+        retained = tracemalloc.get_traced_memory()[0] - allocated_before
+        if not tracing:
+            tracemalloc.stop()
+
+    report = WarmupReport(
+        paths=table.path_count(),
+        modules=len(catalogue.modules),
+        submodules=sum(len(module.submodules) for module in catalogue.modules),
+        seconds=time.perf_counter() - started,
+        retained_bytes=retained,
+    )
+    logger.info("%s", report)
+    return report
+
+
+def prepare_fork():
+    """
+    Make the preloaded state safe and cheap to share with forked workers:
+    stop the policy sync thread, close this process's database and cache
+    connections (workers must not share sockets) and freeze the GC.
+    """
+    policy_sync.stop()
+    connections.close_all()
+    for cache in caches.all(initialized_only=True):
+        cache.close()
+    gc.collect()
+    gc.freeze()
+
+
+def after_fork():
+    """
+    Start a new worker's hit / miss counters from zero instead of the
+    parent's warm-up misses, and its own policy sync thread.
+    """
+    reset_cache_stats()
+    policy_sync.start()
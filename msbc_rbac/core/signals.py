@@ -0,0 +1,210 @@
+"""
+Signal receivers keeping cached RBAC policy data in sync with the database.
+
+Each receiver bumps the policy version of the scope it affects; cached
+values tagged with the previous version are rebuilt on next use.
+
+With ``RBAC_EFFECTIVE_PERMISSIONS`` on, grant changes also refresh the
+affected users' ``UserEffectivePermission`` rows.
+
+Note: ``QuerySet.update()`` / ``bulk_create()`` do not send these signals.
+Code doing bulk writes to the RBAC tables must bump the version itself
+(and run ``rebuild_effective_permissions`` when the table is in use).
+"""
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from msbc_rbac.accounts.models import UserApiBlock, UserRole
+from msbc_rbac.core.models import (
+    ApiEndpoint,
+    ApiOperation,
+    Module,
+    ModuleSubModuleMapping,
+    Permission,
+    Role,
+    RolePermission,
+    SubModule,
+    TenantApiOverride,
+    TenantModule,
+)
+from msbc_rbac.core.services import effective_permissions, policy_version
+
+
+def _bump_tenant(tenant_id):
+    if tenant_id is not None:
+        policy_version.bump_version_on_commit(policy_version.TENANT, tenant_id)
+
+
+def _bump_user(user_id):
+    if user_id is not None:
+        policy_version.bump_version_on_commit(policy_version.USER, user_id)
+
+
+def _previous(instance, *fields):
+    """
+    Values of ``fields`` stored in the database for ``instance`` before
+    the current save (``None`` for new rows), as a dict.
+    """
+    if instance._state.adding or instance.pk is None:
+        return None
+    return type(instance)._default_manager.filter(pk=instance.pk).values(*fields).first()
+
+
+def _saved_previous(instance, kwargs):
+    # Captured by the pre_save receivers; only meaningful in post_save
+    # (``created`` is a post_save argument).
+    if "created" not in kwargs:
+        return None
+    return getattr(instance, "_rbac_previous", None)
+
+
+# ─────────────────────────────
+# API registry
+# ─────────────────────────────
+@receiver(post_save, sender=ApiEndpoint)
+@receiver(post_delete, sender=ApiEndpoint)
+@receiver(post_save, sender=ApiOperation)
+@receiver(post_delete, sender=ApiOperation)
+@receiver(post_save, sender=Module)
+@receiver(post_delete, sender=Module)
+@receiver(post_save, sender=SubModule)
+@receiver(post_delete, sender=SubModule)
+@receiver(post_save, sender=ModuleSubModuleMapping)
+@receiver(post_delete, sender=ModuleSubModuleMapping)
+def api_registry_changed(sender, **kwargs):
+    policy_version.bump_version_on_commit(policy_version.ROUTES)
+
+
+# ─────────────────────────────
+# Roles & permissions (tenant scope)
+# ─────────────────────────────
+@receiver(post_save, sender=Permission)
+@receiver(post_delete, sender=Permission)
+def permission_changed(sender, instance, **kwargs):
+    _bump_tenant(instance.tenant_id)
+
+
+@receiver(post_save, sender=Role)
+@receiver(post_delete, sender=Role)
+def role_changed(sender, instance, **kwargs):
+    # Soft delete goes through save(update_fields=[...]) → post_save
+    _bump_tenant(instance.tenant_id)
+
+
+@receiver(pre_save, sender=RolePermission)
+def role_permission_saving(sender, instance, **kwargs):
+    # A mapping moved to another role / permission must also invalidate
+    # (and refresh the users of) the one it was taken from.
+    instance._rbac_previous = _previous(
+        instance, "role_id", "role__tenant_id", "permission__tenant_id",
+    )
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def role_permission_changed(sender, instance, **kwargs):
+    # Related rows may already be gone when this delete is a cascade;
+    # their own post_delete receivers bump the tenant in that case.
+    tenant_ids = set()
+    for relation in ("permission", "role"):
+        try:
+            tenant_ids.add(getattr(instance, relation).tenant_id)
+        except ObjectDoesNotExist:
+            pass
+
+    previous = _saved_previous(instance, kwargs)
+    if previous:
+        tenant_ids.update((previous["role__tenant_id"], previous["permission__tenant_id"]))
+
+    for tenant_id in tenant_ids:
+        _bump_tenant(tenant_id)
+
+
+# ─────────────────────────────
+# Subscriptions & overrides (tenant scope)
+# ─────────────────────────────
+@receiver(post_save, sender=TenantModule)
+@receiver(post_delete, sender=TenantModule)
+@receiver(post_save, sender=TenantApiOverride)
+@receiver(post_delete, sender=TenantApiOverride)
+def tenant_policy_changed(sender, instance, **kwargs):
+    _bump_tenant(instance.tenant_id)
+
+
+# ─────────────────────────────
+# Role assignments (user scope)
+# ─────────────────────────────
+@receiver(pre_save, sender=UserRole)
+def user_role_saving(sender, instance, **kwargs):
+    # An assignment moved to another user must also invalidate (and
+    # refresh) the user it was taken from.
+    instance._rbac_previous = _previous(instance, "user_id")
+
+
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def user_role_changed(sender, instance, **kwargs):
+    _bump_user(instance.user_id)
+
+    previous = _saved_previous(instance, kwargs)
+    if previous and previous["user_id"] != instance.user_id:
+        _bump_user(previous["user_id"])
+
+
+@receiver(post_save, sender=UserApiBlock)
+@receiver(post_delete, sender=UserApiBlock)
+def user_api_block_changed(sender, instance, **kwargs):
+    policy_version.bump_version_on_commit(policy_version.BLOCKS, instance.tenant_id)
+    _bump_user(instance.user_id)
+
+
+# ─────────────────────────────
+# Users & API tokens (user scope, cached token credentials)
+# ─────────────────────────────
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logins only touch last_login; nothing cached depends on it.
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    _bump_user(instance.pk)
+
+
+if apps.is_installed("rest_framework.authtoken"):
+    @receiver(post_delete, sender="authtoken.Token")
+    def token_deleted(sender, instance, **kwargs):
+        _bump_user(instance.user_id)
+
+
+# ─────────────────────────────
+# Materialized effective permissions
+# ─────────────────────────────
+@receiver(post_save, sender=UserRole)
+@receiver(post_delete, sender=UserRole)
+def user_role_grants_changed(sender, instance, **kwargs):
+    if effective_permissions.is_enabled():
+        user_ids = {instance.user_id}
+        previous = _saved_previous(instance, kwargs)
+        if previous:
+            user_ids.add(previous["user_id"])
+        effective_permissions.refresh_users(user_ids)
+
+
+@receiver(post_save, sender=RolePermission)
+@receiver(post_delete, sender=RolePermission)
+def role_permission_grants_changed(sender, instance, **kwargs):
+    if effective_permissions.is_enabled():
+        user_ids = set(effective_permissions.users_with_role(instance.role_id))
+        previous = _saved_previous(instance, kwargs)
+        if previous and previous["role_id"] != instance.role_id:
+            user_ids.update(effective_permissions.users_with_role(previous["role_id"]))
+        effective_permissions.refresh_users(user_ids)
+
+
+@receiver(post_save, sender=Permission)
+def permission_grants_changed(sender, instance, **kwargs):
+    # Deleted permissions take their rows with them (FK cascade)
+    if effective_permissions.is_enabled():
+        effective_permissions.refresh_users(effective_permissions.users_granted(instance.pk))
@@ -1,16 +1,40 @@
-import threading
+"""
+Current-tenant context for ``TenantAwareManager``.
 
-_thread_locals = threading.local()
+Stored in a ``ContextVar`` rather than ``threading.local`` so that it
+follows the request under ASGI, where one thread serves many requests and
+one request may hop between threads.
+"""
+from contextvars import ContextVar
+
+_current_tenant = ContextVar("rbac_current_tenant", default=None)
 
 
 def set_current_tenant(tenant):
-    _thread_locals.tenant = tenant
+    _current_tenant.set(tenant)
 
 
 def get_current_tenant():
-    return getattr(_thread_locals, "tenant", None)
+    return _current_tenant.get()
 
 
 def clear_current_tenant():
-    if hasattr(_thread_locals, "tenant"):
-        del _thread_locals.tenant
+    _current_tenant.set(None)
+
+
+async def aget_user_tenant(user):
+    """
+    Async-safe ``user.tenant``.
+
+    The lazy foreign-key descriptor cannot query from async code, so the
+    tenant is loaded with the async ORM and cached on ``user`` (later
+    ``user.tenant`` reads, e.g. in ``str(user)``, do not query).
+    """
+    if getattr(user, "tenant_id", None) is None:
+        return None
+
+    field = user._meta.get_field("tenant")
+    if not field.is_cached(user):
+        tenant = await field.related_model._default_manager.filter(pk=user.tenant_id).afirst()
+        field.set_cached_value(user, tenant)
+    return user.tenant
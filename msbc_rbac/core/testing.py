@@ -0,0 +1,156 @@
+"""
+Test helpers for services using the RBAC package.
+
+``FakeDecisionServer`` stands in for the central RBAC service of
+``RBAC_DECISION_MODE = "remote"``, so a service's tests need neither the
+RBAC tables nor a running RBAC deployment:
+
+    from django.test import override_settings
+    from msbc_rbac.core.testing import FakeDecisionServer
+
+    with FakeDecisionServer() as server:
+        server.deny("DELETE", "/api/orders/1/")
+        with override_settings(RBAC_DECISION_MODE="remote", RBAC_REMOTE_URL=server.url):
+            response = client.delete("/api/orders/1/", HTTP_AUTHORIZATION="Token abc")
+
+Requests without forwarded credentials get a 401, every other request is
+allowed unless a rule says otherwise (``respond_with`` forces a status).  Received payloads are kept in
+``server.requests``.
+
+``reset_rbac_caches()`` drops every cached RBAC value (shared cache and this
+process's L1s).  Call it in ``setUp``: the cache outlives the rolled-back
+rows of earlier tests, and versions bumped ``on_commit`` are never bumped
+inside ``TestCase``.
+"""
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from msbc_rbac.core.cache import get_rbac_cache
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+
+
+def reset_rbac_caches():
+    """
+    Clear the RBAC cache and every per-process RBAC cache.
+    """
+    from msbc_rbac.core.services import (
+        decision_cache,
+        module_catalogue,
+        permission_api_resolver,
+        permission_bits,
+        route_table,
+        tenant_policy,
+        user_blocks,
+    )
+
+    get_rbac_cache().clear()
+    for cache in (
+        module_catalogue.module_catalogue_cache,
+        permission_api_resolver.user_permission_cache,
+        permission_bits.permission_index_cache,
+        route_table.route_table_cache,
+        tenant_policy.tenant_policy_cache,
+    ):
+        cache.clear_local()
+    user_blocks.clear_block_indexes()
+    decision_cache.clear_decisions()
+
+
+class _DecisionHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, like the real service
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        if not self.path.rstrip("/").endswith("/decide"):
+            return self._reply(404, {"detail": "Not found."})
+        if fake.status is not None:
+            return self._reply(fake.status, {"detail": "Forced response."})
+        if not (self.headers.get("Authorization") or self.headers.get("Cookie")):
+            return self._reply(401, {"detail": "Authentication credentials were not provided."})
+
+        payload = json.loads(body or b"{}")
+        with fake.lock:
+            fake.requests.append(payload)
+            allowed, violation = fake.rules.get(
+                (payload.get("method", "").upper(), payload.get("path")),
+                (True, None),
+            )
+            version = fake.version
+        self._reply(200, {"allowed": allowed, "violation": violation, "version": version})
+
+    def _reply(self, status, data):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class FakeDecisionServer:
+    """
+    In-process HTTP server answering ``POST /api/rbac/decide``.
+    """
+
+    def __init__(self, version="1"):
+        self.version = version
+        self.rules = {}
+        self.status = None
+        self.requests = []
+        self.lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/api/rbac/"
+
+    def allow(self, method, path):
+        with self.lock:
+            self.rules[(method.upper(), path)] = (True, None)
+
+    def deny(self, method, path, violation=RBACPermissionDenied.PERMISSION_DENIED):
+        with self.lock:
+            self.rules[(method.upper(), path)] = (False, violation)
+
+    def respond_with(self, status):
+        """
+        Answer every ``decide`` request with ``status`` (e.g. 403 for a
+        caller the service refuses); ``None`` restores normal answers.
+        """
+        with self.lock:
+            self.status = status
+
+    def set_version(self, version):
+        """
+        Simulate a policy change: clients drop decisions cached under the
+        previous version once they see the new one.
+        """
+        with self.lock:
+            self.version = version
+
+    def start(self):
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _DecisionHandler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
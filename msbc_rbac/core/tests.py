@@ -1,3 +1,1238 @@
-from django.test import TestCase
+import asyncio
+import itertools
+import re
+import time
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.conf.urls.i18n import i18n_patterns
+from django.contrib.auth.models import AnonymousUser, update_last_login
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.http import HttpResponse, JsonResponse
+from django.test import (
+    AsyncClient,
+    RequestFactory,
+    SimpleTestCase,
+    TestCase,
+    TransactionTestCase,
+    override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import translation
+from rest_framework.response import Response
+from rest_framework.test import APIClient
+from rest_framework.views import APIView
+
+from msbc_rbac.accounts.api.views import obtain_auth_token
+from msbc_rbac.accounts.models import User, UserApiBlock, UserEffectivePermission, UserRole
+from msbc_rbac.core.checks import check_rbac_cache
+from msbc_rbac.core.exceptions import RBACPermissionDenied
+from msbc_rbac.core.models import (
+    ApiEndpoint,
+    ApiOperation,
+    Module,
+    Permission,
+    Role,
+    RolePermission,
+    ApiSyncFingerprint,
+    SubModule,
+    Tenant,
+    TenantApiOverride,
+    TenantModule,
+)
+from msbc_rbac.core.services import (
+    policy_decision,
+    policy_sync,
+    policy_version,
+    tenant_policy,
+    user_blocks,
+)
+from msbc_rbac.core.services.RBACMiddleware import DENIAL_MESSAGES, RBACMiddleware
+from msbc_rbac.core.services.batch_check import NOT_FOUND, check_batch
+from msbc_rbac.core.services.claims import claims_user, issue_claims_token, verify_claims_token
+from msbc_rbac.core.services.permission_api_resolver import get_user_permissions
+from msbc_rbac.core.services.policy_decision import (
+    DatabasePolicyInputs,
+    SingleQueryPolicyInputs,
+    evaluate_policy,
+)
+from msbc_rbac.core.services.remote_decision import RemoteDecisionClient, RemoteDecisionError
+from msbc_rbac.core.services.route_table import build_route_table, strip_locale_prefix
+from msbc_rbac.core.services.stage_timing import NULL_TIMER
+from msbc_rbac.core.services.tenant_policy import get_tenant_policy
+from msbc_rbac.core.tenant_context import get_current_tenant
+from msbc_rbac.core.testing import FakeDecisionServer, reset_rbac_caches
+
+
+# Versions are bumped in this process only; PolicySyncTests covers the sync
+@override_settings(RBAC_POLICY_SYNC=None)
+class RBACTestCase(TestCase):
+    def setUp(self):
+        reset_rbac_caches()
+
+
+class SignalInvalidationTests(RBACTestCase):
+    """
+    Cached role ids / permission indexes follow reassigned rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.other_tenant = Tenant.objects.create(name="T2")
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+        cls.submodule = SubModule.objects.create(code="CORE", name="Core")
+        cls.role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.permission = Permission.objects.create(
+            tenant=cls.tenant, module=cls.module, submodule=cls.submodule, code="view",
+        )
+        cls.role_permission = RolePermission.objects.create(role=cls.role, permission=cls.permission)
+        cls.alice = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        cls.bob = User.objects.create_user("bob", password="x", tenant=cls.tenant)
+
+    def assertGranted(self, user, granted=True):
+        permissions = get_user_permissions(self.tenant, user)
+        self.assertEqual(("CRM", "CORE", "view") in permissions, granted)
+
+    def test_user_role_moved_to_another_user(self):
+        assignment = UserRole.objects.create(user=self.alice, role=self.role, tenant=self.tenant)
+        self.assertGranted(self.alice)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            assignment.user = self.bob
+            assignment.save()
+
+        self.assertGranted(self.alice, False)
+        self.assertGranted(self.bob)
+
+    def test_role_permission_moved_to_another_tenant(self):
+        UserRole.objects.create(user=self.alice, role=self.role, tenant=self.tenant)
+        self.assertGranted(self.alice)
+
+        other_role = Role.objects.create(name="Sales", tenant=self.other_tenant)
+        other_permission = Permission.objects.create(tenant=self.other_tenant, module=self.module, code="view")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.role_permission.role = other_role
+            self.role_permission.permission = other_permission
+            self.role_permission.save()
+
+        self.assertGranted(self.alice, False)
+
+
+@override_settings(RBAC_EFFECTIVE_PERMISSIONS=True)
+class EffectivePermissionRefreshTests(RBACTestCase):
+    """
+    UserEffectivePermission rows follow reassigned grants.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+        cls.role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.other_role = Role.objects.create(name="Support", tenant=cls.tenant)
+        cls.permission = Permission.objects.create(tenant=cls.tenant, module=cls.module, code="view")
+        cls.alice = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        cls.bob = User.objects.create_user("bob", password="x", tenant=cls.tenant)
+
+    def granted_users(self):
+        return set(
+            UserEffectivePermission.objects.filter(permission=self.permission)
+            .values_list("user__username", flat=True)
+        )
+
+    def test_user_role_moved_to_another_user(self):
+        RolePermission.objects.create(role=self.role, permission=self.permission)
+        assignment = UserRole.objects.create(user=self.alice, role=self.role, tenant=self.tenant)
+        self.assertEqual(self.granted_users(), {"alice"})
+
+        assignment.user = self.bob
+        assignment.save()
+        self.assertEqual(self.granted_users(), {"bob"})
+
+    def test_role_permission_moved_to_another_role(self):
+        UserRole.objects.create(user=self.alice, role=self.role, tenant=self.tenant)
+        UserRole.objects.create(user=self.bob, role=self.other_role, tenant=self.tenant)
+        mapping = RolePermission.objects.create(role=self.role, permission=self.permission)
+        self.assertEqual(self.granted_users(), {"alice"})
+
+        mapping.role = self.other_role
+        mapping.save()
+        self.assertEqual(self.granted_users(), {"bob"})
+
+
+class RemoteDecisionClientTests(RBACTestCase):
+    """
+    RemoteDecisionClient against FakeDecisionServer.
+    """
+
+    credentials = {"Authorization": "Token abc"}
+
+    def setUp(self):
+        super().setUp()
+        self.server = FakeDecisionServer().start()
+        self.addCleanup(self.server.stop)
+
+    def client_for(self, **kwargs):
+        client = RemoteDecisionClient(self.server.url, timeout=1, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def wait_for_revalidation(self, client):
+        deadline = time.monotonic() + 5
+        while client._refreshing and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertFalse(client._refreshing)
+
+    def test_fresh_decision_is_served_from_cache(self):
+        client = self.client_for(fresh_ttl=60)
+        self.server.deny("DELETE", "/api/orders/1/")
+
+        for _ in range(3):
+            decision = client.decide(self.credentials, "delete", "/api/orders/1/")
+            self.assertEqual(decision, (False, RBACPermissionDenied.PERMISSION_DENIED))
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_stale_decision_is_served_while_revalidating(self):
+        client = self.client_for(fresh_ttl=0, stale_ttl=60)
+        self.assertTrue(client.decide(self.credentials, "GET", "/api/orders/").allowed)
+
+        self.server.deny("GET", "/api/orders/")
+        self.server.set_version("2")
+        self.assertTrue(client.decide(self.credentials, "GET", "/api/orders/").allowed)
+        self.wait_for_revalidation(client)
+
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertFalse(client.decide(self.credentials, "GET", "/api/orders/").allowed)
+
+    def test_central_service_down(self):
+        client = self.client_for(fresh_ttl=0, stale_ttl=60)
+        self.assertTrue(client.decide(self.credentials, "GET", "/api/orders/").allowed)
+
+        self.server.stop()
+        client.pool.close()
+
+        # Stale decisions are still served, others cannot be answered
+        with self.assertLogs("msbc_rbac.core.services.remote_decision", "WARNING"):
+            self.assertTrue(client.decide(self.credentials, "GET", "/api/orders/").allowed)
+            self.wait_for_revalidation(client)
+        with self.assertRaises(RemoteDecisionError):
+            client.decide(self.credentials, "GET", "/api/invoices/")
+
+    def test_unauthenticated_and_refused_callers(self):
+        client = self.client_for()
+        self.assertIsNone(client.decide({}, "GET", "/api/orders/"))
+
+        self.server.respond_with(403)
+        decision = client.decide(self.credentials, "GET", "/api/orders/")
+        self.assertEqual(decision, (False, RBACPermissionDenied.PERMISSION_DENIED))
+
+        self.server.respond_with(500)
+        with self.assertRaises(RemoteDecisionError):
+            client.decide(self.credentials, "GET", "/api/invoices/")
+
+
+class RemoteDecisionMiddlewareTests(RBACTestCase):
+    """
+    RBACMiddleware.check_remote on 401 / 403 answers.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.server = FakeDecisionServer().start()
+        self.addCleanup(self.server.stop)
+        settings = override_settings(RBAC_DECISION_MODE="remote", RBAC_REMOTE_URL=self.server.url)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.middleware = RBACMiddleware(lambda request: HttpResponse())
+
+    def check(self, user):
+        request = RequestFactory().get("/api/orders/", HTTP_AUTHORIZATION="Token abc")
+        request.user = user
+        return self.middleware.check_remote(request, NULL_TIMER)
+
+    def test_unauthenticated_caller_passes_through_when_anonymous(self):
+        self.server.respond_with(401)
+        self.assertIsNone(self.check(AnonymousUser()))
+
+    def test_unauthenticated_caller_is_denied_when_authenticated_locally(self):
+        self.server.respond_with(401)
+        user = User(username="alice")
+        self.assertEqual(self.check(user).status_code, 401)
+
+    def test_refused_caller_is_denied(self):
+        self.server.respond_with(403)
+        self.assertEqual(self.check(AnonymousUser()).status_code, 401)
+
+
+class ClaimsUserTests(RBACTestCase):
+    """
+    Users built from current claims behave like the stored user.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.admin = User.objects.create_user(
+            "admin", email="admin@example.com", password="x", tenant=cls.tenant,
+            is_staff=True, is_superuser=True,
+        )
+
+    def claims_user(self):
+        return claims_user(verify_claims_token(issue_claims_token(self.admin)))
+
+    def test_claimed_fields_need_no_query(self):
+        user = self.claims_user()
+        with self.assertNumQueries(0):
+            self.assertEqual((user.pk, user.username, user.tenant_id), (self.admin.pk, "admin", self.tenant.pk))
+            self.assertTrue(user.is_authenticated)
+
+    def test_other_fields_load_from_the_database(self):
+        user = self.claims_user()
+        self.assertTrue(user.is_staff)
+        self.assertTrue(user.is_superuser)
+        self.assertEqual(user.email, "admin@example.com")
+
+    def test_save_keeps_unloaded_fields(self):
+        user = self.claims_user()
+        update_last_login(None, user)
+        user.save()
+
+        stored = User.objects.get(pk=self.admin.pk)
+        self.assertIsNotNone(stored.last_login)
+        self.assertEqual(stored.email, "admin@example.com")
+        self.assertTrue(stored.is_superuser)
+        self.assertTrue(stored.check_password("x"))
+
+
+def regex_resolve(path, method):
+    """
+    The table-scan resolver the route table replaced: exact match on the
+    slash-less path, then the first endpoint whose regex matches.
+    """
+    request_path = path.rstrip("/")
+    endpoint = ApiEndpoint.objects.filter(path=request_path).order_by("pk").first()
+    if endpoint is None:
+        for candidate in ApiEndpoint.objects.order_by("pk"):
+            pattern = re.sub(r"\{(\w+)\}", r"[^/]+", candidate.path)
+            if re.match(f"^{pattern.rstrip('/')}$", request_path):
+                endpoint = candidate
+                break
+    if endpoint is None:
+        return None
+    return ApiOperation.objects.filter(endpoint=endpoint, http_method=method).first()
+
+
+class RouteTableTests(RBACTestCase):
+    """
+    RouteTable resolution against the regex resolver it replaced.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+
+    def register(self, path, *methods):
+        endpoint = ApiEndpoint.objects.create(path=path, module=self.module)
+        for method in methods:
+            ApiOperation.objects.create(endpoint=endpoint, http_method=method)
+        return endpoint
+
+    def test_matches_regex_resolution(self):
+        # Static paths registered before the overlapping {param} paths,
+        # where the regex resolver (first id wins) agrees with the trie.
+        self.register("/api/health", "GET")
+        self.register("/api/leads/", "GET", "POST")
+        self.register("/api/leads/export/", "GET")
+        self.register("/api/leads/{id}/", "GET", "PUT", "DELETE")
+        self.register("/api/leads/{id}/notes/", "GET")
+        self.register("/api/leads/{lead_id}/notes/{id}/", "GET", "DELETE")
+        self.register("/api/files/v{version}.json", "GET")
+        self.register("/api/reports/(?P<slug>[a-z]+)/", "GET")
+
+        table = build_route_table()
+        paths = [
+            "/api/health", "/api/health/", "/api/leads", "/api/leads/", "/api/leads//",
+            "/api/leads/export/", "/api/leads/42", "/api/leads/42/", "/api/leads/42/notes/",
+            "/api/leads/42/notes/7/", "/api/leads/42/unknown/", "/api/leads/42/notes/7/8/",
+            "/api/files/v2.json", "/api/files/2.json", "/api/reports/weekly/",
+            "/api/reports/Weekly/", "/api/unknown/", "/",
+        ]
+        for path in paths:
+            for method in ("GET", "POST", "DELETE"):
+                with self.subTest(path=path, method=method):
+                    expected = regex_resolve(path, method)
+                    operation = table.resolve(path, method)
+                    self.assertEqual(
+                        operation and operation.id, expected and expected.id,
+                    )
+
+    def test_static_before_wildcard_before_pattern(self):
+        # Registered in the opposite order: the regex resolver would pick
+        # the lowest id, the trie prefers the more specific segment.
+        wildcard = self.register("/api/items/{id}/", "GET")
+        pattern = self.register("/api/items/v{number}/history/", "GET")
+        static = self.register("/api/items/new/", "GET")
+
+        table = build_route_table()
+        self.assertEqual(table.find_endpoint("/api/items/new/").id, static.id)
+        self.assertEqual(table.find_endpoint("/api/items/v2/").id, wildcard.id)
+        # The wildcard branch has no "history" child: backtrack to the pattern
+        self.assertEqual(table.find_endpoint("/api/items/v2/history/").id, pattern.id)
+        self.assertIsNone(table.find_endpoint("/api/items/2/history/"))
+
+    def test_legacy_regex_fallback(self):
+        legacy = self.register("/api/exports/(?P<name>[a-z]+)\\.csv/", "GET")
+        trie = self.register("/api/exports/{id}/status/", "GET")
+
+        table = build_route_table()
+        self.assertEqual(table.path_count(), 2)
+        self.assertEqual(table.find_endpoint("/api/exports/leads.csv/").id, legacy.id)
+        self.assertEqual(table.find_endpoint("/api/exports/7/status/").id, trie.id)
+        self.assertIsNone(table.find_endpoint("/api/exports/Leads.csv/"))
+        for path in ("/api/exports/leads.csv/", "/api/exports/7/status/", "/api/exports/Leads.csv/"):
+            expected = regex_resolve(path, "GET")
+            operation = table.resolve(path, "GET")
+            self.assertEqual(operation and operation.id, expected and expected.id)
+
+
+class ManifestViewTests(RBACTestCase):
+    """
+    GET /api/rbac/manifest/ conditional requests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+        cls.role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.permission = Permission.objects.create(tenant=cls.tenant, module=cls.module, code="view")
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        UserRole.objects.create(user=cls.user, role=cls.role, tenant=cls.tenant)
+        endpoint = ApiEndpoint.objects.create(path="/api/leads/", module=cls.module)
+        cls.operation = ApiOperation.objects.create(endpoint=endpoint, http_method="GET")
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, **headers):
+        return self.client.get(reverse("rbac-manifest"), headers=headers)
+
+    def test_first_request(self):
+        response = self.get()
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["ETag"].startswith('"'))
+        self.assertEqual(response.json()["version"], response["ETag"].strip('"').split(".", 1)[1])
+
+    def test_if_none_match(self):
+        etag = self.get()["ETag"]
+        for value in (etag, f"W/{etag}", f'"stale", {etag}', "*"):
+            with self.subTest(if_none_match=value):
+                response = self.get(if_none_match=value)
+                self.assertEqual(response.status_code, 304)
+                self.assertEqual(response["ETag"], etag)
+                self.assertFalse(response.content)
+        self.assertEqual(self.get(if_none_match='"stale"').status_code, 200)
+
+    def assertETagChanges(self, change):
+        etag = self.get()["ETag"]
+        with self.captureOnCommitCallbacks(execute=True):
+            change()
+        response = self.get(if_none_match=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def test_role_permission_change(self):
+        self.assertETagChanges(
+            lambda: RolePermission.objects.create(role=self.role, permission=self.permission)
+        )
+
+    def test_user_api_block(self):
+        self.assertETagChanges(
+            lambda: UserApiBlock.objects.create(tenant=self.tenant, user=self.user, api_operation=self.operation)
+        )
+
+
+class OrderList(APIView):
+    def get(self, request):
+        return Response([])
+
+    def post(self, request):
+        return Response({})
+
+
+class OrderDetail(APIView):
+    def get(self, request, pk):
+        return Response({})
+
+
+class OrderDetailWithDelete(OrderDetail):
+    def delete(self, request, pk):
+        return Response(status=204)
+
+
+class URLConf:
+    """
+    ``ROOT_URLCONF`` stand-in holding ``urlpatterns``.
+    """
+
+    def __init__(self, *urlpatterns):
+        self.urlpatterns = list(urlpatterns)
+
+
+ORDER_LIST = path("api/orders/", OrderList.as_view())
+ORDER_DETAIL = path("api/orders/<int:pk>/", OrderDetail.as_view())
+
+
+class ApiSyncTests(RBACTestCase):
+    """
+    ``api_sync_db_operation`` against a test URL conf.
+    """
+
+    def sync(self, urlconf, *args):
+        out = StringIO()
+        with override_settings(ROOT_URLCONF=urlconf), self.captureOnCommitCallbacks(execute=True):
+            call_command("api_sync_db_operation", *args, stdout=out)
+        return out.getvalue()
+
+    def registry(self):
+        return set(ApiOperation.objects.values_list("endpoint__path", "endpoint__route", "http_method"))
+
+    def test_first_sync(self):
+        routes_version = policy_version.get_version(policy_version.ROUTES)
+        output = self.sync(URLConf(ORDER_LIST, ORDER_DETAIL))
+
+        self.assertIn("Endpoints created: 2", output)
+        self.assertEqual(self.registry(), {
+            ("/api/orders/", "api/orders/", "GET"),
+            ("/api/orders/", "api/orders/", "POST"),
+            ("/api/orders/{pk}/", "api/orders/<int:pk>/", "GET"),
+        })
+        self.assertEqual(
+            set(ApiOperation.objects.values_list("http_method", "permission_code")),
+            {("GET", "view"), ("POST", "create")},
+        )
+        self.assertTrue(Module.objects.filter(code="SYSTEM").exists())
+        self.assertNotEqual(policy_version.get_version(policy_version.ROUTES), routes_version)
+
+    def test_rerun_changes_nothing(self):
+        urlconf = URLConf(ORDER_LIST, ORDER_DETAIL)
+        self.sync(urlconf)
+        operations = set(ApiOperation.objects.values_list("id", "endpoint_id", "http_method"))
+        routes_version = policy_version.get_version(policy_version.ROUTES)
+
+        output = self.sync(urlconf, "--force")
+        self.assertIn("Endpoints created: 0\nOperations created: 0", output)
+        self.assertEqual(set(ApiOperation.objects.values_list("id", "endpoint_id", "http_method")), operations)
+        self.assertEqual(policy_version.get_version(policy_version.ROUTES), routes_version)
+
+    def test_changed_operation(self):
+        self.sync(URLConf(ORDER_LIST, ORDER_DETAIL))
+        detail_get = ApiOperation.objects.get(endpoint__path="/api/orders/{pk}/", http_method="GET")
+
+        output = self.sync(URLConf(ORDER_LIST, path("api/orders/<int:pk>/", OrderDetailWithDelete.as_view())))
+        self.assertIn("Operations created: 1", output)
+        self.assertEqual(
+            set(ApiOperation.objects.filter(endpoint=detail_get.endpoint).values_list("id", "http_method")),
+            {(detail_get.id, "GET"), (ApiOperation.objects.get(http_method="DELETE").id, "DELETE")},
+        )
+
+    def test_removed_route(self):
+        self.sync(URLConf(ORDER_LIST, ORDER_DETAIL))
+
+        self.sync(URLConf(ORDER_LIST))
+        self.assertTrue(ApiEndpoint.objects.filter(path="/api/orders/{pk}/").exists())
+
+        output = self.sync(URLConf(ORDER_LIST), "--prune")
+        self.assertIn("Endpoints removed: 1", output)
+        self.assertFalse(ApiEndpoint.objects.filter(path="/api/orders/{pk}/").exists())
+        self.assertEqual(ApiEndpoint.objects.get().path, "/api/orders/")
+
+    def test_dry_run(self):
+        output = self.sync(URLConf(ORDER_LIST, ORDER_DETAIL), "--dry-run")
+        self.assertIn("+ endpoint /api/orders/{pk}/", output)
+        self.assertIn("+ operation POST /api/orders/ (create)", output)
+        self.assertFalse(ApiEndpoint.objects.exists())
+        self.assertFalse(Module.objects.exists())
+        self.assertFalse(ApiSyncFingerprint.objects.exists())
+
+    def test_unchanged_apps_are_skipped(self):
+        urlconf = URLConf(ORDER_LIST, ORDER_DETAIL)
+        self.sync(urlconf)
+        self.assertEqual(ApiSyncFingerprint.objects.get().app_label, "core")
+
+        with self.assertNumQueries(1):
+            output = self.sync(urlconf)
+        self.assertIn("API registry unchanged (1 apps)", output)
+
+        output = self.sync(URLConf(ORDER_LIST, path("api/orders/<int:pk>/", OrderDetailWithDelete.as_view())))
+        self.assertIn("Apps synced: 1 of 1", output)
+        self.assertTrue(ApiOperation.objects.filter(http_method="DELETE").exists())
+
+    def test_services_sharing_the_registry(self):
+        # Each service serves its own apps; neither resyncs the other's
+        orders = URLConf(ORDER_LIST, ORDER_DETAIL)
+        tokens = URLConf(path("api/tokens/", obtain_auth_token))
+        self.assertIn("Apps synced: 1 of 1", self.sync(orders))
+        self.assertIn("Apps synced: 1 of 1", self.sync(tokens))
+
+        for urlconf in (orders, tokens, orders):
+            self.assertIn("API registry unchanged (1 apps)", self.sync(urlconf))
+        self.assertEqual(
+            set(ApiSyncFingerprint.objects.values_list("app_label", flat=True)),
+            {"core", "accounts"},
+        )
+
+        # --prune: the URL conf is the whole registry
+        self.sync(tokens, "--prune")
+        self.assertEqual(ApiSyncFingerprint.objects.get().app_label, "accounts")
+        self.assertEqual(self.registry(), {("/api/tokens/", "api/tokens/", "POST")})
+
+    def test_prune_changes_the_fingerprint(self):
+        self.sync(URLConf(ORDER_LIST, ORDER_DETAIL))
+        output = self.sync(URLConf(ORDER_LIST, ORDER_DETAIL), "--prune")
+        self.assertIn("Apps synced: 1 of 1", output)
+
+    def test_force(self):
+        urlconf = URLConf(ORDER_LIST, ORDER_DETAIL)
+        self.sync(urlconf)
+        # Rows removed behind the command's back are not noticed...
+        ApiOperation.objects.filter(http_method="POST").delete()
+        self.assertIn("nothing to sync", self.sync(urlconf))
+        self.assertFalse(ApiOperation.objects.filter(http_method="POST").exists())
+
+        # ...until every app is synced again
+        output = self.sync(urlconf, "--force")
+        self.assertIn("Apps synced: 1 of 1", output)
+        self.assertTrue(ApiOperation.objects.filter(endpoint__path="/api/orders/", http_method="POST").exists())
+
+
+class CleanupApiEndpointsTests(RBACTestCase):
+    """
+    ``cleanup_api_endpoints`` over several batches.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        Module.objects.create(code="CRM", name="Crm")
+        ops = Module.objects.create(code="OPS", name="Ops")
+        endpoints = {
+            path: ApiEndpoint.objects.create(path=path, module=ops)
+            for path in (
+                "/api/^orders/(?P<pk>[^/.]+)/$",
+                "/api/leads/",
+                "/api/organizations/",
+                "/api/^invoices/$",
+                "/api/organizations/{id}/",
+            )
+        }
+        ApiOperation.objects.create(endpoint=endpoints["/api/organizations/{id}/"], http_method="PUT")
+
+    def cleanup(self, *args):
+        out = StringIO()
+        call_command("cleanup_api_endpoints", "--batch-size", "2", *args, stdout=out)
+        return out.getvalue()
+
+    def registry(self):
+        return (
+            set(ApiEndpoint.objects.values_list("path", "module_id", "submodule_id")),
+            set(ApiOperation.objects.values_list("endpoint__path", "http_method")),
+        )
+
+    def assertCleanedUp(self, output):
+        self.assertIn("Paths cleaned:        2", output)
+        self.assertIn("Modules fixed:        2", output)
+        self.assertIn("Operations added:     5", output)
+        self.assertIn("Rows scanned:         12", output)
+        # Step 3 saw the path step 1 cleaned in an earlier batch
+        self.assertIn("ADD: DELETE /api/orders/{id}/ → delete", output)
+
+    def test_dry_run(self):
+        registry = self.registry()
+        routes_version = policy_version.get_version(policy_version.ROUTES)
+
+        output = self.cleanup("--dry-run")
+        self.assertCleanedUp(output)
+        self.assertIn("DRY RUN - No changes were saved", output)
+        self.assertEqual(self.registry(), registry)
+        self.assertFalse(SubModule.objects.filter(code="ORGS").exists())
+        self.assertEqual(policy_version.get_version(policy_version.ROUTES), routes_version)
+
+    def test_cleanup(self):
+        routes_version = policy_version.get_version(policy_version.ROUTES)
+
+        self.assertCleanedUp(self.cleanup())
+        self.assertEqual(self.registry(), ({
+            ("/api/orders/{id}/", "OPS", None),
+            ("/api/leads/", "OPS", None),
+            ("/api/organizations/", "CRM", "ORGS"),
+            ("/api/invoices/", "OPS", None),
+            ("/api/organizations/{id}/", "CRM", "ORGS"),
+        }, {
+            ("/api/orders/{id}/", "PUT"),
+            ("/api/orders/{id}/", "PATCH"),
+            ("/api/orders/{id}/", "DELETE"),
+            ("/api/organizations/{id}/", "PUT"),
+            ("/api/organizations/{id}/", "PATCH"),
+            ("/api/organizations/{id}/", "DELETE"),
+        }))
+        self.assertNotEqual(policy_version.get_version(policy_version.ROUTES), routes_version)
+
+        # Nothing left to do
+        self.assertIn("Total changes:        0", self.cleanup())
+
+
+LOCMEM = "django.core.cache.backends.locmem.LocMemCache"
+
+
+@override_settings(CACHES={
+    "default": {"BACKEND": LOCMEM},
+    "worker_a": {"BACKEND": LOCMEM, "LOCATION": "worker_a"},
+    "worker_b": {"BACKEND": LOCMEM, "LOCATION": "worker_b", "TIMEOUT": 0.05},
+})
+class CrossProcessBlockTests(RBACTestCase):
+    """
+    Two workers on separate (LocMem) RBAC caches.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+        endpoint = ApiEndpoint.objects.create(path="/api/leads/", module=cls.module)
+        cls.operation = ApiOperation.objects.create(endpoint=endpoint, http_method="GET")
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+
+    def setUp(self):
+        super().setUp()
+        for worker in ("worker_a", "worker_b"):
+            caches[worker].clear()
+
+    def is_blocked(self, worker):
+        # L1 entries are keyed by versions, which differ between the caches
+        with override_settings(RBAC_CACHE_ALIAS=worker, RBAC_L1_CACHE_TTL=0.05):
+            return user_blocks.is_user_blocked(self.tenant, self.user, self.operation)
+
+    def block_on_worker_a(self):
+        self.assertFalse(self.is_blocked("worker_b"))
+        with override_settings(RBAC_CACHE_ALIAS="worker_a"), self.captureOnCommitCallbacks(execute=True):
+            UserApiBlock.objects.create(tenant=self.tenant, user=self.user, api_operation=self.operation)
+
+    def test_block_enforced_once_the_version_arrives(self):
+        self.block_on_worker_a()
+        with override_settings(RBAC_CACHE_ALIAS="worker_b"):
+            policy_version.bump_version(policy_version.BLOCKS, self.tenant.pk)
+            policy_version.bump_version(policy_version.USER, self.user.pk)
+        self.assertTrue(self.is_blocked("worker_b"))
+        self.assertTrue(self.is_blocked("worker_a"))
+
+    def test_block_enforced_once_the_index_expires(self):
+        self.block_on_worker_a()
+        time.sleep(0.1)
+        self.assertTrue(self.is_blocked("worker_b"))
+
+
+@override_settings(
+    CACHES={
+        "default": {"BACKEND": LOCMEM},
+        "worker_a": {"BACKEND": LOCMEM, "LOCATION": "worker_a"},
+        "worker_b": {"BACKEND": LOCMEM, "LOCATION": "worker_b"},
+    },
+    RBAC_POLICY_SYNC="poll",
+)
+class PolicySyncTests(TransactionTestCase):
+    """
+    A bump on one worker reaches a worker on another cache through
+    PolicySyncThread polling PolicyVersion.
+    """
+
+    def setUp(self):
+        reset_rbac_caches()
+        for worker in ("worker_a", "worker_b"):
+            caches[worker].clear()
+        self.tenant = Tenant.objects.create(name="T1")
+        module = Module.objects.create(code="CRM", name="Crm")
+        endpoint = ApiEndpoint.objects.create(path="/api/leads/", module=module)
+        self.operation = ApiOperation.objects.create(endpoint=endpoint, http_method="GET")
+
+    def api_disabled(self, worker):
+        with override_settings(RBAC_CACHE_ALIAS=worker):
+            return tenant_policy.get_tenant_policy(self.tenant).api_disabled(self.operation.pk)
+
+    def test_poll_applies_bumps_from_other_workers(self):
+        self.assertFalse(self.api_disabled("worker_b"))
+
+        with override_settings(RBAC_CACHE_ALIAS="worker_b"):
+            thread = policy_sync.PolicySyncThread("poll", 0.05)
+            thread.start()
+            try:
+                with override_settings(RBAC_CACHE_ALIAS="worker_a"):
+                    TenantApiOverride.objects.create(
+                        tenant=self.tenant, api_operation=self.operation, is_enabled=False,
+                    )
+
+                scope = policy_version.scope_name(policy_version.TENANT, self.tenant.pk)
+                deadline = time.monotonic() + 5
+                while scope not in thread.applied and time.monotonic() < deadline:
+                    time.sleep(0.01)
+            finally:
+                thread.stop()
+                thread.join()
+
+        self.assertIn(scope, thread.applied)
+        self.assertTrue(self.api_disabled("worker_b"))
+
+
+class RBACCacheCheckTests(SimpleTestCase):
+    @override_settings(CACHES={"default": {"BACKEND": LOCMEM}}, RBAC_POLICY_SYNC=None)
+    def test_process_local_cache_without_sync(self):
+        self.assertEqual([warning.id for warning in check_rbac_cache(None)], ["msbc_rbac.W001"])
+
+    @override_settings(CACHES={"default": {"BACKEND": LOCMEM}}, RBAC_POLICY_SYNC="poll")
+    def test_process_local_cache_with_sync(self):
+        self.assertEqual(check_rbac_cache(None), [])
+
+    @override_settings(
+        CACHES={
+            "default": {"BACKEND": LOCMEM},
+            "rbac": {"BACKEND": "django.core.cache.backends.redis.RedisCache", "LOCATION": "redis://redis"},
+        },
+        RBAC_CACHE_ALIAS="rbac",
+        RBAC_POLICY_SYNC=None,
+    )
+    def test_shared_cache(self):
+        self.assertEqual(check_rbac_cache(None), [])
+
+
+class SingleQueryPolicyTests(RBACTestCase):
+    """
+    ``single_query`` inputs decide like the default ones.
+    """
+
+    today = date.today()
+    SUBSCRIPTIONS = {
+        "none": [],
+        "module": [(None, True, None)],
+        "submodule": [("CORE", True, None)],
+        "disabled": [(None, False, None)],
+        "expired": [(None, True, today - timedelta(days=1))],
+        "expires_today": [(None, True, today)],
+    }
+    OVERRIDES = (None, False, True)
+    BLOCKS = ("none", "operation", "other_operation")
+    GRANTS = ("none", "module", "submodule", "denied", "inactive", "other_action", "other_user")
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        cls.module = Module.objects.create(code="CRM", name="Crm")
+        cls.submodule = SubModule.objects.create(code="CORE", name="Core")
+        cls.role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.other_role = Role.objects.create(name="Support", tenant=cls.tenant)
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        cls.other_user = User.objects.create_user("bob", password="x", tenant=cls.tenant)
+        UserRole.objects.create(user=cls.user, role=cls.role, tenant=cls.tenant)
+        UserRole.objects.create(user=cls.other_user, role=cls.other_role, tenant=cls.tenant)
+
+        # Submodule endpoint with the method's action, module endpoint with
+        # an explicit permission code
+        leads = ApiEndpoint.objects.create(path="/api/leads/", module=cls.module, submodule=cls.submodule)
+        approve = ApiEndpoint.objects.create(path="/api/leads/{id}/approve/", module=cls.module)
+        ApiOperation.objects.create(endpoint=leads, http_method="GET")
+        ApiOperation.objects.create(endpoint=approve, http_method="POST", permission_code="approve")
+        cls.other_operation = ApiOperation.objects.create(endpoint=leads, http_method="DELETE")
+        cls.requests = [("/api/leads/", "GET", "view"), ("/api/leads/1/approve/", "POST", "approve")]
+
+    def arrange(self, operation, action, subscription, override, block, grant):
+        for submodule_id, is_enabled, expiration_date in self.SUBSCRIPTIONS[subscription]:
+            TenantModule.objects.create(
+                tenant=self.tenant, module=self.module, submodule_id=submodule_id,
+                is_enabled=is_enabled, expiration_date=expiration_date,
+            )
+        if override is not None:
+            TenantApiOverride.objects.create(tenant=self.tenant, api_operation=operation, is_enabled=override)
+        if block != "none":
+            UserApiBlock.objects.create(
+                tenant=self.tenant, user=self.user,
+                api_operation=operation if block == "operation" else self.other_operation,
+            )
+        if grant != "none":
+            permission = Permission.objects.create(
+                tenant=self.tenant, module=self.module,
+                submodule=self.submodule if grant == "submodule" else None,
+                code="export" if grant == "other_action" else action,
+                is_active=grant != "inactive",
+            )
+            RolePermission.objects.create(
+                role=self.other_role if grant == "other_user" else self.role,
+                permission=permission,
+                allowed=grant != "denied",
+            )
+
+    def decide(self, inputs_class, operation, method):
+        reset_rbac_caches()
+        inputs = inputs_class(self.tenant, self.user, operation, method)
+        return evaluate_policy(operation, self.tenant, method, inputs)
+
+    def assertSameDecisions(self):
+        table = build_route_table()
+        cases = itertools.product(self.requests, self.SUBSCRIPTIONS, self.OVERRIDES, self.BLOCKS, self.GRANTS)
+        decisions = set()
+        for (path, method, action), *arrangement in cases:
+            operation = table.resolve(path, method)
+            with self.subTest(path=path, arrangement=arrangement), transaction.atomic():
+                self.arrange(operation, action, *arrangement)
+
+                expected = self.decide(DatabasePolicyInputs, operation, method)
+                reset_rbac_caches()
+                with self.assertNumQueries(1):
+                    inputs = SingleQueryPolicyInputs(self.tenant, self.user, operation, method)
+                self.assertEqual(evaluate_policy(operation, self.tenant, method, inputs), expected)
+                decisions.add(expected)
+
+                transaction.set_rollback(True)
+        # ALLOW and every denial from steps 5-10 but the unknown action
+        self.assertEqual(len(decisions), 7)
+
+    def test_same_decisions(self):
+        self.assertSameDecisions()
+
+    @override_settings(RBAC_EFFECTIVE_PERMISSIONS=True)
+    def test_same_decisions_with_effective_permissions(self):
+        self.assertSameDecisions()
+
+
+async def current_tenant_view(request):
+    # Yield to the other requests before reading the context
+    await asyncio.sleep(0.05)
+    tenant = get_current_tenant()
+    return JsonResponse({"tenant": tenant.name if tenant else None})
+
+
+ASYNC_URLCONF = URLConf(
+    path("api/orders/", current_tenant_view),
+    path("api/tenant/", current_tenant_view),
+)
+
+
+@override_settings(ROOT_URLCONF=ASYNC_URLCONF)
+class AsyncMiddlewareTests(RBACTestCase):
+    """
+    RBACMiddleware / CurrentTenantMiddleware under ASGI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        module = Module.objects.create(code="CRM", name="Crm")
+        cls.users = {}
+        for name in ("T1", "T2"):
+            tenant = Tenant.objects.create(name=name)
+            TenantModule.objects.create(tenant=tenant, module=module)
+            role = Role.objects.create(name="Sales", tenant=tenant)
+            user = User.objects.create_user(f"user-{name}", password="x", tenant=tenant)
+            UserRole.objects.create(user=user, role=role, tenant=tenant)
+            RolePermission.objects.create(
+                role=role,
+                permission=Permission.objects.create(tenant=tenant, module=module, code="view"),
+            )
+            cls.users[name] = user
+        cls.tenant = tenant
+        cls.unprivileged = User.objects.create_user("bob", password="x", tenant=cls.tenant)
+
+        for route in ("api/orders/", "api/tenant/"):
+            endpoint = ApiEndpoint.objects.create(path=f"/{route}", route=route, module=module)
+            ApiOperation.objects.create(endpoint=endpoint, http_method="GET")
+
+    def setUp(self):
+        super().setUp()
+        # The requests must take the async path
+        patcher = mock.patch.object(RBACMiddleware, "check", side_effect=AssertionError("sync path"))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def client_for(self, user):
+        client = AsyncClient()
+        await client.aforce_login(user)
+        return client
+
+    async def test_denied_without_permission(self):
+        client = await self.client_for(self.unprivileged)
+        response = await client.get("/api/orders/")
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["message"], "User is not authorized to perform this action")
+
+    async def test_allowed_with_permission(self):
+        client = await self.client_for(self.users["T2"])
+        response = await client.get("/api/orders/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"tenant": "T2"})
+
+    async def test_tenant_context_isolated_between_concurrent_requests(self):
+        clients = [await self.client_for(self.users[name]) for name in ("T1", "T2", "T1", "T2")]
+        responses = await asyncio.gather(*(client.get("/api/tenant/") for client in clients))
+        self.assertEqual(
+            [response.json()["tenant"] for response in responses],
+            ["T1", "T2", "T1", "T2"],
+        )
+        self.assertIsNone(get_current_tenant())
+
+
+class Tomorrow(date):
+    @classmethod
+    def today(cls):
+        return date.today() + timedelta(days=1)
+
+
+class DecisionCacheInvalidationTests(RBACTestCase):
+    """
+    A cached ALLOW never outlives the grant it was based on.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        module = Module.objects.create(code="CRM", name="Crm")
+        cls.subscription = TenantModule.objects.create(
+            tenant=cls.tenant, module=module, expiration_date=date.today(),
+        )
+        cls.role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        cls.assignment = UserRole.objects.create(user=cls.user, role=cls.role, tenant=cls.tenant)
+        RolePermission.objects.create(
+            role=cls.role,
+            permission=Permission.objects.create(tenant=cls.tenant, module=module, code="view"),
+        )
+        endpoint = ApiEndpoint.objects.create(path="/api/leads/", module=module)
+        ApiOperation.objects.create(endpoint=endpoint, http_method="GET")
+
+    def setUp(self):
+        super().setUp()
+        self.middleware = RBACMiddleware(lambda request: HttpResponse())
+        self.operation = build_route_table().resolve("/api/leads/", "GET")
+
+    def decide(self):
+        return self.middleware.decide(self.tenant, self.user, self.operation, "GET")
+
+    def assertCachedAllow(self):
+        self.assertTrue(self.decide().allowed)
+        # Served from the decision cache: only the version tokens are read
+        with self.assertNumQueries(0):
+            self.assertTrue(self.decide().allowed)
+
+    def test_role_revoked(self):
+        self.assertCachedAllow()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assignment.delete()
+        self.assertEqual(self.decide(), (False, RBACPermissionDenied.PERMISSION_DENIED))
+
+    def test_user_blocked(self):
+        self.assertCachedAllow()
+        with self.captureOnCommitCallbacks(execute=True):
+            UserApiBlock.objects.create(tenant=self.tenant, user=self.user, api_operation=self.operation)
+        self.assertEqual(self.decide(), (False, RBACPermissionDenied.API_BLOCKED_FOR_USER))
+
+    def test_subscription_expires_at_midnight(self):
+        self.assertCachedAllow()
+        with mock.patch("msbc_rbac.core.services.decision_cache.date", Tomorrow), \
+                mock.patch("msbc_rbac.core.services.policy_decision.date", Tomorrow):
+            self.assertEqual(self.decide(), (False, RBACPermissionDenied.SUBSCRIPTION_EXPIRED))
+
+
+BATCH_URLCONF = URLConf(
+    ORDER_LIST,
+    ORDER_DETAIL,
+    path("api/rbac/", include("msbc_rbac.core.api.rbac_urls")),
+)
+
+
+@override_settings(ROOT_URLCONF=BATCH_URLCONF)
+class BatchCheckTests(RBACTestCase):
+    """
+    ``check_batch`` and ``POST /api/rbac/check-batch/``.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        module = Module.objects.create(code="CRM", name="Crm")
+        TenantModule.objects.create(tenant=cls.tenant, module=module)
+        role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        UserRole.objects.create(user=cls.user, role=role, tenant=cls.tenant)
+        RolePermission.objects.create(
+            role=role,
+            permission=Permission.objects.create(tenant=cls.tenant, module=module, code="view"),
+        )
+
+        orders = ApiEndpoint.objects.create(path="/api/orders/", route="api/orders/", module=module)
+        order = ApiEndpoint.objects.create(path="/api/orders/{pk}/", route="api/orders/<int:pk>/", module=module)
+        ApiOperation.objects.create(endpoint=orders, http_method="GET")
+        ApiOperation.objects.create(endpoint=orders, http_method="POST")
+        ApiOperation.objects.create(endpoint=order, http_method="GET")
+
+    def post(self, checks):
+        client = APIClient()
+        client.force_login(self.user)
+        return client.post(reverse("rbac-check-batch"), {"checks": checks}, format="json")
+
+    def test_mixed_results(self):
+        results = check_batch(self.tenant, self.user, [
+            ("get", "/api/orders/"),
+            ("POST", "/api/orders/"),
+            ("GET", "/api/orders/7/"),
+            ("DELETE", "/api/orders/7/"),
+        ])
+        self.assertEqual([tuple(result) for result in results], [
+            ("GET", "/api/orders/", True, None),
+            ("POST", "/api/orders/", False, RBACPermissionDenied.PERMISSION_DENIED),
+            ("GET", "/api/orders/7/", True, None),
+            ("DELETE", "/api/orders/7/", False, RBACPermissionDenied.API_NOT_REGISTERED),
+        ])
+
+    def test_unresolvable_and_bypassed_paths(self):
+        results = check_batch(self.tenant, self.user, [
+            ("GET", "/api/invoices/"),
+            ("GET", "/api/orders/not-a-pk/"),
+            ("POST", "/api/rbac/check-batch/"),
+        ])
+        self.assertEqual([(result.allowed, result.violation) for result in results], [
+            (False, NOT_FOUND),
+            (False, NOT_FOUND),
+            (True, None),
+        ])
+
+    def test_caller_resolved_routes(self):
+        # Other services' paths: no URL resolution and no bypass prefixes
+        results = check_batch(self.tenant, self.user, [
+            ("GET", "/api/orders/7/", "api/orders/<int:pk>/"),
+            ("GET", "/api/invoices/", None),
+            ("POST", "/api/rbac/check-batch/", None),
+        ], resolve_urls=False)
+        self.assertEqual([(result.allowed, result.violation) for result in results], [
+            (True, None),
+            (False, RBACPermissionDenied.API_NOT_REGISTERED),
+            (False, RBACPermissionDenied.API_NOT_REGISTERED),
+        ])
+
+    def test_view(self):
+        response = self.post([
+            {"method": "GET", "path": "/api/orders/"},
+            ["POST", "/api/orders/"],
+            {"method": "GET", "path": "/api/invoices/"},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"], [
+            {"method": "GET", "path": "/api/orders/", "allowed": True, "violation": None},
+            {"method": "POST", "path": "/api/orders/", "allowed": False,
+             "violation": RBACPermissionDenied.PERMISSION_DENIED},
+            {"method": "GET", "path": "/api/invoices/", "allowed": False, "violation": NOT_FOUND},
+        ])
+
+    @override_settings(RBAC_CHECK_BATCH_MAX_ITEMS=2)
+    def test_view_rejects_malformed_and_oversized_batches(self):
+        self.assertEqual(self.post([{"method": "GET", "path": "api/orders/"}]).status_code, 400)
+        self.assertEqual(self.post([["GET", "/api/orders/"]] * 3).status_code, 400)
+
+    def test_query_count_does_not_grow_with_the_batch(self):
+        def count_queries(size):
+            checks = [
+                {"method": method, "path": f"/api/orders/{pk}/"}
+                for pk, method in zip(range(size), itertools.cycle(("GET", "DELETE")))
+            ] + [{"method": "POST", "path": "/api/orders/"}, {"method": "GET", "path": "/api/invoices/"}]
+            reset_rbac_caches()
+            with CaptureQueriesContext(connection) as queries, \
+                    mock.patch.object(policy_decision, "get_tenant_policy", wraps=get_tenant_policy) as policy, \
+                    mock.patch.object(policy_decision, "get_user_permissions", wraps=get_user_permissions) as grants:
+                response = self.post(checks)
+            self.assertEqual(len(response.json()["results"]), size + 2)
+            # Loaded once per batch, not per item
+            self.assertEqual((policy.call_count, grants.call_count), (1, 1))
+            return len(queries)
+
+        self.assertEqual(count_queries(500), count_queries(10))
+
+
+I18N_URLCONF = URLConf(*i18n_patterns(ORDER_LIST, ORDER_DETAIL))
+
+
+class MiddlewareRouteTests(RBACTestCase):
+    """
+    RBACMiddleware looking operations up by the resolved URL route.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.tenant = Tenant.objects.create(name="T1")
+        module = Module.objects.create(code="CRM", name="Crm")
+        TenantModule.objects.create(tenant=cls.tenant, module=module)
+        role = Role.objects.create(name="Sales", tenant=cls.tenant)
+        cls.user = User.objects.create_user("alice", password="x", tenant=cls.tenant)
+        UserRole.objects.create(user=cls.user, role=role, tenant=cls.tenant)
+        RolePermission.objects.create(
+            role=role,
+            permission=Permission.objects.create(tenant=cls.tenant, module=module, code="view"),
+        )
+        cls.unprivileged = User.objects.create_user("bob", password="x", tenant=cls.tenant)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_login(self.user)
+
+    def sync(self, urlconf):
+        with override_settings(ROOT_URLCONF=urlconf), self.captureOnCommitCallbacks(execute=True):
+            call_command("api_sync_db_operation", stdout=StringIO())
+        ApiEndpoint.objects.update(module="CRM")
+
+    def assertDenied(self, response, violation):
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["error"], DENIAL_MESSAGES[violation][1])
+
+    @override_settings(ROOT_URLCONF=URLConf(ORDER_LIST, ORDER_DETAIL))
+    def test_unresolvable_path_is_not_found(self):
+        self.sync(URLConf(ORDER_LIST, ORDER_DETAIL))
+        self.assertEqual(self.client.get("/api/orders/1/").status_code, 200)
+        # Django answers before the RBAC checks run
+        self.assertEqual(self.client.get("/api/orders/x/").status_code, 404)
+        self.assertEqual(self.client.get("/api/invoices/").status_code, 404)
+        # Resolvable but not registered
+        self.assertDenied(self.client.delete("/api/orders/1/"), RBACPermissionDenied.API_NOT_REGISTERED)
+
+    @override_settings(ROOT_URLCONF=I18N_URLCONF)
+    def test_locale_prefixed_routes(self):
+        with translation.override("en"):
+            self.sync(I18N_URLCONF)
+        self.assertEqual(
+            set(ApiEndpoint.objects.values_list("path", "route")),
+            {("/api/orders/", "api/orders/"), ("/api/orders/{pk}/", "api/orders/<int:pk>/")},
+        )
+
+        for language in ("en", "fr"):
+            with self.subTest(language=language), translation.override(language):
+                self.client.force_login(self.user)
+                self.assertEqual(self.client.get(f"/{language}/api/orders/1/").status_code, 200)
+                self.assertEqual(
+                    list(check_batch(self.tenant, self.user, [("GET", f"/{language}/api/orders/")])),
+                    [("GET", f"/{language}/api/orders/", True, None)],
+                )
+                self.client.force_login(self.unprivileged)
+                self.assertDenied(self.client.get(f"/{language}/api/orders/"), RBACPermissionDenied.PERMISSION_DENIED)
+
+    def test_strip_locale_prefix(self):
+        with override_settings(ROOT_URLCONF=I18N_URLCONF), translation.override("fr"):
+            self.assertEqual(
+                strip_locale_prefix("/fr/api/orders/1/", "fr/api/orders/<int:pk>/"),
+                ("/api/orders/1/", "api/orders/<int:pk>/"),
+            )
+            # Unresolved or resolved elsewhere: left alone
+            self.assertEqual(strip_locale_prefix("/fr/api/orders/", None), ("/fr/api/orders/", None))
+        with override_settings(ROOT_URLCONF=URLConf(ORDER_LIST)), translation.override("fr"):
+            self.assertEqual(
+                strip_locale_prefix("/fr/api/orders/", "fr/api/orders/"),
+                ("/fr/api/orders/", "fr/api/orders/"),
+            )
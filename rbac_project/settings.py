@@ -59,7 +59,8 @@ INSTALLED_APPS = [
 REST_FRAMEWORK = {
     'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',  # Try token first
+        'msbc_rbac.accounts.authentication.CachedTokenAuthentication',  # Try token first
+        'msbc_rbac.accounts.authentication.ClaimsTokenAuthentication',  # Signed claims tokens
         'rest_framework.authentication.SessionAuthentication',  # Fallback to session
     ],
     'EXCEPTION_HANDLER': 'msbc_rbac.core.drf_exception_handler.custom_exception_handler',
@@ -127,6 +128,50 @@ ROOT_URLCONF = 'rbac_project.urls'
 WSGI_APPLICATION = 'rbac_project.wsgi.application'
 
 
+# ------------------------------------------------------------------------------
+# CACHE
+# ------------------------------------------------------------------------------
+# Holds RBAC policy version tokens and cached policy data (RBAC_CACHE_ALIAS).
+# REDIS_URL (e.g. redis://redis:6379/1, needs the redis package) shares it
+# between every worker and node, so a version bump reaches all of them at
+# once.  Without it each worker gets its own LocMemCache and learns about
+# other workers' bumps through RBAC_POLICY_SYNC only; the msbc_rbac.W001
+# check warns when neither is set up.
+# LocMemCache culls a third of its keys once MAX_ENTRIES is reached (300 by
+# default), which also drops version tokens and invalidates everything; size
+# it for the user count.
+
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'OPTIONS': {
+                'MAX_ENTRIES': 100000,
+            },
+        }
+    }
+
+
+# ------------------------------------------------------------------------------
+# RBAC
+# ------------------------------------------------------------------------------
+# gunicorn runs several workers, each with its own LocMemCache: publish
+# policy version bumps through the PolicyVersion table and poll it every
+# RBAC_POLICY_POLL_INTERVAL seconds, so revocations reach every worker within
+# seconds instead of when cached snapshots expire.  RBAC_POLICY_SYNC="" turns
+# it off (only safe with an RBAC cache shared by every worker).
+
+RBAC_POLICY_SYNC = os.environ.get('RBAC_POLICY_SYNC', 'poll') or None
+RBAC_POLICY_POLL_INTERVAL = 2
+
+
 # ------------------------------------------------------------------------------
 # TEMPLATES
 # ------------------------------------------------------------------------------
@@ -168,6 +213,15 @@ DATABASES = {
     }
 }
 
+# DB_ENGINE=sqlite → local SQLite file (benchmarks, quick local runs)
+if os.environ.get('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('DB_NAME', str(BASE_DIR / 'db.sqlite3')),
+        }
+    }
+
 
 # ------------------------------------------------------------------------------
 # AUTH / LOGIN FLOW
@@ -235,6 +289,7 @@ BYPASS_PATH_PREFIXES = [
     '/static',
     '/accounts',       # session login / logout
     '/api/auth',       # token endpoint
+    '/api/rbac',       # RBAC service endpoints (authorize themselves)
     '/api/schema',     # OpenAPI schema
     '/api/docs',       # Swagger UI
 ]
@@ -20,7 +20,7 @@ from drf_spectacular.views import (
     SpectacularAPIView,
     SpectacularSwaggerView,
 )
-from msbc_rbac.accounts.api.views import obtain_auth_token
+from msbc_rbac.accounts.api.views import obtain_auth_token, obtain_claims_token
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -31,6 +31,7 @@ urlpatterns = [
     # Authentication
     path('accounts/', include('msbc_rbac.accounts.urls')),
     path('api/auth/token/', obtain_auth_token, name='api_token_auth'),  # Token authentication
+    path('api/auth/claims/', obtain_claims_token, name='api_claims_token'),  # Signed claims token
 
     # OpenAPI schema
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
@@ -41,6 +42,9 @@ urlpatterns = [
     # Core / Demo API
     path('api/core/', include('msbc_rbac.core.api.urls')),
 
+    # RBAC service endpoints (self-authorizing, see BYPASS_PATH_PREFIXES)
+    path('api/rbac/', include('msbc_rbac.core.api.rbac_urls')),
+
     # Enquiry API - Commented out as they don't exist yet
     # path('api/', include('enquiry.api.urls')),
 